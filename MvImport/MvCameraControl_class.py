@@ -13,10 +13,30 @@ from MvImport.MvErrorDefine_const import *
 
 # Python3.8版本修改Dll加载策略, 默认不再搜索Path环境变量, 同时增加winmode参数以兼容旧版本
 dllname = "MvCameraControl.dll"
-if "winmode" in ctypes.WinDLL.__init__.__code__.co_varnames:
-    MvCamCtrldll = WinDLL(dllname, winmode=0)
-else:
-    MvCamCtrldll = WinDLL(dllname)
+
+
+class _LazyDll:
+    """首次调用 SDK 函数时才加载 DLL：没有安装 MVS 的机器（或 Linux）上导入本模块不会失败"""
+
+    def __init__(self, name):
+        self._name = name
+        self._dll = None
+
+    def _load(self):
+        if self._dll is None:
+            if not hasattr(ctypes, "WinDLL"):
+                raise OSError(f"{self._name} 只能在 Windows 上加载；无硬件时请使用模拟相机（devices.camera: sim）")
+            if "winmode" in ctypes.WinDLL.__init__.__code__.co_varnames:
+                self._dll = ctypes.WinDLL(self._name, winmode=0)
+            else:
+                self._dll = ctypes.WinDLL(self._name)
+        return self._dll
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+MvCamCtrldll = _LazyDll(dllname)
 
 
 # 用于回调函数传入相机实例
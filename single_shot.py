@@ -1,20 +1,20 @@
 import os
 import time
-import yaml
-import threading
-from src.screen_viewer import display_image
-from src.slm_ctrl import SLM
-from src.camera import HikCamera
-from MvImport.MvCameraControl_class import *
-import time, threading, datetime
+from src.devices import open_devices
+from src.frame_writer import AsyncFrameWriter
+from src.calc_tamura import live_focus
+from src.experiment_runner import capture_task, make_entry
 from utils.config_utils import (
     prepare_run_environment, task_codes_from_time,
-    append_log, write_run_yaml, to_json_str, generate_file_prefix
+    append_log, write_run_yaml, generate_file_prefix
 )
+from utils.trace import span, tracer
 
-def main():
+def main(config_path=None):
     
-    CONFIG_PATH = r"D:/qjy/camera_slm_pipeline/config.yaml"  # 可替换为实际路径
+    CONFIG_PATH = config_path or r"D:/qjy/camera_slm_pipeline/config.yaml"  # 可替换为实际路径
+    # 本次任务各阶段的耗时（config.yaml 的 trace 段开启时记录，见 utils/trace.py）
+    task_trace = tracer.begin_task("single_shot")
     config, run_data, run_path, proj_dir, kind = prepare_run_environment(CONFIG_PATH)
 
     if config["task"]["mode"] == "capture_psf":
@@ -28,66 +28,71 @@ def main():
     if config["task"]["mode"] == "calibration":
         use_display = True
         use_slm     = False
-        use_camera  = False
+        use_camera  = bool(config["task"].get("focus_metric"))   # 填写后实时显示对焦评价值
 
+    writer = None
+    devices = None
     try:
-    # 初始化设备
-        if use_slm:    
-            slm = SLM(verbose=True)
-            settle_ms = 30
-            slm.init()
-
-        if use_camera:
-            cam = HikCamera(dev_index=0)
-            timeout_ms = 3000
-            if not cam.open():
-                print("[ERR] 相机打开失败")
-                exit(2)
+    # 初始化设备（config.yaml 的 devices 可切换为模拟设备，见 src/devices.py）
+        settle_ms = config["capture_settings"].get("slm_settle_ms", 30)   # SLM 切换后的稳定等待
+        timeout_ms = 3000
+        if use_display:
+            display_image_path = config["capture_settings"]["display_image_path"]
+            if not os.path.exists(display_image_path):
+                print("[ERR] 显示器图片路径无效")
+                exit(3)
+        try:
+            devices = open_devices(config, slm=use_slm, camera=use_camera, display=use_display)
+        except RuntimeError as e:
+            print(f"[ERR] {e}")
+            exit(2)
+        slm, cam, display = devices.slm, devices.cam, devices.display
     
     # 生成任务 ID
         code4, task_id = task_codes_from_time(kind, k=4)
+        task_trace.name = f"task_{code4}"
 
     # 运行设备
         if use_display:
-            print("[INFO] 启动显示器显示线程")
-            display_thread = threading.Thread(
-                target=display_image,
-                args=(
-                    config["capture_settings"]["display_image_path"],
-                    config["capture_settings"]["monitor_idx"],
-                    config["capture_settings"]["scale_factor"]
-                    # 目前这里的函数设置没有添加 config["capture_settings"]["display_position"]
-                )
-            )
-            display_thread.daemon = True
-            display_thread.start()
+            # 目前显示位置没有使用 config["capture_settings"]["display_position"]
+            # 阻塞到图像实际呈现后再继续，之后可用 display.show()/next() 切换目标
+            if display.show(display_image_path) is None:
+                print("[ERR] 显示器图片显示失败")
+                exit(3)
 
         if use_slm:
             if not os.path.exists(config["capture_settings"]["slm_image_path"]):
                 print("[ERR] SLM图片路径无效")
                 exit(4)
             slm.img_show(config["capture_settings"]["slm_image_path"])
-            time.sleep(settle_ms / 1000.0)
+            with span("slm.settle", ms=settle_ms):
+                time.sleep(settle_ms / 1000.0)
 
         if config["task"]["mode"] == "calibration":
             print("[INFO] 进入标定模式，保持显示器和SLM显示，按 Ctrl+C 退出或等待1000秒后自动退出")
             print("[INFO] calibration 模式：不写 run.yaml 日志")
-            time.sleep(10000)   # 保持足够时间用于手动对焦等操作
+            if use_camera:
+                live_focus(cam, config["task"]["focus_metric"],
+                           downsample=config["task"].get("focus_downsample", 4),
+                           exposure_us=config["capture_settings"]["exposure_us"],
+                           timeout_ms=timeout_ms, duration_s=10000)
+            else:
+                time.sleep(10000)   # 保持足够时间用于手动对焦等操作
             return
 
         captured = None
+        burst_info = None
         if use_camera and kind in ("psf", "m"):
             num_width = 3   # 保存图片的编号位数
             file_prefix = generate_file_prefix(kind, run_data, num_width)
-            out_path = proj_dir / f"{file_prefix}-{code4}.jpg"
-            ok = cam.snap(
-                out_path,
-                exposure_us=config["capture_settings"]["exposure_us"],
-                timeout_ms=timeout_ms,
-                img_type=MV_Image_Jpeg
-            )
-            if ok:
-                captured = str(out_path)
+            repeat = int(config["task"].get("repeat", 1) or 1)
+
+            # 写盘成功后才登记到日志条目；repeat > 1 时一次取流内连拍并写出堆栈 .npy
+            writer = AsyncFrameWriter(max_queue=4, workers=2)
+            captured, burst_info = capture_task(cam, writer, proj_dir, file_prefix, code4,
+                                                config["capture_settings"], repeat, timeout_ms)
+            writer.close()
+            if captured:
                 if config["task"]["mode"] == "capture_psf":
                     print(f"[OK] PSF 拍摄成功!")
                 if config["task"]["mode"] == "capture_measurement":
@@ -95,26 +100,24 @@ def main():
             else:
                 print("[ERR] 拍摄失败！")
     
-    # 写入 run.yaml
-        entry_key = f"task_{code4}"
-        entry_val = {
-            "task_id": task_id,
-            "task_time": datetime.datetime.now().astimezone().isoformat(timespec='seconds'),
-            "mode": config["task"]["mode"],
-            "description": config["task"].get("description", ""),
-            "capture_settings": to_json_str(config["capture_settings"]),
-            "physical_setup": to_json_str(config["physical_setup"])
-        }
-        if captured:
-            if kind == "psf": entry_val["psf_path"] = captured
-            else: entry_val["measurement_path"] = captured
-        append_log(run_data, {entry_key: entry_val})
-        write_run_yaml(run_path, run_data)
-        print(f"[OK] wrote {run_path}")
+    # 写入运行日志（run.jsonl；需要 run.yaml 时用 utils/run_log.py export 导出）
+        tracer.end_task(task_trace)
+        entry = make_entry(code4, task_id, config["task"]["mode"], config["task"].get("description", ""),
+                           config["capture_settings"], config["physical_setup"], captured, burst_info,
+                           **task_trace.log_fields())
+        append_log(run_data, entry)
+        if run_data.sync_yaml:
+            write_run_yaml(run_path, run_data)
+        print(f"[OK] wrote {run_data.path}")
 
     finally:
-        if use_camera:
-            cam.close()
+        if writer is not None:
+            writer.close()
+        if devices is not None:
+            devices.close()
+        tracer.end_task(task_trace)
+        tracer.save(proj_dir / "traces", task_trace.name)
 
 if __name__ == "__main__":
-    main()
+    import sys
+    main(os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+SLM → 相机 同步采集调度：
+  - 第 N 张图案显示后，在后台线程上传第 N+1 张（upload 与 settle、曝光重叠）
+  - 每次 show 之后强制等待 settle_ms，再开始曝光：相机在取流期间处于软触发（HikCamera.stream() 的默认行为），
+    settle 结束后才清空缓存并发送 TriggerSoftware，帧的曝光一定落在当前图案显示期间
+  - 各阶段（upload/show/settle/capture）的实际起止时间记入 Timeline，超出预算时只告警并标记，不中止采集
+  - Timeline 可保存为 JSON，并用 replay() 在模拟设备上按记录的耗时重放
+
+    sched = AcquisitionScheduler(slm, cam, settle_ms=30, exposure_us=581046.0)
+    timeline = sched.run(patterns, out_paths, writer=writer)
+    timeline.save(proj_dir / "timeline.json")
+"""
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Timeline:
+    """按阶段记录时间戳；时间为相对 t0 的秒数"""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.wall_t0 = time.time()
+        self.events = []
+
+    def now(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def add(self, index: int, device: str, phase: str, start: float, end: float, **extra) -> dict:
+        ev = {"index": index, "device": device, "phase": phase,
+              "start": round(start, 6), "end": round(end, 6), **extra}
+        self.events.append(ev)
+        return ev
+
+    def durations(self, phase: str):
+        return [e["end"] - e["start"] for e in self.events if e["phase"] == phase]
+
+    def summary(self) -> dict:
+        """各阶段耗时中位数（秒）与总时长"""
+        out = {p: statistics.median(self.durations(p))
+               for p in sorted({e["phase"] for e in self.events})}
+        out["total"] = max((e["end"] for e in self.events), default=0.0)
+        return out
+
+    def to_dict(self) -> dict:
+        return {"wall_t0": self.wall_t0, "events": self.events}
+
+    def save(self, path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path) -> "Timeline":
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        tl = cls()
+        tl.wall_t0 = d.get("wall_t0", tl.wall_t0)
+        tl.events = d.get("events", [])
+        return tl
+
+
+class AcquisitionScheduler:
+    """
+      - settle_ms : show 完成到开始曝光之间的最短等待
+      - budgets_ms: 各阶段延迟预算，如 {"upload": 200, "show": 20, "capture": 800}；仅用于监测：
+                    超出时打印告警并在事件中标记 over_budget，不会跳过、重试或中止该帧
+    相机需支持 stream/grab_array/snap_async（HikCamera 及其模拟实现），stream() 内每次取帧只返回调用之后
+    才开始曝光的帧（见 HikCamera.start_stream）。
+    """
+
+    def __init__(self, slm, cam, settle_ms: float = 30, exposure_us: float = None,
+                 timeout_ms: int = 3000, budgets_ms: dict = None, verbose: bool = True):
+        self.slm = slm
+        self.cam = cam
+        self.settle_ms = settle_ms
+        self.exposure_us = exposure_us
+        self.timeout_ms = timeout_ms
+        self.budgets_ms = budgets_ms or {}
+        self.verbose = verbose
+
+    def _timed(self, timeline, index, device, phase, fn, *args):
+        start = timeline.now()
+        result = fn(*args)
+        end = timeline.now()
+        extra = {}
+        budget = self.budgets_ms.get(phase)
+        if budget is not None and (end - start) * 1000.0 > budget:
+            extra["over_budget"] = True
+            if self.verbose:
+                print(f"[WARN] #{index} {phase} 用时 {(end - start) * 1000.0:.1f}ms 超出预算 {budget}ms")
+        timeline.add(index, device, phase, start, end, **extra)
+        return result
+
+    def run(self, patterns, out_paths=None, writer=None, on_frame=None) -> Timeline:
+        """
+        依次显示 patterns 并各拍一帧：
+          - out_paths + writer: 每帧交给 AsyncFrameWriter 写到对应路径
+          - on_frame(i, frame): 否则把帧的独立副本交给回调
+        返回本次的 Timeline。
+        """
+        patterns = [str(p) for p in patterns]
+        timeline = Timeline()
+        if not patterns:
+            return timeline
+        if self.exposure_us is not None:
+            self.cam.set_exposure(self.exposure_us)
+
+        # 软触发会话：capture 阶段才触发曝光，缓存中换图案之前的帧被清空
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="slm-upload") as pool, \
+                self.cam.stream(software_trigger=True):
+            def upload(k):
+                if k >= len(patterns):
+                    return None
+                return pool.submit(self._timed, timeline, k, "slm", "upload", self.slm.load, patterns[k])
+
+            pending = upload(0)
+            for i in range(len(patterns)):
+                dh = pending.result()
+                if dh is None or not self._timed(timeline, i, "slm", "show", self.slm.show_handle, dh):
+                    if self.verbose:
+                        print(f"[WARN] #{i} 图案上传/显示失败，跳过: {patterns[i]}")
+                    if dh is not None:
+                        self.slm.release(dh)
+                    pending = upload(i + 1)
+                    continue
+
+                # show 完成后立即上传下一张，与 settle 和曝光重叠
+                pending = upload(i + 1)
+                shown_at = timeline.now()
+                if self.settle_ms:
+                    time.sleep(self.settle_ms / 1000.0)
+                timeline.add(i, "slm", "settle", shown_at, timeline.now())
+
+                if writer is not None and out_paths is not None:
+                    ok = self._timed(timeline, i, "camera", "capture", self.cam.snap_async,
+                                     writer, out_paths[i], None, self.timeout_ms)
+                else:
+                    frame = self._timed(timeline, i, "camera", "capture", self.cam.grab_array,
+                                        None, self.timeout_ms, True)
+                    ok = frame is not None
+                    if ok and on_frame is not None:
+                        on_frame(i, frame)
+                if not ok and self.verbose:
+                    print(f"[ERR] #{i} 拍摄失败: {patterns[i]}")
+                self.slm.release(dh)
+
+        if self.verbose:
+            s = timeline.summary()
+            print("[INFO] 阶段耗时中位数(ms): " +
+                  ", ".join(f"{k}={v * 1000.0:.1f}" for k, v in s.items()))
+        return timeline
+
+
+def simulated_devices(timeline: Timeline, verbose: bool = False):
+    """按 Timeline 中记录的中位耗时构造模拟 SLM 与相机"""
+    from src.camera import HikCamera
+    from src.sim_camera import FakeMvCamera
+    from src.slm_ctrl import SLM, FakeSLMBackend
+
+    def med(phase):
+        d = timeline.durations(phase)
+        return statistics.median(d) if d else 0.0
+
+    backend = FakeSLMBackend(load_latency_s=med("upload"), show_latency_s=med("show"))
+    slm = SLM(verbose=verbose, backend=backend)
+    slm.init()
+    replay_cam = type("ReplayMvCamera", (FakeMvCamera,), {"frame_latency_s": med("capture")})
+    cam = HikCamera(sdk=replay_cam)
+    if not cam.open():
+        cam.close()
+        raise RuntimeError("模拟相机打开失败")
+    return slm, cam
+
+
+def replay(timeline_path, patterns, settle_ms: float = 30, budgets_ms: dict = None) -> Timeline:
+    """
+    在模拟设备上重放一次记录的采集：用于比较调度策略，不需要硬件。
+    模拟 SLM 的 load 需要真实存在的文件路径，patterns 可沿用原始图案列表。
+    """
+    recorded = Timeline.load(timeline_path)
+    slm, cam = simulated_devices(recorded)
+    try:
+        sched = AcquisitionScheduler(slm, cam, settle_ms=settle_ms, budgets_ms=budgets_ms, verbose=True)
+        return sched.run(patterns)
+    finally:
+        cam.close()
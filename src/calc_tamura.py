@@ -1,60 +1,182 @@
-import numpy as np
-import cv2
+import argparse
 import os
-import matplotlib.pyplot as plt
+import sys
+import time
 
-def calculate_tamura_coefficient(image):
+import numpy as np
+
+# 以脚本方式运行时也能导入项目内的 utils
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.fn import imread
+from utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")    # 只在实际计算时导入，calc_wiener 等引用本模块时不付出 cv2 的导入开销
+
+# ========== 预处理 ==========
+
+def prepare_gray(image, roi=None, downsample=1, dtype=np.float32):
+    """
+    转为单通道浮点图：
+      - roi       : (x, y, w, h)，先裁剪再计算，只处理感兴趣区域
+      - downsample: 整数倍降采样（INTER_AREA），用于实时对焦时降低计算量
+      - dtype     : float32 足够用于对焦评价，float64 与旧版结果一致
+    """
+    if roi is not None:
+        x, y, w, h = roi
+        image = image[y:y + h, x:x + w]
     # 确保输入图像是灰度图像
-    if len(image.shape) > 2:
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if image.ndim > 2:
+        if image.shape[2] == 1:
+            image = image[:, :, 0]
+        else:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if downsample and downsample > 1:
+        h, w = image.shape[:2]
+        image = cv2.resize(image, (max(1, w // downsample), max(1, h // downsample)),
+                           interpolation=cv2.INTER_AREA)
+    return image.astype(dtype, copy=False)
 
-    # 计算图像的梯度（使用Sobel算子）
-    grad_x = cv2.Sobel(image, cv2.CV_64F, 1, 0, ksize=3)  # x方向的梯度
-    grad_y = cv2.Sobel(image, cv2.CV_64F, 0, 1, ksize=3)  # y方向的梯度
-    grad_magnitude = np.sqrt(grad_x**2 + grad_y**2)  # 计算梯度幅度
+def _sobel(gray):
+    ddepth = cv2.CV_64F if gray.dtype == np.float64 else cv2.CV_32F
+    grad_x = cv2.Sobel(gray, ddepth, 1, 0, ksize=3)  # x方向的梯度
+    grad_y = cv2.Sobel(gray, ddepth, 0, 1, ksize=3)  # y方向的梯度
+    return grad_x, grad_y
 
-    # 计算梯度幅度的平均值和标准差
+# ========== 对焦评价函数（输入为 prepare_gray 的结果） ==========
+
+def tamura(gray):
+    """Tamura 系数 sqrt(std/mean) of |∇I|，越大越清晰"""
+    grad_x, grad_y = _sobel(gray)
+    grad_magnitude = np.sqrt(grad_x**2 + grad_y**2)  # 计算梯度幅度
     mean_grad = np.mean(grad_magnitude)  # 平均梯度幅度
     std_grad = np.std(grad_magnitude)    # 梯度幅度的标准差
+    return np.sqrt(std_grad / mean_grad)
 
-    # 计算Tamura系数
-    tamura_coefficient = np.sqrt(std_grad / mean_grad)
-
-    return tamura_coefficient
-
-# 输入路径（可以是文件或文件夹）
-input_path = '/Volumes/U1/SLM/reslt_1010/measure1.jpg'  # 替换为你的输入路径
-
-# 判断输入的是文件还是文件夹
-if os.path.isdir(input_path):  # 输入是文件夹
-    tc_values = []
-    for filename in os.listdir(input_path):
-        if filename.endswith(".jpg") or filename.endswith(".png"):  # 只处理JPG和PNG文件
-            image_path = os.path.join(input_path, filename)
-            image = cv2.imread(image_path)
-            if image is not None:
-                tc = calculate_tamura_coefficient(image)
-                tc_values.append(tc)
-    
-    # 打印所有图像的Tamura系数
-    for idx, tc in enumerate(tc_values):
-        print(f"Image {idx + 1} Tamura Coefficient: {tc}")
-    
-    # 绘制Tamura系数的曲线图
-    plt.plot(tc_values, marker='o', linestyle='-', color='b')
-    plt.title('Tamura Coefficients for Images in Folder')
-    plt.xlabel('Image Index')
-    plt.ylabel('Tamura Coefficient')
-    plt.grid(True)
-    plt.show()
-
-elif os.path.isfile(input_path):  # 输入是单个文件
-    image = cv2.imread(input_path)
-    if image is not None:
-        tc = calculate_tamura_coefficient(image)
-        print(f"Tamura Coefficient for the input image: {tc}")
-    else:
-        print("Failed to read the image.")
+def variance_of_laplacian(gray):
+    ddepth = cv2.CV_64F if gray.dtype == np.float64 else cv2.CV_32F
+    return cv2.Laplacian(gray, ddepth).var()
+
+def brenner(gray):
+    """Brenner 梯度：水平方向相隔 2 像素差值的平方均值"""
+    d = gray[:, 2:] - gray[:, :-2]
+    return float(np.mean(d * d))
+
+def gradient_energy(gray):
+    """梯度能量（Tenengrad）：Sobel 梯度平方和的均值"""
+    grad_x, grad_y = _sobel(gray)
+    return float(np.mean(grad_x * grad_x + grad_y * grad_y))
+
+METRICS = {
+    "tamura": tamura,
+    "laplacian": variance_of_laplacian,
+    "brenner": brenner,
+    "gradient": gradient_energy,
+}
+
+def focus_metric(image, metric="tamura", roi=None, downsample=1, dtype=np.float32):
+    """对一张图像计算对焦评价值"""
+    return float(METRICS[metric](prepare_gray(image, roi, downsample, dtype)))
 
-else:
-    print("The specified path is neither a file nor a folder.")
+def focus_metric_batch(images, metric="tamura", roi=None, downsample=1, dtype=np.float32):
+    """
+    对图像堆栈 (N,H,W[,C]) 或图像列表计算，返回长度为 N 的 ndarray。
+    只有 brenner 在同尺寸灰度堆栈上整体向量化；tamura / laplacian / gradient 是逐张调用 focus_metric 的
+    便捷循环：cv2 的 Sobel / Laplacian 已经 SIMD 优化，改用 NumPy 在堆栈上整体计算反而更慢
+    （8x512x612 实测 gradient 32 -> 47 ms，laplacian 6.6 -> 19.8 ms）。逐张计算时不保留中间灰度图。
+    """
+    fn = METRICS[metric]
+    if metric != "brenner":
+        return np.array([fn(prepare_gray(img, roi, downsample, dtype)) for img in images], dtype=np.float64)
+    grays = [prepare_gray(img, roi, downsample, dtype) for img in images]
+    if grays and all(g.shape == grays[0].shape for g in grays):
+        stack = np.stack(grays)
+        d = stack[:, :, 2:] - stack[:, :, :-2]
+        return np.mean(d * d, axis=(1, 2))
+    return np.array([fn(g) for g in grays], dtype=np.float64)
+
+def calculate_tamura_coefficient(image):
+    """兼容旧接口：整幅图 float64 Tamura 系数"""
+    return tamura(prepare_gray(image, dtype=np.float64))
+
+# ========== 实时对焦 ==========
+
+def live_focus(cam, metric="tamura", roi=None, downsample=4, exposure_us=None,
+               timeout_ms=1500, duration_s=None, callback=None, slots=4):
+    """
+    对 HikCamera 连续采集并打分（环形缓冲零拷贝数组，不落盘），用于标定模式下手动对焦。
+    相机按自身帧率持续出帧，打分跟不上时总是取最新一帧（cam.frames(latest=True)）。
+    callback(score, fps) 默认打印；duration_s 为 None 时一直运行直到 Ctrl+C。
+    """
+    if callback is None:
+        def callback(score, fps):
+            print(f"\r[FOCUS] {metric}={score:.5f}  {fps:5.1f} Hz", end="", flush=True)
+    if exposure_us is not None:
+        cam.set_exposure(exposure_us)
+    t_start = time.perf_counter()
+    last = t_start
+    try:
+        with cam.continuous(slots=slots, overwrite=True):
+            while duration_s is None or time.perf_counter() - t_start < duration_s:
+                # 每次只取一帧：超时无帧时回到循环检查 duration_s，而不是结束预览
+                for frame, _ in cam.frames(timeout_ms=timeout_ms, latest=True, max_frames=1):
+                    score = focus_metric(frame, metric, roi, downsample)
+                    now = time.perf_counter()
+                    callback(score, 1.0 / max(now - last, 1e-9))
+                    last = now
+    except KeyboardInterrupt:
+        pass
+    print()
+
+# ========== 命令行 ==========
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="图像对焦评价（文件或文件夹）")
+    ap.add_argument("input_path", help="图像文件或文件夹")
+    ap.add_argument("--metric", choices=list(METRICS), default="tamura")
+    ap.add_argument("--downsample", type=int, default=1)
+    ap.add_argument("--roi", type=int, nargs=4, metavar=("X", "Y", "W", "H"), default=None)
+    ap.add_argument("--no-plot", action="store_true", help="文件夹模式下不画曲线")
+    return ap.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    input_path = args.input_path
+
+    # 判断输入的是文件还是文件夹
+    if os.path.isdir(input_path):  # 输入是文件夹
+        tc_values = []
+        for filename in sorted(os.listdir(input_path)):
+            if filename.endswith(".jpg") or filename.endswith(".png"):  # 只处理JPG和PNG文件
+                image_path = os.path.join(input_path, filename)
+                image = imread(image_path)
+                if image is not None:
+                    tc = focus_metric(image, args.metric, args.roi, args.downsample)
+                    tc_values.append(tc)
+
+        # 打印所有图像的评价值
+        for idx, tc in enumerate(tc_values):
+            print(f"Image {idx + 1} {args.metric}: {tc}")
+
+        if not args.no_plot:
+            import matplotlib.pyplot as plt
+
+            # 绘制评价值的曲线图
+            plt.plot(tc_values, marker='o', linestyle='-', color='b')
+            plt.title(f'{args.metric} for Images in Folder')
+            plt.xlabel('Image Index')
+            plt.ylabel(args.metric)
+            plt.grid(True)
+            plt.show()
+
+    elif os.path.isfile(input_path):  # 输入是单个文件
+        image = imread(input_path)
+        if image is not None:
+            tc = focus_metric(image, args.metric, args.roi, args.downsample)
+            print(f"{args.metric} for the input image: {tc}")
+        else:
+            print("Failed to read the image.")
+
+    else:
+        print("The specified path is neither a file nor a folder.")
@@ -1,15 +1,69 @@
+import argparse
 import numpy as np
 from PIL import Image
-import torch
 import os
+import sys
+
+# 以脚本方式运行时也能导入项目内的 utils
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.fn import collect_images
+from utils.lazy import lazy_import
+
+torch = lazy_import("torch")    # 第一次计算时才导入（约 2s），仅引用 load_image 等工具函数时不加载
+from src.calc_tamura import calculate_tamura_coefficient
 
 # 自动设备选择
 # device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 device = "cpu"
 # ========== 工具函数 ==========
 
+def load_image(src, dtype=np.float64, bit_depth: int = None, reduce: str = None):
+    """
+    读入图像为 [0,1] 浮点 HxWxC 数组（dtype 指定精度，float32 可省一半内存）：
+      - src 为路径：PIL 读取后除以 255
+      - src 为 .npy：整型按 bit_depth（缺省为 dtype 位宽）归一化；浮点数据（如连拍合成帧）应已在 [0,1]，
+        仍为原始计数（最大值 > 1）时需给出 bit_depth 按 2**bit_depth-1 归一化，否则报错
+      - src 为 ndarray（如 HikCamera.grab_array() 的原始帧）：按 bit_depth 或整型位宽归一化，保留完整位深
+      - (N,H,W[,C]) 堆栈（如连拍的 *-stack.npy）：需指定 reduce="mean"/"median" 合成为一帧，否则报错
+    """
+    is_npy = not isinstance(src, np.ndarray) and str(src).lower().endswith(".npy")
+    if isinstance(src, np.ndarray):
+        arr = src
+    elif is_npy:
+        arr = np.load(src, mmap_mode="r")
+    else:
+        arr = np.asarray(Image.open(src))
+        if arr.dtype == np.uint8:
+            arr = arr.astype(dtype)
+            arr /= 255.0
+
+    scale = None    # 归一化分母；浮点数据且未给 bit_depth 时为 None
+    if bit_depth:
+        scale = float((1 << bit_depth) - 1)
+    elif np.issubdtype(arr.dtype, np.integer):
+        scale = float(np.iinfo(arr.dtype).max)
+
+    if arr.ndim == 4 or (arr.ndim == 3 and arr.shape[-1] not in (1, 3, 4)):
+        if reduce not in ("mean", "median"):
+            raise ValueError(f"{src if is_npy else '输入'} 是 {arr.shape} 的多帧堆栈，"
+                             "请指定 reduce='mean' 或 'median' 合成为单帧")
+        arr = arr.mean(axis=0, dtype=dtype) if reduce == "mean" else np.median(arr, axis=0)
+
+    if scale is not None:
+        arr = arr.astype(dtype)
+        arr /= scale
+    else:
+        arr = np.array(arr, dtype=dtype) if is_npy else arr.astype(dtype, copy=False)   # .npy 为只读映射，需读入
+        if is_npy and arr.size and float(arr.max()) > 1.0:
+            raise ValueError(f"{src} 为浮点原始计数（最大值 {float(arr.max()):.1f}），请指定 bit_depth 归一化")
+    if arr.ndim == 2:
+        arr = arr[:, :, None]
+    return arr
+
 def padded_diffuser(path):
-    psf = np.array(Image.open(path))/255.0
+    psf = load_image(path)
     return psf
 
 def ramp_padding(img,pad_width=((105, 105),(190,190),(0,0))):
@@ -40,25 +94,287 @@ def save_tensor_img(tensor, path, crop_coords=None):
     img_uint8 = np.clip(img_np * 255.0, 0, 255).astype(np.uint8)
     Image.fromarray(img_uint8).save(path)
 
+def center_fit(t, shape):
+    """把 (...,H,W) 张量围绕中心裁剪或补零到 shape，保持 PSF 中心位置不变"""
+    H, W = t.shape[-2:]
+    h, w = shape
+    if H > h:
+        top = (H - h) // 2
+        t = t[..., top:top + h, :]
+    if W > w:
+        left = (W - w) // 2
+        t = t[..., :, left:left + w]
+    H, W = t.shape[-2:]
+    if H < h or W < w:
+        ph, pw = h - H, w - W
+        t = torch.nn.functional.pad(t, (pw // 2, pw - pw // 2, ph // 2, ph - ph // 2))
+    return t
+
+DTYPES = {"float32": np.float32, "float64": np.float64}   # torch dtype 同名，用时再取
+
+# ========== 批量反卷积 ==========
+
+class WienerDeconvolver:
+    """
+    一个 PSF 对应多张测量图的 Wiener 反卷积：
+      - PSF 只读取、归一化一次
+      - PSF 频谱与滤波器 conj(H)/(|H|^2+delta) 按 (delta, 尺寸) 缓存
+      - deconvolve() 对 (B,C,H,W) 的一批测量做一次批量 rfft2/irfft2
+      - reconstruct() 在内存上限内选择整幅 / 逐通道执行；分块 (overlap-save) 为近似，只在显式指定时使用
+      - precision="float32" 时全程使用 float32/complex64
+    """
+    def __init__(self, psf, delta=80000, device=device, precision="float64"):
+        self.delta = delta
+        self.device = device
+        self.np_dtype, self.dtype = DTYPES[precision], getattr(torch, precision)
+        psf_np = load_image(psf, self.np_dtype)
+        psf_tensor = torch.from_numpy(psf_np).permute(2, 0, 1).sum(dim=0, keepdim=True).unsqueeze(0)
+        self.psf = (psf_tensor / psf_tensor.max()).to(device)
+        self._spectra = {}   # shape -> (conj(H), |H|^2)
+        self._filters = {}   # (delta, shape) -> 滤波器
+
+    def spectrum(self, shape):
+        shape = tuple(shape)
+        if shape not in self._spectra:
+            psf_fft = torch.fft.rfft2(center_fit(self.psf, shape))
+            self._spectra[shape] = (torch.conj(psf_fft), torch.abs(psf_fft) ** 2)
+        return self._spectra[shape]
+
+    def wiener_filter(self, shape, delta=None):
+        delta = self.delta if delta is None else delta
+        key = (delta, tuple(shape))
+        if key not in self._filters:
+            H_conj, H_abs = self.spectrum(shape)
+            self._filters[key] = H_conj / (H_abs + delta)
+        return self._filters[key]
+
+    def deconvolve(self, blur, delta=None):
+        """blur: (B,C,H,W) 张量，返回同尺寸的重建结果（已 ifftshift）"""
+        blur = blur.to(self.device, self.dtype)
+        shape = blur.shape[-2:]
+        blur_fft = torch.fft.rfft2(blur)
+        out = torch.fft.irfft2(self.wiener_filter(shape, delta) * blur_fft, s=shape)
+        return torch.fft.ifftshift(out, dim=(-2, -1))
+
+    def estimate_bytes(self, shape, planes=1, out_planes=0):
+        """
+        对 planes 个 HxW 平面做一次反卷积的峰值内存估计：
+        输入、irfft2 输出、ifftshift 副本（即返回的结果）各一份实数平面，rfft2 与滤波乘积各一份半频谱复数平面，
+        再加上该尺寸下缓存的 conj(H)、|H|^2 与滤波器，以及 out_planes 个预分配的 HxW 输出平面
+        （逐通道 / 分块执行时整幅结果缓冲常驻）。
+        """
+        h, w = shape
+        item = torch.finfo(self.dtype).bits // 8
+        real = h * w * item
+        half = h * (w // 2 + 1) * item * 2
+        return planes * (3 * real + 2 * half) + (2 * half + half // 2) + out_planes * real
+
+    def reconstruct(self, blur, delta=None, max_bytes=None, mode="auto", tile=None, margin=64):
+        """
+        单张测量图 (C,H,W) 或 (1,C,H,W) 的重建，返回 (1,C,H,W)：
+          - mode="full"   : 所有通道一次完成
+          - mode="channel": 逐通道执行，同一时刻只有一个通道的频谱
+          - mode="tiled"  : 分块近似，需显式指定：每块四周多取 margin 像素，只保留中心，
+                            每块使用裁剪到 tile+2*margin 的 PSF 中心部分。结果不是精确的：
+                            Wiener 滤波器的空间响应不是有限支撑，即使 PSF 很小，块边界附近也有误差；
+                            PSF 铺满传感器（如全幅 FZA 掩膜）时裁剪丢掉了 PSF 的大部分，结果错误，不应使用
+          - mode="auto"   : full，超过 max_bytes 时改为 channel；channel（含整幅输出缓冲）仍超出时抛
+                            MemoryError，不会自动改用近似的 tiled
+        """
+        if blur.dim() == 3:
+            blur = blur.unsqueeze(0)
+        C, H, W = blur.shape[-3:]
+        if mode == "auto":
+            if max_bytes is None or self.estimate_bytes((H, W), C) <= max_bytes:
+                mode = "full"
+            else:
+                mode = "channel"
+                need = self.estimate_bytes((H, W), 1, out_planes=C)
+                if need > max_bytes:
+                    raise MemoryError(f"逐通道重建约需 {need / 2**20:.0f} MB，超出上限 {max_bytes / 2**20:.0f} MB"
+                                      "（分块为近似结果，需要时请显式指定 mode='tiled'）")
+        elif mode == "tiled" and tile is None and max_bytes is not None:
+            tile = self.fit_tile(max_bytes, margin, (H, W), C)
+
+        if mode == "full":
+            return self.deconvolve(blur, delta)
+        out = torch.empty((1, C, H, W), dtype=self.dtype, device=self.device)
+        for c in range(C):
+            plane = blur[:, c:c + 1]
+            if mode == "channel":
+                out[:, c:c + 1] = self.deconvolve(plane, delta)
+            elif mode == "tiled":
+                out[:, c:c + 1] = self._deconvolve_tiled(plane, delta, tile or 512, margin)
+            else:
+                raise ValueError(f"未知 mode: {mode}")
+        return out
+
+    def fit_tile(self, max_bytes, margin, shape, channels=1):
+        """
+        在内存上限内能放下的最大分块边长（不小于 margin）。
+        常驻部分按整幅尺寸计：channels 个输出平面、单通道分块结果与补边后的输入各一个平面。
+        """
+        h, w = shape
+        resident = (channels + 2) * h * w * (torch.finfo(self.dtype).bits // 8)
+        tile = max(shape)
+        while tile > margin and self.estimate_bytes((tile + 2 * margin,) * 2) + resident > max_bytes:
+            tile //= 2
+        return max(tile, margin)
+
+    def _deconvolve_tiled(self, plane, delta, tile, margin):
+        """plane: (1,1,H,W)；用同一尺寸 (tile+2*margin) 的滤波器逐块反卷积（近似，见 reconstruct()）"""
+        H, W = plane.shape[-2:]
+        ny, nx = -(-H // tile), -(-W // tile)
+        pad_h, pad_w = ny * tile - H, nx * tile - W
+        padded = torch.nn.functional.pad(plane, (margin, margin + pad_w, margin, margin + pad_h), mode="replicate")
+        out = torch.empty((1, 1, H, W), dtype=self.dtype, device=self.device)
+        for iy in range(ny):
+            for ix in range(nx):
+                y0, x0 = iy * tile, ix * tile
+                block = padded[..., y0:y0 + tile + 2 * margin, x0:x0 + tile + 2 * margin]
+                rec = self.deconvolve(block, delta)[..., margin:margin + tile, margin:margin + tile]
+                h, w = min(tile, H - y0), min(tile, W - x0)
+                out[..., y0:y0 + h, x0:x0 + w] = rec[..., :h, :w]
+        return out
+
+    def sweep(self, blur, deltas, chunk=None):
+        """
+        同一张测量图在多个 delta 下的重建：blur_fft、conj(H)、|H|^2 只算一次，
+        各 delta 的滤波器沿批维度广播，一次 irfft2 得到 (D,C,H,W) 结果。
+        chunk 限制每次并行的 delta 个数以控制内存。
+        """
+        blur = blur.to(self.device, self.dtype)
+        if blur.dim() == 3:
+            blur = blur.unsqueeze(0)
+        shape = blur.shape[-2:]
+        blur_fft = torch.fft.rfft2(blur)
+        H_conj, H_abs = self.spectrum(shape)
+        deltas = torch.as_tensor(deltas, dtype=H_abs.dtype, device=self.device).reshape(-1, 1, 1, 1)
+        chunk = chunk or len(deltas)
+        outs = []
+        for i in range(0, len(deltas), chunk):
+            filters = H_conj / (H_abs + deltas[i:i + chunk])
+            outs.append(torch.fft.irfft2(filters * blur_fft, s=shape))
+        return torch.fft.ifftshift(torch.cat(outs), dim=(-2, -1))
+
+    def load_batch(self, sources):
+        """把若干路径/数组读成 (B,C,H,W) 张量；尺寸需一致"""
+        arrs = [load_image(src, self.np_dtype) for src in sources]
+        return torch.from_numpy(np.stack(arrs)).permute(0, 3, 1, 2)
+
+    def process(self, sources, out_paths, batch_size=8, delta=None, max_bytes=None, mode="auto"):
+        """
+        分批读取、反卷积并保存；返回保存的路径列表。
+        给定 max_bytes 或非 auto 的 mode 时逐张调用 reconstruct()，按内存上限选择执行方式。
+        """
+        saved = []
+        if max_bytes is not None or mode != "auto":
+            batch_size = 1
+        for i in range(0, len(sources), batch_size):
+            batch_src = sources[i:i + batch_size]
+            if batch_size == 1:
+                result = self.reconstruct(self.load_batch(batch_src), delta, max_bytes, mode)
+            else:
+                result = self.deconvolve(self.load_batch(batch_src), delta)
+            for j, out_path in enumerate(out_paths[i:i + batch_size]):
+                save_tensor_img(result[j:j + 1], out_path)
+                saved.append(out_path)
+        return saved
+
+def log_deltas(lo, hi, n):
+    """在 [lo, hi] 内按对数等间隔取 n 个 delta"""
+    return np.logspace(np.log10(lo), np.log10(hi), int(n)).tolist()
+
+def parse_deltas(text):
+    """'1e4,1e5,1e6' 为列表；'1e4:1e9:11' 为对数区间 lo:hi:n"""
+    if ":" in text:
+        lo, hi, n = text.split(":")
+        return log_deltas(float(lo), float(hi), int(n))
+    return [float(t) for t in text.split(",") if t.strip()]
+
+def sharpness(tensor):
+    """重建结果 (C,H,W) 的 Tamura 系数，越大越清晰"""
+    img = normalize_tensor_img(tensor.mean(dim=0)).cpu().numpy().astype(np.float32)
+    return float(calculate_tamura_coefficient(img))
+
+def sweep_delta(psf_path, blur_path, deltas, out_dir=None, chunk=None):
+    """
+    对一对 PSF/测量图扫描 delta，用 Tamura 系数打分，返回 (best_delta, [(delta, score), ...])。
+    给定 out_dir 时保存每个 delta 的重建 r-<名字>-d<delta>.png。
+    """
+    deconv = WienerDeconvolver(psf_path)
+    results = deconv.sweep(deconv.load_batch([blur_path]), deltas, chunk)
+    scores = [(float(d), sharpness(r)) for d, r in zip(deltas, results)]
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(str(blur_path)))[0] if isinstance(blur_path, (str, os.PathLike)) else "blur"
+        for (d, _), r in zip(scores, results):
+            save_tensor_img(r.unsqueeze(0), os.path.join(out_dir, f"r-{stem}-d{d:.3g}.png"))
+    best = max(scores, key=lambda t: t[1])[0]
+    return best, scores
+
 # ========== 主流程函数 ==========
 
-def process_one_pair(psf_path, blur_path, delta=80000, output_path="Test_Wiener.png"):
-    # 加载PSF
-    psf_np = padded_diffuser(psf_path)
+def process_one_pair(psf_path, blur_path, delta=80000, output_path="Test_Wiener.png",
+                     precision="float64", max_bytes=None, mode="auto"):
+    """psf_path / blur_path 可以是文件路径，也可以直接是相机返回的 ndarray"""
+    deconv = WienerDeconvolver(psf_path, delta, precision=precision)
+    deconv.process([blur_path], [output_path], max_bytes=max_bytes, mode=mode)
 
-    psf_tensor = torch.tensor(psf_np).permute(2, 0, 1).sum(dim=0, keepdim=True).unsqueeze(0).to(device)
+def process_folder(psf_path, blur_dir, out_dir=None, delta=80000, batch_size=8,
+                   precision="float64", max_bytes=None, mode="auto"):
+    """同一个 PSF 处理文件夹内全部测量图，输出 r-<原文件名>.png"""
+    blur_paths = [p for p in collect_images(blur_dir)["images"]
+                  if os.path.abspath(p) != os.path.abspath(psf_path)
+                  and not os.path.basename(p).startswith("r-")]
+    out_dir = out_dir or blur_dir
+    os.makedirs(out_dir, exist_ok=True)
+    out_paths = [os.path.join(out_dir, f"r-{os.path.splitext(os.path.basename(p))[0]}.png")
+                 for p in blur_paths]
+    deconv = WienerDeconvolver(psf_path, delta, precision=precision)
+    return deconv.process(blur_paths, out_paths, batch_size, max_bytes=max_bytes, mode=mode)
 
-    # 加载模糊图像
-    blur_np = np.array(Image.open(blur_path))/255.0
-    blur_tensor = torch.tensor(blur_np).permute(2, 0, 1).unsqueeze(0).to(device)
-    # Wiener 反卷积
-    result = WieNer(blur_tensor, psf_tensor/psf_tensor.max(), delta)
-    # 保存图像，裁剪区域可选
-    save_tensor_img(result, output_path)
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Wiener 反卷积：一个 PSF 对应一张或一个文件夹的测量图")
+    ap.add_argument("--psf", required=True, help="PSF 图像路径")
+    ap.add_argument("--blur", required=True, help="测量图路径或文件夹")
+    ap.add_argument("--out", default=None, help="输出文件（单张）或文件夹（批量）")
+    ap.add_argument("--delta", type=float, default=80000)
+    ap.add_argument("--batch-size", type=int, default=8)
+    ap.add_argument("--sweep", default=None,
+                    help="扫描 delta：'1e4,1e5,1e6' 或对数区间 '1e4:1e9:11'（仅单张测量图）")
+    ap.add_argument("--precision", choices=list(DTYPES), default="float64")
+    ap.add_argument("--max-mem-mb", type=float, default=None, help="单张重建的峰值内存上限 (MB)")
+    ap.add_argument("--mode", choices=["auto", "full", "channel", "tiled"], default="auto",
+                    help="auto: 整幅，超出内存上限时逐通道，仍超出时报错；tiled 为分块近似，不适用于铺满传感器的 PSF")
+    return ap.parse_args(argv)
 
 # ========== 示例运行 ==========
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        args = parse_args()
+        max_bytes = int(args.max_mem_mb * 1024 * 1024) if args.max_mem_mb else None
+        if args.sweep:
+            best, scores = sweep_delta(args.psf, args.blur, parse_deltas(args.sweep), args.out)
+            for d, score in scores:
+                print(f"delta={d:<12.4g} tamura={score:.5f}" + ("  <- best" if d == best else ""))
+            print(f"Completed！最佳 delta = {best:.4g}")
+        else:
+            try:
+                if os.path.isdir(args.blur):
+                    saved = process_folder(args.psf, args.blur, args.out, args.delta, args.batch_size,
+                                           args.precision, max_bytes, args.mode)
+                    print(f"Completed！共 {len(saved)} 张")
+                else:
+                    process_one_pair(args.psf, args.blur, args.delta, args.out or "Test_Wiener.png",
+                                     args.precision, max_bytes, args.mode)
+                    print("Completed！")
+            except MemoryError as e:
+                print(f"[ERR] {e}")
+                sys.exit(1)
+        sys.exit(0)
+
     psf_path = r'D:\qjy\camera_slm_pipeline\output\exp020-1013-99c180\Image_20251013211130508.png'
     blur_path = r'D:\qjy\camera_slm_pipeline\output\exp020-1013-99c180\Image_20251013211809704.png'
     output_path = r'D:\qjy\camera_slm_pipeline\output\exp020-1013-99c180\Image_r.jpg'
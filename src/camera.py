@@ -1,9 +1,34 @@
 # -*- coding: utf-8 -*-
+import os
+import re
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from ctypes import *
 from ctypes import byref, sizeof, memset, POINTER, c_ubyte, cast
 
-from MvImport.MvCameraControl_class import *  # 你已确认有 SDK，这里直接使用
+import numpy as np
+
+from src.camera_features import DEFAULT_PROFILE, FeatureCache
+from src.frame_ring import FrameRing
+from src.frame_stack import FrameAccumulator, StackWriter
+from utils.lazy import lazy_import
+from utils.trace import span, traced
+
+# 海康 SDK 的 ctypes 封装与结构体定义（MvImport/，约 2400 行）在第一次打开相机 / 取帧时才导入，
+# 只用到 pixel_layout / frame_view 等工具函数时只读取像素格式常量（PixelType_header）；
+# DLL 本身在第一次调用 SDK 函数时才加载
+mv = lazy_import("MvImport.MvCameraControl_class")
+
+_frame_callback = None
+def frame_callback_type():
+    """SDK 图像回调类型：void cb(unsigned char* pData, MV_FRAME_OUT_INFO_EX* pFrameInfo, void* pUser)，Windows 下为 stdcall"""
+    global _frame_callback
+    if _frame_callback is None:
+        winfun_ctype = WINFUNCTYPE if sys.platform.startswith("win") else CFUNCTYPE
+        _frame_callback = winfun_ctype(None, POINTER(c_ubyte), POINTER(mv.MV_FRAME_OUT_INFO_EX), c_void_p)
+    return _frame_callback
 
 # ---- 简易错误映射与工具 ----
 ERRMAP = {
@@ -16,30 +41,136 @@ ERRMAP = {
     0x80000103: "MV_E_NODATA(无数据)",
     0x80000105: "MV_E_TIMEOUT(超时)",
 }
+# 取帧超时：GetOneFrameTimeout / GetImageBuffer 在超时内无帧时返回 MV_E_NODATA（部分版本为 GC 超时）
+TIMEOUT_CODES = (0x80000007, 0x80000107)   # MV_E_NODATA, MV_E_GC_TIMEOUT
 def explain(ret): return f"0x{ret:x} " + ERRMAP.get(ret, "（未知错误码）")
 def OK(ret, what):
-    if ret != MV_OK:
+    if ret != mv.MV_OK:
         print(f"[ERR] {what}: {explain(ret)}")
         return False
     return True
 
+# 可零拷贝映射为数组的像素格式：{像素格式值: (dtype, 通道数, 有效位数)}，首次使用时由 PixelType_header 生成
+#   - Mono8/10/12/14/16、Bayer**8/10/12/16（非打包，>8 位时每像素 2 字节，数据在低位）
+#   - RGB8_Packed / BGR8_Packed（交织 HxWx3）、RGB16_Packed
+# 其余格式（*_Packed 打包、YUV/YCbCr、RGB565、Planar、带符号、HB 压缩等）不在表中
+_PIXEL_TABLE = None
+def _pixel_table() -> dict:
+    global _PIXEL_TABLE
+    if _PIXEL_TABLE is None:
+        from MvImport import PixelType_header
+        table = {}
+        for name, val in vars(PixelType_header).items():
+            m = re.fullmatch(r"PixelType_Gvsp_(Mono|Bayer(?:GR|RG|GB|BG))(8|10|12|14|16)", name)
+            if m:
+                bits = int(m.group(2))
+                table[val] = (np.uint8 if bits == 8 else np.uint16, 1, bits)
+        for name, entry in (("RGB8_Packed", (np.uint8, 3, 8)), ("BGR8_Packed", (np.uint8, 3, 8)),
+                            ("RGB16_Packed", (np.uint16, 3, 16))):
+            val = getattr(PixelType_header, "PixelType_Gvsp_" + name, None)
+            if val is not None:
+                table[val] = entry
+        _PIXEL_TABLE = table
+    return _PIXEL_TABLE
+
+def pixel_layout(pixel_type: int):
+    """
+    根据 GVSP 像素格式返回 (dtype, 通道数)：
+      - Mono8 / Bayer*8                 -> (uint8, 1)
+      - Mono10/12/14/16、Bayer*10/12/16 -> (uint16, 1)  非打包格式，每像素 2 字节
+      - RGB8_Packed / BGR8_Packed       -> (uint8, 3)
+      - RGB16_Packed                    -> (uint16, 3)
+    其他格式（打包、YUV、RGB565、Planar、HB 压缩等）无法零拷贝映射，返回 None。
+    """
+    entry = _pixel_table().get(pixel_type)
+    return None if entry is None else entry[:2]
+
+def frame_view(raw, width: int, height: int, pixel_type: int, nbytes: int):
+    """把原始字节（ctypes 数组或 uint8 ndarray）按宽、高、像素格式零拷贝解释为数组，失败返回 None"""
+    layout = pixel_layout(pixel_type)
+    if layout is None:
+        print(f"[ERR] 像素格式 0x{pixel_type & 0xFFFFFFFF:x} 无法直接映射为数组，"
+              "请把 PixelFormat 设为 Mono8/Mono12/Bayer 非打包格式。")
+        return None
+    dtype, channels = layout
+    count = width * height * channels
+    if count * np.dtype(dtype).itemsize > nbytes:
+        print(f"[ERR] 帧长度不足: {nbytes} < {count * np.dtype(dtype).itemsize}")
+        return None
+    arr = np.frombuffer(raw, dtype=dtype, count=count)
+    return arr.reshape((height, width, channels) if channels > 1 else (height, width))
+
+def frame_meta(info) -> dict:
+    """从 MV_FRAME_OUT_INFO_EX 提取每帧元数据"""
+    return {
+        "frame_num": info.nFrameNum,
+        "width": info.nExtendWidth or info.nWidth,
+        "height": info.nExtendHeight or info.nHeight,
+        "pixel_type": info.enPixelType,
+        "frame_len": info.nFrameLen,
+        "dev_ts": (info.nDevTimeStampHigh << 32) | info.nDevTimeStampLow,
+        "host_t": time.perf_counter(),
+    }
+
+def pixel_bits(pixel_type: int) -> int:
+    """像素有效位数（如 Mono12 -> 12）；不支持的格式返回 8"""
+    entry = _pixel_table().get(pixel_type)
+    return entry[2] if entry else 8
+
 class HikCamera:
     """
     极简海康相机封装：
       - open(dev_index=0): 打开相机、设为连续采集、关闭自动曝光/增益
       - snap(save_path, exposure_us=20000, timeout_ms=1500, img_type=MV_Image_Jpeg) -> bool
+      - grab_array(exposure_us=None, timeout_ms=1500, copy=False) -> np.ndarray | None
+      - snap_async(writer, save_path, ...) -> bool: 取帧后交给 AsyncFrameWriter 在后台写盘
+      - start_stream() / stop_stream() / with cam.stream(): 会话模式，多次 snap 共用一次取流；
+        会话内默认切换为软触发，每次 snap / grab_array 调用时才触发曝光，不会拿到改曝光、换 SLM 图案之前的旧帧
+      - burst(n, ...) -> (合成帧, 成功帧数): 一次取流内连拍 N 帧，可边采边求均值/中值并写出堆栈
+      - start_continuous() / frames() / stop_continuous() / with cam.continuous(): 连续采集，
+        帧由 SDK 回调或缓存池接口送入预分配的环形缓冲（FrameRing），frames() 逐帧取出并统计丢帧
       - close(): 释放
+      - features: FeatureCache，节点值缓存，值未变化时不再写 SDK（features.print_stats() 查看读写耗时）
     仅在关键步骤打印日志，其他不做冗余配置。
+
+    profile / feature_file: open() 时额外应用的相机参数（{节点名: 值}，如 config.yaml 中
+    capture_settings.camera_features）与 MVS 导出的参数文件（MV_CC_FeatureLoad），先加载文件再应用 profile。
+
+    sdk 参数默认是 MvCamera，可传入接口相同的替身类（如 src/sim_camera.py 的 FakeMvCamera）
+    以便在无硬件时统计 SDK 调用次数与耗时。
     """
-    def __init__(self, dev_index: int = 0):
+    def __init__(self, dev_index: int = 0, sdk=None, profile: dict = None, feature_file: str = None):
         self.dev_index = dev_index
+        self.sdk = sdk    # None 时 open() 中使用 MvCamera
+        self.profile = dict(profile or {})
+        self.feature_file = feature_file
         self.cam = None
+        self.features = None
         self.payload = 0
+        self.streaming = False
+        self.trigger = None          # 当前触发方式，见 set_trigger()
+        self._session_trigger = False  # 软触发是否由 start_stream() 开启（stop_stream() 时恢复）
+        self._auto_trigger = False     # 软触发是否由单独的 snap 开启（保持到 start_continuous() / close()）
+        self.flush_margin_ms = 5.0   # 连续采集下判定“旧帧”时额外留出的读出/传输时间
+        # 预分配的取帧/编码缓冲，会话内所有 snap 复用
+        self._buf = None
+        self._out_buf = None
+        self.frame_info = None   # 最近一帧的 MV_FRAME_OUT_INFO_EX
+        # 连续采集
+        self.ring = None
+        self._callback = None    # 回调对象需保持引用，否则会被回收
+        self._pool_thread = None
+        self._pool_run = False
 
+    @traced("camera.open")
     def open(self) -> bool:
-        device_list = MV_CC_DEVICE_INFO_LIST()
-        tlayer = MV_GIGE_DEVICE | MV_USB_DEVICE
-        if not OK(MvCamera.MV_CC_EnumDevices(tlayer, device_list), "枚举设备"):
+        if self.sdk is None:
+            self.sdk = mv.MvCamera
+        device_list = mv.MV_CC_DEVICE_INFO_LIST()
+        tlayer = mv.MV_GIGE_DEVICE | mv.MV_USB_DEVICE
+        with span("camera.enum_devices"):
+            ret = self.sdk.MV_CC_EnumDevices(tlayer, device_list)
+        if not OK(ret, "枚举设备"):
             return False
         if device_list.nDeviceNum == 0:
             print("[ERR] 未检测到相机")
@@ -48,63 +179,499 @@ class HikCamera:
             print(f"[ERR] 设备索引 {self.dev_index} 超出范围 [0,{device_list.nDeviceNum-1}]")
             return False
 
-        self.cam = MvCamera()
-        dev_info = cast(device_list.pDeviceInfo[self.dev_index], POINTER(MV_CC_DEVICE_INFO)).contents
-        if not OK(self.cam.MV_CC_CreateHandle(dev_info), "创建句柄"): return False
-        if not OK(self.cam.MV_CC_OpenDevice(MV_ACCESS_Exclusive, 0), "打开设备"): return False
+        self.cam = self.sdk()
+        dev_info = cast(device_list.pDeviceInfo[self.dev_index], POINTER(mv.MV_CC_DEVICE_INFO)).contents
+        with span("camera.open_device"):
+            if not OK(self.cam.MV_CC_CreateHandle(dev_info), "创建句柄"): return False
+            if not OK(self.cam.MV_CC_OpenDevice(mv.MV_ACCESS_Exclusive, 0), "打开设备"): return False
 
-        # 基本工作模式：连续采集 + 关闭自动曝光/增益
-        if not OK(self.cam.MV_CC_SetEnumValue("TriggerMode", MV_TRIGGER_MODE_OFF), "设置触发模式=Off"): return False
-        self.cam.MV_CC_SetEnumValue("AcquisitionMode", 2)    # 连续（不同型号枚举值可能不同，不影响）
-        self.cam.MV_CC_SetEnumValue("ExposureAuto", 0)       # Off
-        self.cam.MV_CC_SetEnumValue("GainAuto", 0)           # Off
+        self.features = FeatureCache(self.cam)
+        with span("camera.apply_features"):
+            if self.feature_file:
+                if not OK(self.features.load_file(self.feature_file), f"加载相机参数文件 {self.feature_file}"):
+                    return False
+            # 基本工作模式（连续采集 + 关闭自动曝光/增益）与用户参数一次应用
+            failed = self.features.apply({**DEFAULT_PROFILE, **self.profile})
+        if "TriggerMode" in failed:
+            return OK(failed["TriggerMode"], "设置触发模式")
+        for name, ret in failed.items():
+            if name not in DEFAULT_PROFILE:    # 默认项失败不影响（型号差异），用户指定的项提示
+                print(f"[WARN] 设置 {name}={self.profile[name]!r} 失败: {explain(ret)}")
 
         # 记录负载大小用于分配取流缓冲
-        val = MVCC_INTVALUE()
+        val = mv.MVCC_INTVALUE()
         memset(byref(val), 0, sizeof(val))
         if not OK(self.cam.MV_CC_GetIntValue("PayloadSize", val), "读取PayloadSize"): return False
         self.payload = val.nCurValue
         return True
 
+    # ---- 会话模式 ----
+    @traced("camera.start_grabbing")
+    def start_stream(self, software_trigger: bool = True) -> bool:
+        """
+        开始取流并保持，直到 stop_stream()；期间的 snap 不再反复 Start/StopGrabbing。
+        取流一直开着时，连续采集的相机会不断把帧压进 SDK 缓存，直接取帧拿到的是最早缓存的那一帧
+        （曝光发生在改曝光 / 换图案之前），因此会话内每次取帧都先清空缓存（MV_CC_ClearImageBuffer）：
+          - software_trigger=True（默认）且当前为连续采集：会话期间切换为软触发，每次取帧清空缓存后
+            发送 TriggerSoftware，帧一定在调用之后才开始曝光；stop_stream() 时恢复连续采集
+          - software_trigger=False 或相机不支持软触发：保持连续采集，清空缓存后丢弃曝光与调用时刻
+            重叠的帧（到达时间距清空不足 曝光时间 + flush_margin_ms），每次取帧最多多等一帧
+        已设为软触发 / 硬触发时保持不变。
+        会话外单独调用的 snap / grab_array / burst 同样切换为软触发，但结束后不恢复：连续单拍不必每帧
+        写两次 TriggerMode（FeatureCache 跳过重复写入），start_continuous() 与 close() 时才恢复连续采集。
+        """
+        if not self.cam:
+            print("[ERR] 相机未打开")
+            return False
+        if self.streaming:
+            return True
+        if self.ring is not None:
+            print("[ERR] 连续采集进行中，请使用 frames() 取帧")
+            return False
+        if software_trigger and self.trigger is None:
+            if self.set_trigger("software"):
+                self._session_trigger = True
+            else:
+                print("[WARN] 无法切换为软触发，会话内改为清空缓存并丢弃曝光重叠的帧")
+        if not OK(self.cam.MV_CC_StartGrabbing(), "开始取流"):
+            self._restore_trigger()
+            return False
+        self.streaming = True
+        return True
+
+    @traced("camera.stop_grabbing")
+    def stop_stream(self, keep_trigger: bool = False):
+        """停止取流；keep_trigger=True 时保留会话开启的软触发，留给下一次单拍复用"""
+        if not self.streaming:
+            return
+        self.streaming = False
+        if self.cam:
+            OK(self.cam.MV_CC_StopGrabbing(), "停止取流")
+            if keep_trigger and self._session_trigger:
+                self._session_trigger = False
+                self._auto_trigger = True
+            else:
+                self._restore_trigger()
+
+    def _restore_trigger(self):
+        if self._session_trigger:
+            self._session_trigger = False
+            self.set_trigger(None)
+
+    @contextmanager
+    def stream(self, software_trigger: bool = True):
+        """
+        with cam.stream():
+            for i in range(100):
+                cam.snap(...)
+        整个序列只付出一次取流启动开销；software_trigger 见 start_stream()。
+        """
+        if not self.start_stream(software_trigger):
+            raise RuntimeError("开始取流失败")
+        try:
+            yield self
+        finally:
+            self.stop_stream()
+
+    def _frame_buffer(self):
+        """按 PayloadSize 预分配取帧缓冲，只在首次或负载变大时重新分配"""
+        if self._buf is None or len(self._buf) < self.payload:
+            self._buf = (c_ubyte * self.payload)()
+        return self._buf
+
+    def _encode_buffer(self, size: int):
+        """编码输出缓冲，容量不足时才重新分配"""
+        if self._out_buf is None or len(self._out_buf) < size:
+            self._out_buf = (c_ubyte * size)()
+        return self._out_buf
+
+    @traced("camera.set_exposure")
+    def set_exposure(self, exposure_us: float):
+        # 设置曝光（不同机型范围不同，如失败会打印但继续尝试抓拍）；与上次相同时不访问 SDK
+        ret = self.features.set("ExposureTime", float(exposure_us))
+        if ret != mv.MV_OK:
+            print(f"[WARN] 设置曝光失败（可能超范围/不支持）：{explain(ret)}  已继续使用当前曝光。")
+
+    @traced("camera.grab")
+    def _grab_frame(self, timeout_ms: int):
+        """取一帧到预分配缓冲，成功返回 MV_FRAME_OUT_INFO_EX，失败返回 None（需已在取流）"""
+        frame_info = mv.MV_FRAME_OUT_INFO_EX()
+        memset(byref(frame_info), 0, sizeof(frame_info))
+        buf = self._frame_buffer()
+        ret = self.cam.MV_CC_GetOneFrameTimeout(byref(buf), self.payload, frame_info, timeout_ms)
+        if ret != mv.MV_OK:
+            if ret in TIMEOUT_CODES:
+                print(f"[ERR] 取帧超时({timeout_ms}ms)。请检查曝光/触发/带宽。")
+            else:
+                print(f"[ERR] 取帧失败: {explain(ret)}")
+            return None
+        self.frame_info = frame_info
+        return frame_info
+
+    def _grab_fresh(self, timeout_ms: int, flush: bool):
+        """
+        取一帧在本次调用之后才开始曝光的图像（需已在取流）：
+          - flush  : 先清空 SDK 缓存中的旧帧；刚 StartGrabbing 时缓存为空，可设为 False
+          - 软触发 : 清空后发送 TriggerSoftware
+          - 连续采集: 丢弃到达时间距清空不足 曝光时间 + flush_margin_ms 的帧（其曝光开始于清空之前）
+          - 硬触发 : 只清空，帧的时刻由外部信号决定
+        """
+        if flush:
+            OK(self.cam.MV_CC_ClearImageBuffer(), "清空图像缓存")
+        if self.trigger == "software":
+            if not OK(self.cam.MV_CC_SetCommandValue("TriggerSoftware"), "软触发"):
+                return None
+            return self._grab_frame(timeout_ms)
+        if not flush or self.trigger == "hardware":
+            return self._grab_frame(timeout_ms)
+
+        exposure_us = self.features.get("ExposureTime", "float") or 0.0
+        min_age = exposure_us / 1e6 + self.flush_margin_ms / 1000.0
+        t_clear = time.perf_counter()
+        deadline = t_clear + timeout_ms / 1000.0
+        dropped = 0
+        while True:
+            remaining_ms = int((deadline - time.perf_counter()) * 1000.0)
+            if remaining_ms <= 0:
+                print(f"[ERR] 取帧超时({timeout_ms}ms)：{dropped} 帧的曝光与调用时刻重叠，已丢弃")
+                return None
+            frame_info = self._grab_frame(remaining_ms)
+            if frame_info is None or time.perf_counter() - t_clear >= min_age:
+                return frame_info
+            dropped += 1
+
+    def frame_array(self, frame_info=None, copy: bool = False):
+        """
+        把取帧缓冲按 frame_info 的宽、高、像素格式解释为 NumPy 数组：
+          - 默认零拷贝，直接引用内部缓冲，下一次取帧会覆盖其内容
+          - copy=True 时返回独立副本
+        像素格式不支持时返回 None。
+        """
+        info = frame_info if frame_info is not None else self.frame_info
+        if info is None or self._buf is None:
+            print("[ERR] 尚未取到图像")
+            return None
+        arr = frame_view(self._buf, info.nExtendWidth or info.nWidth, info.nExtendHeight or info.nHeight,
+                         info.enPixelType, info.nFrameLen)
+        if arr is None:
+            return None
+        return arr.copy() if copy else arr
+
+    def grab_array(self, exposure_us: float = None, timeout_ms: int = 1500, copy: bool = False):
+        """
+        抓拍一帧并直接返回原始像素数组（不编码、不落盘，保留完整位深）：
+          - exposure_us: 为 None 时不改动当前曝光
+          - copy       : 见 frame_array()；会话模式下连续取帧又要保留旧帧时应设为 True
+        失败返回 None。
+        """
+        if not self.cam:
+            print("[ERR] 相机未打开")
+            return None
+        if exposure_us is not None:
+            self.set_exposure(exposure_us)
+
+        own_stream = not self.streaming
+        if own_stream and not self.start_stream():
+            return None
+        try:
+            frame_info = self._grab_fresh(timeout_ms, flush=not own_stream)
+            if frame_info is None:
+                return None
+            return self.frame_array(frame_info, copy=copy)
+        finally:
+            if own_stream:
+                self.stop_stream(keep_trigger=True)
+
+    @traced("camera.snap_async")
+    def snap_async(self, writer, save_path: str, exposure_us: float = None,
+                   timeout_ms: int = 1500, callback=None) -> bool:
+        """
+        抓拍一帧并提交给 writer（src/frame_writer.AsyncFrameWriter），写文件不占用采集线程；
+        写盘结果通过 callback(path, ok, err) 通知。返回是否成功取帧并入队。
+          - .jpg/.jpeg/.bmp: 与 snap() 相同，由 SDK（MV_CC_SaveImageEx2）编码，Bayer 格式会去马赛克、
+            高位深按 SDK 的方式转换，输出与 snap() 一致；编码在采集线程完成，只把编码结果交给 writer
+          - .png/.tif/.npy 等: 复制原始数组交给 writer 在后台编码，保留完整位深（Bayer 为原始马赛克）
+        """
+        img_type = {".jpg": mv.MV_Image_Jpeg, ".jpeg": mv.MV_Image_Jpeg,
+                    ".bmp": mv.MV_Image_Bmp}.get(os.path.splitext(str(save_path))[1].lower())
+        if img_type is None:
+            frame = self.grab_array(exposure_us=exposure_us, timeout_ms=timeout_ms, copy=True)
+            if frame is None:
+                return False
+            return writer.submit(frame, save_path, callback=callback,
+                                 bit_depth=pixel_bits(self.frame_info.enPixelType))
+
+        if not self.cam:
+            print("[ERR] 相机未打开")
+            return False
+        if exposure_us is not None:
+            self.set_exposure(exposure_us)
+        own_stream = not self.streaming
+        if own_stream and not self.start_stream():
+            return False
+        try:
+            frame_info = self._grab_fresh(timeout_ms, flush=not own_stream)
+            if frame_info is None:
+                return False
+            data = self._encode_frame(frame_info, img_type)
+        finally:
+            if own_stream:
+                self.stop_stream(keep_trigger=True)
+        if data is None:
+            return False
+        return writer.submit(data, save_path, callback=callback)
+
+    @traced("camera.snap")
     def snap(self, save_path: str, exposure_us: float = 20000.0,
-             timeout_ms: int = 1500, img_type: int = MV_Image_Jpeg) -> bool:
+             timeout_ms: int = 1500, img_type: int = None) -> bool:
         """
         抓拍一张并保存：
           - exposure_us: 曝光时间(微秒)，内部直接写 ExposureTime
           - timeout_ms : 取帧超时
-          - img_type   : MV_Image_Jpeg 或 MV_Image_Bmp
+          - img_type   : MV_Image_Jpeg（默认）或 MV_Image_Bmp
         返回 True/False；失败时会打印关键错误原因。
+        已处于会话模式（start_stream/stream）时直接取帧，否则本次单独开启并关闭取流。
         """
         if not self.cam:
             print("[ERR] 相机未打开")
             return False
+        self.set_exposure(exposure_us)
 
-        # 设置曝光（不同机型范围不同，如失败会打印但继续尝试抓拍）
-        ret = self.cam.MV_CC_SetFloatValue("ExposureTime", float(exposure_us))
-        if ret != MV_OK:
-            print(f"[WARN] 设置曝光失败（可能超范围/不支持）：{explain(ret)}  已继续使用当前曝光。")
+        own_stream = not self.streaming
+        if own_stream and not self.start_stream():
+            return False
+        try:
+            frame_info = self._grab_fresh(timeout_ms, flush=not own_stream)
+            if frame_info is None:
+                return False
+            return self._save_frame(frame_info, save_path, mv.MV_Image_Jpeg if img_type is None else img_type)
+        finally:
+            if own_stream:
+                self.stop_stream(keep_trigger=True)
 
-        if not OK(self.cam.MV_CC_StartGrabbing(), "开始取流"):
+    # ---- 触发与连拍 ----
+    def set_trigger(self, trigger: str = None, line: int = 0) -> bool:
+        """
+        trigger:
+          - None / "off": 连续采集（open() 的默认设置）
+          - "software"  : 每帧由 MV_CC_SetCommandValue("TriggerSoftware") 触发
+          - "hardware"  : 由 Line{line} 外部信号触发
+        """
+        if not self.cam:
+            print("[ERR] 相机未打开")
+            return False
+        self._auto_trigger = False
+        if trigger in (None, "off"):
+            if not OK(self.features.set("TriggerMode", mv.MV_TRIGGER_MODE_OFF), "设置触发模式=Off"):
+                return False
+            self.trigger = None
+            return True
+        if trigger == "software":
+            source = mv.MV_TRIGGER_SOURCE_SOFTWARE
+        elif trigger == "hardware":
+            source = mv.MV_TRIGGER_SOURCE_LINE0 + int(line)
+        else:
+            print(f"[ERR] 未知触发方式: {trigger}")
             return False
+        if not OK(self.features.set("TriggerMode", mv.MV_TRIGGER_MODE_ON), "设置触发模式=On"):
+            return False
+        if not OK(self.features.set("TriggerSource", source), f"设置触发源={trigger}"):
+            return False
+        self.trigger = trigger
+        return True
 
-        # 取一帧
-        frame_info = MV_FRAME_OUT_INFO_EX()
-        memset(byref(frame_info), 0, sizeof(frame_info))
-        buf = (c_ubyte * self.payload)()
-        ret = self.cam.MV_CC_GetOneFrameTimeout(byref(buf), self.payload, frame_info, timeout_ms)
-        if ret != MV_OK:
-            self.cam.MV_CC_StopGrabbing()
-            if ret == MV_E_TIMEOUT:
-                print(f"[ERR] 取帧超时({timeout_ms}ms)。请检查曝光/触发/带宽。")
-            else:
-                print(f"[ERR] 取帧失败: {explain(ret)}")
+    @traced("camera.burst")
+    def burst(self, n: int, exposure_us: float = None, timeout_ms: int = 1500,
+              trigger: str = None, reduce: str = "mean", stack_path: str = None,
+              on_frame=None):
+        """
+        在同一次取流内连拍 n 帧：
+          - trigger   : 见 set_trigger()，结束后恢复为原来的触发方式；None 时沿用当前方式
+                        （会话内默认为软触发，每帧各触发一次）
+          - reduce    : "mean"（流式累加，内存与 n 无关）/ "median" / None
+          - stack_path: 给定时把 n 帧逐帧写入一个 (n, H, W) 的 .npy 堆栈
+          - on_frame(i, frame): 每帧回调，frame 为零拷贝视图，回调返回后即被覆盖
+        返回 (合成帧或 None, 成功帧数)。
+        """
+        if not self.cam:
+            print("[ERR] 相机未打开")
+            return None, 0
+        if exposure_us is not None:
+            self.set_exposure(exposure_us)
+        prev_trigger, prev_auto = self.trigger, self._auto_trigger
+        if trigger not in (None, "off") and not self.set_trigger(trigger):
+            return None, 0
+
+        acc = FrameAccumulator(n, reduce=reduce)
+        stack = StackWriter(stack_path, n) if stack_path else None
+        own_stream = not self.streaming
+        try:
+            if own_stream and not self.start_stream():
+                return None, 0
+            for i in range(n):
+                # 会话内第一帧先清空缓存，之后逐帧连续取
+                frame_info = self._grab_fresh(timeout_ms, flush=(i == 0 and not own_stream))
+                if frame_info is None:
+                    print(f"[WARN] 连拍第 {i + 1}/{n} 帧失败，提前结束")
+                    break
+                frame = self.frame_array(frame_info)
+                if frame is None:
+                    break
+                acc.add(frame)
+                if stack is not None:
+                    stack.add(frame)
+                if on_frame is not None:
+                    on_frame(i, frame)
+        finally:
+            if own_stream:
+                self.stop_stream(keep_trigger=True)
+            if trigger not in (None, "off") and prev_trigger != trigger:
+                self.set_trigger(prev_trigger)
+                self._auto_trigger = prev_auto
+            if stack is not None:
+                stack.close()
+
+        print(f"[OK] 连拍完成: {acc.count}/{n} 帧" + (f"，合成方式: {reduce}" if reduce else ""))
+        return acc.result(), acc.count
+
+    # ---- 连续采集 ----
+    def start_continuous(self, slots: int = 8, source: str = "callback", overwrite: bool = True,
+                         image_nodes: int = None, timeout_ms: int = 1000) -> bool:
+        """
+        开始连续采集，帧拷入 slots 个预分配槽位的环形缓冲（self.ring）：
+          - source   : "callback"（MV_CC_RegisterImageCallBackEx，SDK 线程推送）
+                       / "pool"（后台线程 MV_CC_GetImageBuffer / MV_CC_FreeImageBuffer）
+          - overwrite: True 时消费者跟不上就覆盖最旧的帧（实时预览），False 时丢弃新帧（延时摄影）
+          - image_nodes: SDK 内部缓存节点数（MV_CC_SetImageNodeNum），None 时不改动
+        期间不能使用 snap / grab_array / burst。
+        """
+        if not self.cam:
+            print("[ERR] 相机未打开")
+            return False
+        if self.streaming or self.ring is not None:
+            print("[ERR] 已在取流中，请先 stop_stream() / stop_continuous()")
+            return False
+        if source not in ("callback", "pool"):
+            print(f"[ERR] 未知取帧方式: {source}")
             return False
+        if self._auto_trigger:
+            self.set_trigger(None)    # 单拍留下的软触发，恢复连续采集
+        if image_nodes is not None:
+            OK(self.cam.MV_CC_SetImageNodeNum(int(image_nodes)), f"设置缓存节点数={image_nodes}")
+
+        ring = FrameRing(slots, self.payload, overwrite=overwrite)
+        if source == "callback":
+            self._callback = frame_callback_type()(self._on_frame)
+            if not OK(self.cam.MV_CC_RegisterImageCallBackEx(self._callback, None), "注册图像回调"):
+                self._callback = None
+                return False
+        self.ring = ring
+        if not OK(self.cam.MV_CC_StartGrabbing(), "开始取流"):
+            self._unregister_callback()
+            self.ring = None
+            return False
+        if source == "pool":
+            self._pool_run = True
+            self._pool_thread = threading.Thread(target=self._pool_loop, args=(timeout_ms,),
+                                                 name="HikCameraPool", daemon=True)
+            self._pool_thread.start()
+        return True
+
+    def _on_frame(self, p_data, p_info, p_user):
+        # SDK 回调线程：只做一次拷贝入环，不能抛出异常
+        try:
+            info = p_info.contents
+            self.ring.push(p_data, info.nFrameLen, frame_meta(info))
+        except Exception as e:
+            print(f"[ERR] 图像回调异常: {e}")
 
-        # 保存（官方建议输出缓冲至少 w*h*3 + 2048）
+    def _pool_loop(self, timeout_ms: int):
+        frame = mv.MV_FRAME_OUT()
+        while self._pool_run:
+            memset(byref(frame), 0, sizeof(frame))
+            ret = self.cam.MV_CC_GetImageBuffer(frame, timeout_ms)
+            if ret != mv.MV_OK:
+                if ret not in TIMEOUT_CODES and self._pool_run:
+                    print(f"[WARN] 获取图像缓存失败: {explain(ret)}")
+                    time.sleep(0.01)
+                continue
+            try:
+                info = frame.stFrameInfo
+                self.ring.push(frame.pBufAddr, info.nFrameLen, frame_meta(info))
+            finally:
+                self.cam.MV_CC_FreeImageBuffer(frame)
+
+    def _unregister_callback(self):
+        if self._callback is not None:
+            self.cam.MV_CC_RegisterImageCallBackEx(frame_callback_type()(), None)   # 注销回调，恢复主动取帧
+            self._callback = None
+
+    def stop_continuous(self) -> dict:
+        """停止连续采集，返回环形缓冲统计（见 FrameRing.stats）"""
+        if self.ring is None:
+            return {}
+        self._pool_run = False
+        if self.cam:
+            OK(self.cam.MV_CC_StopGrabbing(), "停止取流")
+        if self._pool_thread is not None:
+            self._pool_thread.join()
+            self._pool_thread = None
+        if self.cam:
+            self._unregister_callback()
+        self.ring.close()
+        stats = self.ring.stats()
+        self.ring = None
+        return stats
+
+    def frames(self, timeout_ms: int = 1000, latest: bool = False, max_frames: int = None, copy: bool = False):
+        """
+        连续采集的消费端，逐帧 yield (数组, meta)：
+          - 数组默认是环形缓冲槽位的零拷贝视图，取下一帧后失效；需要保留时设 copy=True
+          - latest=True 时总是跳到最新一帧（实时对焦），否则按到达顺序
+          - 超时 timeout_ms 内无新帧、达到 max_frames 或采集停止时结束
+        """
+        n = 0
+        ring = self.ring
+        while ring is not None and (max_frames is None or n < max_frames):
+            item = ring.pop(timeout_ms / 1000.0, latest=latest)
+            if item is None:
+                if not ring.closed:
+                    print(f"[WARN] {timeout_ms}ms 内未收到新帧")
+                break
+            raw, meta = item
+            arr = frame_view(raw, meta["width"], meta["height"], meta["pixel_type"], meta["nbytes"])
+            if arr is None:
+                continue
+            n += 1
+            yield (arr.copy() if copy else arr), meta
+        if ring is not None:
+            ring.release()
+
+    @contextmanager
+    def continuous(self, **kwargs):
+        """
+        with cam.continuous(slots=8) as ring:
+            for frame, meta in cam.frames(latest=True):
+                ...
+        退出时停止采集并打印丢帧统计。
+        """
+        if not self.start_continuous(**kwargs):
+            raise RuntimeError("开始连续采集失败")
+        try:
+            yield self.ring
+        finally:
+            st = self.stop_continuous()
+            print(f"[OK] 连续采集结束: 收到 {st['received']} 帧，交付 {st['delivered']}，"
+                  f"环满丢弃 {st['dropped']}，跳过 {st['skipped']}，相机端丢帧 {st['lost']}")
+
+    def _encode_frame(self, frame_info, img_type):
+        """用 SDK 把取帧缓冲中的一帧编码为 JPEG/BMP，返回 bytes，失败返回 None"""
+        # 官方建议输出缓冲至少 w*h*3 + 2048
+        buf = self._buf
         out_size = frame_info.nWidth * frame_info.nHeight * 3 + 2048
-        out_buf = (c_ubyte * out_size)()
+        out_buf = self._encode_buffer(out_size)
 
-        save_param = MV_SAVE_IMAGE_PARAM_EX()
+        save_param = mv.MV_SAVE_IMAGE_PARAM_EX()
         memset(byref(save_param), 0, sizeof(save_param))
         save_param.enImageType  = img_type
         save_param.enPixelType  = frame_info.enPixelType
@@ -114,31 +681,38 @@ class HikCamera:
         save_param.nDataLen     = frame_info.nFrameLen
         save_param.nJpgQuality  = 90
         save_param.pImageBuffer = out_buf
-        save_param.nBufferSize  = out_size
+        save_param.nBufferSize  = len(out_buf)
 
-        ret = self.cam.MV_CC_SaveImageEx2(save_param)
-        if ret != MV_OK or save_param.nImageLen <= 0:
-            self.cam.MV_CC_StopGrabbing()
+        with span("camera.encode", fmt=img_type):
+            ret = self.cam.MV_CC_SaveImageEx2(save_param)
+        if ret != mv.MV_OK or save_param.nImageLen <= 0:
             print("[ERR] 保存图像失败（可能是当前像素格式不支持直接保存）。"
                   "可尝试改用 BMP 或先转换到 BGR8 再保存。")
             print(f"Save ret={explain(ret)}, nImageLen={save_param.nImageLen}")
-            return False
+            return None
+        return string_at(save_param.pImageBuffer, save_param.nImageLen)
 
+    def _save_frame(self, frame_info, save_path, img_type) -> bool:
+        data = self._encode_frame(frame_info, img_type)
+        if data is None:
+            return False
         try:
-            with open(save_path, "wb") as f:
-                f.write(string_at(save_param.pImageBuffer, save_param.nImageLen))
-            # 成功
-            self.cam.MV_CC_StopGrabbing()
+            with span("camera.write", bytes=len(data)), open(save_path, "wb") as f:
+                f.write(data)
             print(f"[OK] 已保存: {save_path}  尺寸: {frame_info.nWidth}x{frame_info.nHeight}")
             return True
         except Exception as e:
-            self.cam.MV_CC_StopGrabbing()
             print(f"[ERR] 写文件失败: {e}")
             return False
 
+    @traced("camera.close")
     def close(self):
         if not self.cam:
             return
+        self.stop_continuous()
+        self.streaming = False
+        self._session_trigger = False
+        self._auto_trigger = False
         try:
             self.cam.MV_CC_StopGrabbing()
         except Exception:
@@ -152,6 +726,9 @@ class HikCamera:
         except Exception as e:
             print(f"[WARN] 销毁句柄异常: {e}")
         self.cam = None
+        self.features = None
+        self._buf = None
+        self._out_buf = None
 
 # ---- 示例 ----
 if __name__ == "__main__":
@@ -159,7 +736,7 @@ if __name__ == "__main__":
     try:
         if not cam.open():
             sys.exit(1)
-        ok = cam.snap("capture.jpg", exposure_us=500000.0, timeout_ms=2000, img_type=MV_Image_Jpeg)
+        ok = cam.snap("capture.jpg", exposure_us=500000.0, timeout_ms=2000, img_type=mv.MV_Image_Jpeg)
         if not ok:
             print("[ERR] 抓拍失败")
     finally:
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+GenICam 节点读写的缓存层：记住每个节点最后一次成功写入 / 读到的值，值不变时不再调用 SDK。
+
+    feats = FeatureCache(cam.cam)
+    feats.set("ExposureTime", 20000.0)      # 写入
+    feats.set("ExposureTime", 20000.0)      # 与缓存相同，直接跳过
+    feats.apply({"Gain": 6.0, "PixelFormat": "Mono12", "AcquisitionFrameRateEnable": False})
+    feats.load_file("D:/cam/profile.mfs")   # MV_CC_FeatureLoad，加载后缓存失效
+    feats.print_stats()
+
+  - 节点类型按 NODE_KINDS 查表，查不到时按值的 Python 类型推断：
+    float -> Float，bool -> Boolean，str -> 枚举（按符号名写），int -> Int
+  - 相机自身会改变的值（自动曝光等打开时）不应依赖缓存，可用 get(..., refresh=True) 或 invalidate()
+  - stats() 给出每个节点的读 / 写 / 跳过次数与 SDK 调用耗时
+"""
+import time
+from collections import defaultdict
+from ctypes import byref, c_bool, memset, sizeof
+
+from utils.lazy import lazy_import
+
+# SDK 结构体定义在第一次读节点时才导入
+params = lazy_import("MvImport.CameraParams_header")
+MV_OK = 0
+
+# 常用节点的类型
+NODE_KINDS = {
+    "ExposureTime": "float", "Gain": "float", "AcquisitionFrameRate": "float", "Gamma": "float",
+    "TriggerDelay": "float",
+    "TriggerMode": "enum", "TriggerSource": "enum", "TriggerActivation": "enum",
+    "AcquisitionMode": "enum", "ExposureAuto": "enum", "GainAuto": "enum", "ExposureMode": "enum",
+    "PixelFormat": "enum", "BalanceWhiteAuto": "enum", "ADCBitDepth": "enum",
+    "Width": "int", "Height": "int", "OffsetX": "int", "OffsetY": "int",
+    "GevSCPSPacketSize": "int", "GevSCPD": "int", "AcquisitionBurstFrameCount": "int",
+    "AcquisitionFrameRateEnable": "bool", "ReverseX": "bool", "ReverseY": "bool", "GammaEnable": "bool",
+    "DeviceUserID": "string",
+}
+
+# open() 时应用的基本工作模式：连续采集 + 关闭自动曝光/增益
+DEFAULT_PROFILE = {
+    "TriggerMode": 0,        # Off
+    "AcquisitionMode": 2,    # Continuous（不同型号枚举值可能不同，失败不影响）
+    "ExposureAuto": 0,       # Off
+    "GainAuto": 0,           # Off
+}
+
+
+def node_kind(name: str, value=None) -> str:
+    if name in NODE_KINDS:
+        return NODE_KINDS[name]
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "enum"
+    return "int"
+
+
+class FeatureCache:
+    """cam 为 MvCamera 实例（或接口相同的替身）"""
+
+    def __init__(self, cam, float_tol: float = 1e-6):
+        self.cam = cam
+        self.float_tol = float_tol
+        self.values = {}
+        self._stats = defaultdict(lambda: {"reads": 0, "writes": 0, "skipped": 0, "errors": 0,
+                                           "read_s": 0.0, "write_s": 0.0, "max_s": 0.0})
+
+    # ========== 缓存 ==========
+
+    def invalidate(self, name: str = None) -> None:
+        """清除某个节点（默认全部）的缓存值"""
+        if name is None:
+            self.values.clear()
+        else:
+            self.values.pop(name, None)
+
+    def _same(self, old, new, kind) -> bool:
+        if kind == "float":
+            return abs(float(old) - float(new)) <= self.float_tol * max(1.0, abs(float(new)))
+        return old == new
+
+    def _timed(self, name, op, fn, *args):
+        t0 = time.perf_counter()
+        ret = fn(*args)
+        dt = time.perf_counter() - t0
+        st = self._stats[name]
+        st[op + "s"] += 1
+        st[op + "_s"] += dt
+        st["max_s"] = max(st["max_s"], dt)
+        if ret != MV_OK:
+            st["errors"] += 1
+        return ret
+
+    # ========== 写 ==========
+
+    def set(self, name: str, value, kind: str = None, force: bool = False) -> int:
+        """写节点，返回 SDK 错误码；值与缓存相同时不调用 SDK，直接返回 MV_OK"""
+        kind = kind or node_kind(name, value)
+        if not force and name in self.values and self._same(self.values[name], value, kind):
+            self._stats[name]["skipped"] += 1
+            return MV_OK
+        if kind == "float":
+            ret = self._timed(name, "write", self.cam.MV_CC_SetFloatValue, name, float(value))
+        elif kind == "enum":
+            if isinstance(value, str):
+                ret = self._timed(name, "write", self.cam.MV_CC_SetEnumValueByString, name, value)
+            else:
+                ret = self._timed(name, "write", self.cam.MV_CC_SetEnumValue, name, int(value))
+        elif kind == "bool":
+            ret = self._timed(name, "write", self.cam.MV_CC_SetBoolValue, name, bool(value))
+        elif kind == "string":
+            ret = self._timed(name, "write", self.cam.MV_CC_SetStringValue, name, str(value))
+        elif kind == "command":
+            return self._timed(name, "write", self.cam.MV_CC_SetCommandValue, name)
+        else:
+            ret = self._timed(name, "write", self.cam.MV_CC_SetIntValue, name, int(value))
+        if ret == MV_OK:
+            self.values[name] = value
+        else:
+            self.values.pop(name, None)    # 写失败后相机上的实际值未知
+        return ret
+
+    def apply(self, profile: dict) -> dict:
+        """
+        一次应用整组参数（值未变化的节点跳过），返回失败的 {节点: 错误码}，全部成功时为空 dict。
+        SDK 没有批量写接口，这里逐个节点写入；是否因某个节点失败而中止由调用方决定。
+        """
+        failed = {}
+        for name, value in (profile or {}).items():
+            ret = self.set(name, value)
+            if ret != MV_OK:
+                failed[name] = ret
+        return failed
+
+    # ========== 读 ==========
+
+    def get(self, name: str, kind: str = None, refresh: bool = False):
+        """读节点值；有缓存且 refresh=False 时不访问 SDK，失败返回 None"""
+        if not refresh and name in self.values:
+            return self.values[name]
+        kind = kind or node_kind(name)
+        if kind == "float":
+            st = params.MVCC_FLOATVALUE()
+            getter, field = self.cam.MV_CC_GetFloatValue, "fCurValue"
+        elif kind == "enum":
+            st = params.MVCC_ENUMVALUE()
+            getter, field = self.cam.MV_CC_GetEnumValue, "nCurValue"
+        elif kind == "string":
+            st = params.MVCC_STRINGVALUE()
+            getter, field = self.cam.MV_CC_GetStringValue, "chCurValue"
+        elif kind == "bool":
+            st = c_bool(False)
+            getter, field = self.cam.MV_CC_GetBoolValue, "value"
+        else:
+            st = params.MVCC_INTVALUE()
+            getter, field = self.cam.MV_CC_GetIntValue, "nCurValue"
+        if kind != "bool":
+            memset(byref(st), 0, sizeof(st))
+        if self._timed(name, "read", getter, name, st) != MV_OK:
+            return None
+        value = getattr(st, field)
+        if kind == "string":
+            value = value.decode("ascii", errors="replace")
+        self.values[name] = value
+        return value
+
+    # ========== 特性文件 ==========
+
+    def load_file(self, path: str) -> int:
+        """MV_CC_FeatureLoad 加载相机参数文件；相机上的值全部可能改变，缓存清空"""
+        ret = self._timed("<FeatureLoad>", "write", self.cam.MV_CC_FeatureLoad, str(path))
+        self.invalidate()
+        return ret
+
+    def save_file(self, path: str) -> int:
+        return self._timed("<FeatureSave>", "read", self.cam.MV_CC_FeatureSave, str(path))
+
+    # ========== 统计 ==========
+
+    def stats(self) -> dict:
+        """{节点: {reads, writes, skipped, errors, read_ms, write_ms, max_ms}}，耗时为累计毫秒"""
+        out = {}
+        for name, st in self._stats.items():
+            out[name] = {"reads": st["reads"], "writes": st["writes"], "skipped": st["skipped"],
+                         "errors": st["errors"], "read_ms": round(st["read_s"] * 1000.0, 3),
+                         "write_ms": round(st["write_s"] * 1000.0, 3), "max_ms": round(st["max_s"] * 1000.0, 3)}
+        return out
+
+    def print_stats(self) -> None:
+        for name, st in sorted(self.stats().items()):
+            print(f"[FEAT] {name:<28} 读 {st['reads']:>4} ({st['read_ms']:.2f}ms)  "
+                  f"写 {st['writes']:>4} ({st['write_ms']:.2f}ms)  跳过 {st['skipped']:>4}  "
+                  f"失败 {st['errors']}  最长 {st['max_ms']:.2f}ms")
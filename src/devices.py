@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+按配置打开设备（SLM / 相机 / 显示器），每种设备可选真实硬件或模拟实现：
+
+    devices:
+      backend: sim          # hardware（默认）| sim，三种设备的默认后端
+      camera: sim           # 可单独覆盖：camera / slm / display
+      sim:                  # 模拟参数（均可省略）
+        width: 640
+        height: 480
+        pixel_format: Mono8         # Mono8 | Mono12
+        exposure_ref_us: 500000     # 该曝光下 PSF 峰值 / 全白满屏到满量程
+        read_noise: 0.002           # 读出噪声（满量程比例）
+        shot_noise: true
+        full_well: 10000
+        frame_latency_s: 0.0        # 每次取帧的模拟开销
+        seed: 0
+
+    devs = open_devices(config, slm=True, camera=True, display=True)
+    devs.slm.img_show(...); devs.display.show(...); devs.cam.snap_async(...)
+    devs.close()
+
+模拟后端共用一个 SimScene：假 SLM 与无窗口显示器写入当前图案 / 显示内容，模拟相机据此渲染测量图像，
+因此 single_shot.py / experiment_runner.py 的完整流程可以在没有硬件与厂商 SDK 的机器上运行。
+硬件后端的模块只在需要时导入。
+"""
+from utils.trace import traced
+
+BACKENDS = ("hardware", "sim")
+DEVICE_KINDS = ("camera", "slm", "display")
+
+
+def device_backends(config: dict) -> dict:
+    """{"camera": ..., "slm": ..., "display": ...}，未配置时为 hardware"""
+    dev_cfg = config.get("devices") or {}
+    default = dev_cfg.get("backend") or "hardware"
+    out = {}
+    for kind in DEVICE_KINDS:
+        backend = dev_cfg.get(kind) or default
+        if backend not in BACKENDS:
+            raise ValueError(f"devices.{kind} 只能是 {BACKENDS}，收到 {backend!r}")
+        out[kind] = backend
+    return out
+
+
+def make_scene(config: dict):
+    from src.sim_camera import SimScene
+
+    sim = dict((config.get("devices") or {}).get("sim") or {})
+    return SimScene(width=int(sim.get("width", 640)), height=int(sim.get("height", 480)),
+                    exposure_ref_us=float(sim.get("exposure_ref_us", 500000.0)),
+                    read_noise=float(sim.get("read_noise", 0.002)),
+                    shot_noise=bool(sim.get("shot_noise", True)),
+                    full_well=int(sim.get("full_well", 10000)),
+                    seed=sim.get("seed"))
+
+
+class Devices:
+    """open_devices() 的返回值：slm / cam / display 未打开时为 None，scene 仅在使用模拟后端时存在"""
+
+    def __init__(self, backends: dict, scene=None):
+        self.backends = backends
+        self.scene = scene
+        self.slm = None
+        self.cam = None
+        self.display = None
+
+    @traced("devices.close")
+    def close(self) -> None:
+        if self.display is not None:
+            self.display.stop()
+            self.display = None
+        if self.cam is not None:
+            self.cam.close()
+            self.cam = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_slm(config: dict, backend: str, scene=None, verbose: bool = True):
+    from src.slm_ctrl import SLM, FakeSLMBackend
+
+    slm = SLM(verbose=verbose, backend=FakeSLMBackend(scene=scene) if backend == "sim" else None)
+    slm.init()
+    return slm
+
+
+def open_camera(config: dict, backend: str, scene=None):
+    """打开相机，失败抛 RuntimeError"""
+    from src.camera import HikCamera
+
+    cs = config["capture_settings"]
+    sdk = None
+    if backend == "sim":
+        from src.sim_camera import SceneMvCamera
+        sim = (config.get("devices") or {}).get("sim") or {}
+        sdk = SceneMvCamera.bind(scene, pixel_format=sim.get("pixel_format", "Mono8"),
+                                 frame_latency_s=float(sim.get("frame_latency_s", 0.0)))
+    cam = HikCamera(dev_index=0, sdk=sdk, profile=cs.get("camera_features"),
+                    feature_file=cs.get("camera_feature_file") or None)
+    try:
+        ok = cam.open()
+    except OSError as e:     # 没有安装 MVS 的机器上加载 DLL 失败
+        print(f"[ERR] {e}")
+        ok = False
+    if not ok:
+        cam.close()
+        raise RuntimeError("相机打开失败")
+    return cam
+
+
+def open_display(config: dict, backend: str, scene=None):
+    cs = config["capture_settings"]
+    if backend == "sim":
+        from src.sim_display import HeadlessDisplay
+        return HeadlessDisplay(monitor_index=cs["monitor_idx"], scale_factor=cs["scale_factor"],
+                               scene=scene).start()
+    from src.display_ctrl import DisplayController
+    return DisplayController(monitor_index=cs["monitor_idx"], scale_factor=cs["scale_factor"]).start()
+
+
+@traced("devices.open")
+def open_devices(config: dict, slm: bool = False, camera: bool = False, display: bool = False,
+                 verbose: bool = True) -> Devices:
+    """按需打开设备；任一设备打开失败时关闭已打开的设备并抛出 RuntimeError"""
+    backends = device_backends(config)
+    wanted = {"slm": slm, "camera": camera, "display": display}
+    scene = make_scene(config) if any(wanted[k] and backends[k] == "sim" for k in DEVICE_KINDS) else None
+    devs = Devices(backends, scene)
+    if verbose and scene is not None:
+        sims = [k for k in DEVICE_KINDS if wanted[k] and backends[k] == "sim"]
+        print(f"[INFO] 使用模拟设备: {', '.join(sims)}")
+    try:
+        if slm:
+            devs.slm = open_slm(config, backends["slm"], scene, verbose)
+        if camera:
+            devs.cam = open_camera(config, backends["camera"], scene)
+        if display:
+            devs.display = open_display(config, backends["display"], scene)
+    except Exception:
+        devs.close()
+        raise
+    return devs
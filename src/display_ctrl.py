@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+显示器控制：Screen 在独立线程中运行 Tk 事件循环，其他线程通过命令队列控制显示内容。
+
+    disp = DisplayController(monitor_index=2, scale_factor=0.27)
+    disp.start()
+    disp.load_playlist(targets)          # 在 Tk 线程中预渲染全部目标
+    ev = disp.next()                     # 阻塞到该帧实际呈现，ev["t"] 为呈现时刻（perf_counter）
+    ...
+    disp.stop()
+
+  - 命令（show/hide/next/prev/load_playlist/stop）放入队列，由 Tk 线程用 after() 轮询执行，
+    Tk 对象只在创建它的线程中访问
+  - 每次切换后调用 update_idletasks() 完成重绘再打时间戳，记入 presented 列表
+  - 命令默认最多等待 cmd_timeout 秒（超时抛 TimeoutError 并取消尚未执行的命令）；stop 或 Tk 线程退出
+    （包括异常退出）时，队列中未执行的命令以 RuntimeError 结束，调用方不会永久阻塞
+  - Linux 下可在虚拟 X 服务器上运行，例如:
+        xvfb-run -a python src/display_ctrl.py data/example --interval 0.5
+"""
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+# 以脚本方式运行时也能导入项目内的模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from src.screen_viewer import Screen
+from utils.trace import traced
+
+
+class DisplayController:
+    """
+      - scale_factor / position: show() 未指定时使用的默认缩放与位置（position 为 None 时居中）
+      - poll_ms: Tk 线程检查命令队列的间隔
+      - cmd_timeout: 命令未指定 timeout 时的等待上限（秒）
+    """
+
+    def __init__(self, monitor_index: int = 0, bg: str = "black", scale_factor: float = 1.0,
+                 position: tuple = None, cache_size: int = 16, poll_ms: int = 2, cmd_timeout: float = 10.0):
+        self.monitor_index = monitor_index
+        self.bg = bg
+        self.scale_factor = scale_factor
+        self.position = position
+        self.cache_size = cache_size
+        self.poll_ms = poll_ms
+        self.cmd_timeout = cmd_timeout
+        self.screen = None
+        self.playlist = []
+        self.index = -1
+        self.presented = []      # 每次实际呈现的记录
+        self._q = queue.Queue()
+        self._q_lock = threading.Lock()   # 保护 _closed 与入队，关闭后不再有命令进入队列
+        self._closed = False
+        self._ready = threading.Event()
+        self._thread = None
+        self._error = None
+
+    # ========== 生命周期 ==========
+
+    def start(self, timeout: float = 10.0) -> "DisplayController":
+        """启动 Tk 线程并等待窗口创建完成；创建失败时抛 RuntimeError"""
+        if self._thread is not None:
+            return self
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="display-tk", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("显示器窗口创建超时")
+        if self._error is not None:
+            raise RuntimeError(f"显示器窗口创建失败: {self._error}")
+        return self
+
+    def _run(self):
+        try:
+            self.screen = Screen(monitor_index=self.monitor_index, bg=self.bg, cache_size=self.cache_size)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            self._drain("显示器窗口创建失败")
+            return
+        try:
+            self.screen.root.after(0, self._pump)
+            self._ready.set()
+            self.screen.start()
+        finally:
+            self._drain("显示线程已退出")
+
+    def _drain(self, reason: str):
+        """拒绝后续命令，并让队列中剩余命令的 Future 以 RuntimeError 结束"""
+        with self._q_lock:
+            self._closed = True
+        while True:
+            try:
+                cmd, args, fut = self._q.get_nowait()
+            except queue.Empty:
+                return
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(RuntimeError(f"{reason}，命令 {cmd} 未执行"))
+
+    def _pump(self):
+        """Tk 线程：执行队列中的全部命令，然后重新排期"""
+        while True:
+            try:
+                cmd, args, fut = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(getattr(self, f"_do_{cmd}")(*args))
+            except Exception as e:
+                fut.set_exception(e)
+            if cmd == "stop":
+                self._drain("DisplayController 已停止")
+                return
+        self.screen.root.after(self.poll_ms, self._pump)
+
+    def _submit(self, cmd, *args, wait: bool = True, timeout: float = None):
+        """放入命令队列；wait 时等待结果，timeout 为 None 时使用 cmd_timeout"""
+        fut = Future()
+        with self._q_lock:
+            if self._closed or self._thread is None or not self._thread.is_alive():
+                raise RuntimeError("DisplayController 未启动或已停止")
+            self._q.put((cmd, args, fut))
+        if not wait:
+            return fut
+        try:
+            return fut.result(self.cmd_timeout if timeout is None else timeout)
+        except FutureTimeout:
+            fut.cancel()    # 尚未执行时取消，Tk 线程会跳过
+            raise
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """关闭窗口并结束 Tk 线程；可重复调用"""
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            try:
+                self._submit("stop", timeout=timeout)
+            except Exception:
+                pass
+            self._thread.join(timeout)
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ========== 命令（任意线程调用；wait=False 时返回 Future） ==========
+
+    @traced("display.show")
+    def show(self, img_path, scale_factor: float = None, position: tuple = None,
+             wait: bool = True, timeout: float = None):
+        """显示一张图片，返回呈现记录 dict，失败返回 None"""
+        return self._submit("show", str(img_path), scale_factor, position, time.perf_counter(),
+                            wait=wait, timeout=timeout)
+
+    @traced("display.hide")
+    def hide(self, wait: bool = True, timeout: float = None):
+        return self._submit("hide", time.perf_counter(), wait=wait, timeout=timeout)
+
+    def next(self, wait: bool = True, timeout: float = None):
+        """显示播放列表中的下一张（到末尾后回到开头）"""
+        return self._submit("step", 1, time.perf_counter(), wait=wait, timeout=timeout)
+
+    def prev(self, wait: bool = True, timeout: float = None):
+        return self._submit("step", -1, time.perf_counter(), wait=wait, timeout=timeout)
+
+    def load_playlist(self, paths, prewarm: bool = True, timeout: float = None) -> int:
+        """设置播放列表并在 Tk 线程中预渲染（按默认缩放与位置），返回预渲染成功数量"""
+        return self._submit("load_playlist", [str(p) for p in paths], prewarm, timeout=timeout)
+
+    # ========== Tk 线程中执行 ==========
+
+    def _present(self, path, t_cmd):
+        # 完成挂起的重绘后再记时间，作为该帧的呈现时刻
+        self.screen.root.update_idletasks()
+        t = time.perf_counter()
+        ev = {"index": self.index, "path": path, "t": t, "wall": time.time(),
+              "latency_ms": round((t - t_cmd) * 1000.0, 3)}
+        self.presented.append(ev)
+        return ev
+
+    def _do_show(self, path, scale_factor, position, t_cmd):
+        scale_factor = self.scale_factor if scale_factor is None else scale_factor
+        position = self.position if position is None else position
+        if position is None:
+            ok = self.screen.show_image(path, scale_factor)
+        else:
+            ok = self.screen.show_image_at(path, position, scale_factor)
+        return self._present(path, t_cmd) if ok else None
+
+    def _do_hide(self, t_cmd):
+        self.screen.hide()
+        return self._present(None, t_cmd)
+
+    def _do_step(self, step, t_cmd):
+        if not self.playlist:
+            raise RuntimeError("播放列表为空")
+        self.index = (self.index + step) % len(self.playlist)
+        return self._do_show(self.playlist[self.index], None, None, t_cmd)
+
+    def _do_load_playlist(self, paths, prewarm):
+        self.playlist = paths
+        self.index = -1
+        if not prewarm:
+            return 0
+        return self.screen.prewarm([(p, self.scale_factor, self.position) for p in paths])
+
+    def _do_stop(self):
+        self.screen.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from utils.fn import collect_images
+
+    ap = argparse.ArgumentParser(description="按顺序循环显示文件夹内的图片，打印每帧呈现时间")
+    ap.add_argument("folder")
+    ap.add_argument("--monitor", type=int, default=0)
+    ap.add_argument("--scale", type=float, default=1.0)
+    ap.add_argument("--interval", type=float, default=1.0, help="每张显示的秒数")
+    ap.add_argument("--loops", type=int, default=1)
+    args = ap.parse_args()
+
+    images = collect_images(args.folder)["images"]
+    with DisplayController(args.monitor, scale_factor=args.scale) as disp:
+        print(f"[INFO] 预渲染 {disp.load_playlist(images)}/{len(images)} 张")
+        for _ in range(args.loops * len(images)):
+            ev = disp.next()
+            if ev is not None:
+                print(f"[DISP] #{ev['index']} {os.path.basename(ev['path'])}  命令到呈现 {ev['latency_ms']:.2f}ms")
+            time.sleep(args.interval)
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+多步实验：按 config.yaml 中的 sequence 依次执行，设备（SLM / 相机 / 显示器）只初始化一次。
+
+    python src/experiment_runner.py config.yaml
+
+config.yaml 示例（每步未填写的项沿用 capture_settings / task）：
+
+    sequence:
+      - mode: capture_psf
+        slm_image_path: "D:/.../FZA_bin_R25.png"
+        exposure_us: 200000
+        camera_features: {Gain: 6.0}
+      - mode: capture_measurement
+        display_image_path: "D:/.../分辨率测试卡.jpg"
+        repeat: 5
+        description: "分辨率卡 x5"
+
+  - 每步的结果按 single_shot.py 相同的格式追加到运行日志（run.jsonl，每步立即落盘），
+    全部完成后导出一次 run.yaml
+  - 同一张 SLM 图案在多步之间只上传一次（PatternCache）
+  - 相机参数（曝光、camera_features）由 HikCamera.features 缓存，相邻步骤未变化的节点不再写入
+  - 某步的 camera_features 只作用于该步：下一步开始前恢复为基础参数
+    （DEFAULT_PROFILE + capture_settings.camera_features，基础参数之外的节点恢复为首次覆盖前读到的值）
+"""
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+
+# 以脚本方式运行时也能导入项目内的模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.config_utils import (
+    prepare_run_environment, task_codes_from_time,
+    append_log, write_run_yaml, to_json_str, generate_file_prefix
+)
+from utils.trace import span, tracer
+
+MODE_KIND = {"capture_psf": "psf", "capture_measurement": "m"}
+STEP_KEYS = ("mode", "repeat", "description")   # 其余键覆盖 capture_settings
+
+
+def capture_task(cam, writer, proj_dir, file_prefix, code4, settings, repeat=1, timeout_ms=3000):
+    """
+    按 settings 拍摄一次任务并交给 writer 写盘，返回 (首个保存路径或 None, 连拍信息或 None)。
+    repeat > 1 时在一次取流内连拍，逐帧写入堆栈 .npy（原始计数），同时流式合成；
+    合成帧按传感器有效位数归一化到 [0,1] 后存为 float32 .npy，位数记入连拍信息的 bit_depth。
+    """
+    saved = []
+    def on_saved(path, ok, err):
+        if ok:
+            saved.append(path)
+
+    burst_info = None
+    if repeat > 1:
+        reduce = settings.get("burst_reduce", "mean") or None
+        stack_path = proj_dir / f"{file_prefix}-{code4}-stack.npy"
+        combined, n_ok = cam.burst(
+            repeat,
+            exposure_us=settings["exposure_us"],
+            timeout_ms=timeout_ms,
+            trigger=settings.get("trigger") or None,
+            reduce=reduce,
+            stack_path=stack_path
+        )
+        if n_ok:
+            from src.camera import pixel_bits
+
+            bit_depth = pixel_bits(cam.frame_info.enPixelType)
+            burst_info = {"repeat": repeat, "frames": n_ok, "reduce": reduce,
+                          "stack_path": str(stack_path), "bit_depth": bit_depth}
+            if combined is not None:
+                combined = combined.astype(np.float32) / np.float32((1 << bit_depth) - 1)
+                writer.submit(combined, proj_dir / f"{file_prefix}-{code4}.npy", callback=on_saved)
+            else:
+                saved.append(str(stack_path))
+    else:
+        cam.snap_async(
+            writer,
+            proj_dir / f"{file_prefix}-{code4}.jpg",
+            exposure_us=settings["exposure_us"],
+            timeout_ms=timeout_ms,
+            callback=on_saved
+        )
+    with span("writer.flush"):
+        writer.flush()   # 等待后台写盘完成后再登记
+    return (saved[0] if saved else None), burst_info
+
+
+def make_entry(code4, task_id, mode, description, capture_settings, physical_setup,
+               captured=None, burst_info=None, **extra) -> dict:
+    """生成一条 run.yaml save_log 记录 {task_<code4>: {...}}"""
+    entry_val = {
+        "task_id": task_id,
+        "task_time": datetime.datetime.now().astimezone().isoformat(timespec='seconds'),
+        "mode": mode,
+        "description": description,
+        "capture_settings": to_json_str(capture_settings),
+        "physical_setup": to_json_str(physical_setup)
+    }
+    if captured:
+        if MODE_KIND.get(mode) == "psf": entry_val["psf_path"] = captured
+        else: entry_val["measurement_path"] = captured
+    if burst_info:
+        entry_val["burst"] = burst_info
+    entry_val.update(extra)
+    return {f"task_{code4}": entry_val}
+
+
+class ExperimentRunner:
+    """
+    steps 为 sequence 列表；devices 可传入已打开的 (slm, cam, display) 用于复用，
+    为 None 时按 config.yaml 的 devices 配置（真实硬件或模拟）打开需要的设备。
+    """
+
+    def __init__(self, config, run_data, run_path, proj_dir, steps=None, devices=None,
+                 timeout_ms: int = 3000, export_yaml: bool = True):
+        self.config = config
+        self.run_data = run_data
+        self.run_path = run_path
+        self.proj_dir = proj_dir
+        self.steps = list(steps if steps is not None else config.get("sequence") or [])
+        self.timeout_ms = timeout_ms
+        # run_data 为 dict（旧格式）或 project.run_log: "yaml" 时每步都写完整 run.yaml
+        self.sync_yaml = getattr(run_data, "sync_yaml", True)
+        self.export_yaml = export_yaml
+        self.slm, self.cam, self.display = devices or (None, None, None)
+        self._own_devices = devices is None
+        self._devices = None
+        self._patterns = None
+        self._feature_restore = {}   # 被某步覆盖过的、基础参数之外的节点 -> 原值
+        self.results = []
+
+    def step_settings(self, step: dict) -> dict:
+        settings = dict(self.config["capture_settings"])
+        settings.update({k: v for k, v in step.items() if k not in STEP_KEYS})
+        return settings
+
+    # ========== 设备 ==========
+
+    def open(self):
+        """按全部步骤的需要一次性打开设备"""
+        from src.slm_sweep import PatternCache
+
+        settings = [self.step_settings(s) for s in self.steps]
+        need_slm = any(s.get("slm_image_path") for s in settings)
+        need_display = any(self.step_mode(st) == "capture_measurement" and s.get("display_image_path")
+                           for st, s in zip(self.steps, settings))
+        if self._own_devices:
+            # 按 config.yaml 的 devices 选择真实硬件或模拟设备（src/devices.py）
+            from src.devices import open_devices
+            self._devices = open_devices(self.config, slm=need_slm, camera=True, display=need_display)
+            self.slm, self.cam, self.display = self._devices.slm, self._devices.cam, self._devices.display
+        if self.slm is not None:
+            self._patterns = PatternCache(self.slm, capacity=len(self.steps) or 1)
+        return self
+
+    def close(self):
+        if self._patterns is not None:
+            self._patterns.clear()
+        if self._devices is not None:
+            self._devices.close()
+            self._devices = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ========== 执行 ==========
+
+    def apply_camera_features(self, i: int, settings: dict) -> None:
+        """
+        应用第 i 步的相机参数：基础参数（DEFAULT_PROFILE + capture_settings.camera_features）
+        + 之前各步覆盖过、基础参数之外的节点的原值 + 本步的 camera_features，一次 apply 写入；
+        与缓存相同的值不访问 SDK，因此通常只有上一步改过的节点会被写回。
+        """
+        from src.camera_features import DEFAULT_PROFILE
+
+        baseline = {**DEFAULT_PROFILE, **(self.config["capture_settings"].get("camera_features") or {})}
+        step_features = settings.get("camera_features") or {}
+        for name in step_features:
+            if name in baseline or name in self._feature_restore:
+                continue
+            value = self.cam.features.get(name)    # 首次覆盖前的值
+            if value is None:
+                print(f"[WARN] 读取相机参数 {name} 失败，第 {i + 1} 步之后无法恢复")
+                continue
+            self._feature_restore[name] = value
+
+        failed = self.cam.features.apply({**baseline, **self._feature_restore, **step_features})
+        for name, ret in failed.items():
+            if name in DEFAULT_PROFILE and name not in step_features:
+                continue    # 与 open() 一致：默认项失败不提示（型号差异）
+            print(f"[WARN] 第 {i + 1} 步设置相机参数 {name} 失败: 0x{ret:x}")
+
+    def step_mode(self, step: dict) -> str:
+        return step.get("mode") or self.config["task"]["mode"]
+
+    def run_step(self, i: int, step: dict, writer) -> dict:
+        mode = self.step_mode(step)
+        if mode not in MODE_KIND:
+            raise ValueError(f"第 {i} 步 mode 只能是 {list(MODE_KIND)}，收到 {mode!r}")
+        kind = MODE_KIND[mode]
+        settings = self.step_settings(step)
+        repeat = int(step.get("repeat", self.config["task"].get("repeat", 1)) or 1)
+        print(f"[STEP {i + 1}/{len(self.steps)}] {mode} repeat={repeat} {step.get('description', '')}")
+
+        # 本步各阶段的耗时随条目写入日志（trace 开启时）
+        with tracer.task(f"step{i + 1}", step=i + 1) as tt:
+            if self.display is not None:
+                path = settings.get("display_image_path") if mode == "capture_measurement" else None
+                if path:
+                    if self.display.show(path, settings.get("scale_factor")) is None:
+                        raise RuntimeError(f"显示器图片显示失败: {path}")
+                else:
+                    self.display.hide()
+
+            # 每步可覆盖相机参数，上一步的覆盖先恢复；值未变化的节点不会重复写入
+            self.apply_camera_features(i, settings)
+
+            slm_path = settings.get("slm_image_path")
+            if slm_path:
+                dh = self._patterns.get(slm_path)
+                if dh is None or not self.slm.show_handle(dh):
+                    raise RuntimeError(f"SLM 图案显示失败: {slm_path}")
+                settle_ms = settings.get("slm_settle_ms", 30)
+                with span("slm.settle", ms=settle_ms):
+                    time.sleep(settle_ms / 1000.0)
+
+            code4, task_id = task_codes_from_time(kind, k=4)
+            tt.name = f"task_{code4}"
+            file_prefix = generate_file_prefix(kind, self.run_data, 3)
+            captured, burst_info = capture_task(self.cam, writer, self.proj_dir, file_prefix, code4,
+                                                settings, repeat, self.timeout_ms)
+            if not captured:
+                print(f"[ERR] 第 {i + 1} 步拍摄失败！")
+
+            entry = make_entry(code4, task_id, mode,
+                               step.get("description", self.config["task"].get("description", "")),
+                               settings, self.config["physical_setup"], captured, burst_info,
+                               step=i + 1, steps=len(self.steps), **tt.log_fields())
+        append_log(self.run_data, entry)
+        if self.sync_yaml:
+            write_run_yaml(self.run_path, self.run_data)
+        return entry
+
+    def run(self) -> list:
+        """执行全部步骤，返回本次追加的条目列表"""
+        from src.frame_writer import AsyncFrameWriter
+
+        if not self.steps:
+            print("[WARN] sequence 为空，没有需要执行的步骤")
+            return []
+        t0 = time.perf_counter()
+        with AsyncFrameWriter(max_queue=4, workers=2) as writer:
+            for i, step in enumerate(self.steps):
+                self.results.append(self.run_step(i, step, writer))
+        if self.export_yaml and not self.sync_yaml:
+            write_run_yaml(self.run_path, self.run_data)
+        print(f"[OK] 共 {len(self.steps)} 步，用时 {time.perf_counter() - t0:.1f}s，已写入 {self.run_path}")
+        tracer.save(self.proj_dir / "traces", datetime.datetime.now().strftime("run-%Y%m%d-%H%M%S"))
+        return self.results
+
+
+def main(config_path):
+    config, run_data, run_path, proj_dir, _ = prepare_run_environment(config_path)
+    with ExperimentRunner(config, run_data, run_path, proj_dir) as runner:
+        runner.run()
+
+
+if __name__ == "__main__":
+    main(os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else os.path.join(ROOT, "config.yaml"))
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+文件夹对焦评价：用 collect_images 遍历文件夹，进程池并行打分，结果缓存并输出为表格。
+
+    python src/focus_scan.py D:/data/focus_sweep --metric tamura --downsample 2 --out scores.csv
+
+  - 缓存文件默认为 <folder>/.focus_cache.json，键为 (路径, mtime, 大小, 评价参数)，
+    再次运行时只计算新增或修改过的图片
+  - --out 以 .csv 结尾写 CSV；以 .parquet 结尾写 Parquet（需要 pandas + pyarrow）
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# 以脚本方式运行时也能导入项目内的模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.fn import collect_images, imread
+from src.calc_tamura import METRICS, focus_metric
+
+CACHE_NAME = ".focus_cache.json"
+COLUMNS = ["path", "metric", "score", "mtime", "size"]
+
+
+def _params_key(metric, roi, downsample) -> str:
+    return json.dumps({"metric": metric, "roi": list(roi) if roi else None,
+                       "downsample": downsample}, sort_keys=True)
+
+def _cache_key(path, st, params) -> str:
+    return f"{path}|{st.st_mtime_ns}|{st.st_size}|{params}"
+
+def load_cache(cache_path) -> dict:
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"[WARN] 缓存文件损坏，忽略: {cache_path}")
+        return {}
+
+def save_cache(cache_path, cache: dict) -> None:
+    tmp = f"{cache_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, cache_path)
+
+def _score_file(job):
+    """进程池任务：读取并打分，读取失败返回 None"""
+    path, metric, roi, downsample = job
+    image = imread(path)
+    if image is None:
+        return None
+    return focus_metric(image, metric, roi, downsample)
+
+def scan_folder(folder, metric="tamura", roi=None, downsample=1, workers=None, use_cache=True):
+    """
+    对文件夹内全部图片打分，返回按自然排序的行列表：
+    [{"path", "metric", "score", "mtime", "size"}, ...]
+    """
+    images = collect_images(folder)["images"]
+    cache_path = os.path.join(folder, CACHE_NAME) if use_cache else None
+    cache = load_cache(cache_path)
+    params = _params_key(metric, roi, downsample)
+
+    rows, todo, live = [], [], set()
+    for path in images:
+        st = os.stat(path)
+        key = _cache_key(path, st, params)
+        live.add(key)
+        row = {"path": path, "metric": metric, "score": cache.get(key),
+               "mtime": st.st_mtime, "size": st.st_size}
+        rows.append(row)
+        if row["score"] is None:
+            todo.append((row, key))
+
+    print(f"[LOG] 缓存命中 {len(rows) - len(todo)} 张，需计算 {len(todo)} 张")
+    if todo:
+        jobs = [(row["path"], metric, roi, downsample) for row, _ in todo]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scores = pool.map(_score_file, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1))))
+            for (row, key), score in zip(todo, scores):
+                row["score"] = score
+                if score is not None:
+                    cache[key] = score
+                else:
+                    print(f"[WARN] 无法读取: {row['path']}")
+        if cache_path:
+            # 同一组参数只保留本次仍存在的条目，避免缓存无限增长
+            cache = {k: v for k, v in cache.items() if k in live or not k.endswith(params)}
+            save_cache(cache_path, cache)
+    return rows
+
+def write_table(rows, out_path) -> None:
+    """按扩展名写 CSV 或 Parquet"""
+    if str(out_path).lower().endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise RuntimeError("写 Parquet 需要安装 pandas 和 pyarrow，或改用 .csv 输出")
+        pd.DataFrame(rows, columns=COLUMNS).to_parquet(out_path, index=False)
+        return
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="文件夹对焦评价（并行 + 缓存）")
+    ap.add_argument("folder")
+    ap.add_argument("--metric", choices=list(METRICS), default="tamura")
+    ap.add_argument("--downsample", type=int, default=1)
+    ap.add_argument("--roi", type=int, nargs=4, metavar=("X", "Y", "W", "H"), default=None)
+    ap.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数")
+    ap.add_argument("--out", default=None, help="输出表格 .csv / .parquet，默认 <folder>/focus_<metric>.csv")
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--plot", action="store_true")
+    return ap.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    rows = scan_folder(args.folder, args.metric, args.roi, args.downsample,
+                       args.workers, not args.no_cache)
+    out_path = args.out or os.path.join(args.folder, f"focus_{args.metric}.csv")
+    write_table(rows, out_path)
+    print(f"[OK] 共 {len(rows)} 张，结果写入 {out_path}")
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+
+        plt.plot([r["score"] for r in rows], marker='o', linestyle='-', color='b')
+        plt.title(f'{args.metric} for Images in Folder')
+        plt.xlabel('Image Index')
+        plt.ylabel(args.metric)
+        plt.grid(True)
+        plt.show()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+连续采集用的环形帧缓冲：固定数量的预分配槽位，生产者（SDK 回调线程 / 取流线程）把帧拷入空闲槽，
+消费者用 pop() 逐帧取出，整个采集过程不再为每帧分配内存。
+
+    ring = FrameRing(slots=8, slot_bytes=payload, overwrite=True)
+    ring.push(p_data, n_bytes, meta)         # 生产者
+    raw, meta = ring.pop(timeout=1.0)        # 消费者；raw 在下一次 pop() 前有效
+
+  - overwrite=True : 消费者跟不上时覆盖最旧的未读帧（实时对焦，始终看到最新画面）
+    overwrite=False: 槽位用尽时丢弃新到的帧（延时摄影，已入环的帧按顺序保留）
+  - pop(latest=True) 直接跳到最新一帧，之前未读的帧计入 skipped
+  - 统计（stats()）: received 收到、delivered 交付、dropped 环满丢弃/覆盖、
+    skipped 被 latest 跳过、lost 相机端帧号不连续（带宽不足或 SDK 内部缓存溢出）
+"""
+import threading
+from collections import deque
+from ctypes import memmove
+
+import numpy as np
+
+
+class FrameRing:
+    def __init__(self, slots: int, slot_bytes: int, overwrite: bool = True):
+        if slots < 2:
+            raise ValueError(f"slots 至少为 2（一个交给消费者，一个供写入），收到 {slots}")
+        self.slot_bytes = int(slot_bytes)
+        self.overwrite = overwrite
+        self._bufs = [np.empty(self.slot_bytes, dtype=np.uint8) for _ in range(slots)]
+        self._meta = [None] * slots
+        self._free = deque(range(slots))
+        self._ready = deque()
+        self._leased = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_num = None
+        self.received = self.delivered = self.dropped = self.skipped = self.lost = 0
+
+    @property
+    def slots(self) -> int:
+        return len(self._bufs)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # ========== 生产者 ==========
+
+    def push(self, src, nbytes: int, meta: dict) -> bool:
+        """把 src（ctypes 指针 / 地址）处的 nbytes 字节拷入一个槽位；环满且不覆盖时返回 False"""
+        nbytes = min(int(nbytes), self.slot_bytes)
+        with self._cond:
+            self.received += 1
+            num = meta.get("frame_num")
+            if num is not None and self._last_num is not None and num > self._last_num + 1:
+                self.lost += num - self._last_num - 1
+            self._last_num = num
+            if self._free:
+                i = self._free.popleft()
+            elif self.overwrite and self._ready:
+                i = self._ready.popleft()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return False
+        # 槽位已从队列取出，只有本线程持有，拷贝时不必持锁
+        memmove(self._bufs[i].ctypes.data, src, nbytes)
+        meta["nbytes"] = nbytes
+        with self._cond:
+            self._meta[i] = meta
+            self._ready.append(i)
+            self._cond.notify()
+        return True
+
+    def close(self) -> None:
+        """生产结束：唤醒等待中的消费者，之后 pop() 取完剩余帧后返回 None"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # ========== 消费者 ==========
+
+    def pop(self, timeout: float = None, latest: bool = False):
+        """
+        取出下一帧，返回 (raw, meta)；raw 为槽位内 uint8 视图，下一次 pop() 后槽位归还并可能被覆盖。
+        超时或已 close 且无剩余帧时返回 None。
+        """
+        with self._cond:
+            self._release()
+            if not self._cond.wait_for(lambda: self._ready or self._closed, timeout):
+                return None
+            if not self._ready:
+                return None
+            if latest:
+                while len(self._ready) > 1:
+                    self._free.append(self._ready.popleft())
+                    self.skipped += 1
+            i = self._ready.popleft()
+            self._leased = i
+            self.delivered += 1
+            meta = self._meta[i]
+        return self._bufs[i][:meta["nbytes"]], meta
+
+    def _release(self) -> None:
+        if self._leased is not None:
+            self._free.append(self._leased)
+            self._leased = None
+
+    def release(self) -> None:
+        """消费者不再使用上一帧时可提前归还槽位"""
+        with self._cond:
+            self._release()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._ready)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"slots": self.slots, "received": self.received, "delivered": self.delivered,
+                    "dropped": self.dropped, "skipped": self.skipped, "lost": self.lost,
+                    "pending": len(self._ready)}
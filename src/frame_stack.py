@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+多帧连拍的合成与落盘：
+  - FrameAccumulator: 边采边合成，mean 只保留一份 float 累加和（与帧数无关的内存占用）；
+    median 需要全部帧，按相机原始位宽（uint8/uint16）预分配 N 帧
+  - StackWriter: 把 N 帧逐帧写入磁盘上的 (N, H, W[, C]) .npy（memmap），不在内存里攒整组数据
+"""
+import numpy as np
+
+REDUCE_MODES = (None, "mean", "median")
+
+
+class FrameAccumulator:
+    def __init__(self, n_frames: int, reduce: str = "mean", dtype=np.float64):
+        if reduce not in REDUCE_MODES:
+            raise ValueError(f"reduce 只能是 {REDUCE_MODES}，收到 {reduce!r}")
+        self.n_frames = n_frames
+        self.reduce = reduce
+        self.dtype = dtype
+        self.count = 0
+        self._acc = None
+
+    def add(self, frame: np.ndarray) -> None:
+        if self.reduce is None:
+            self.count += 1
+            return
+        if self._acc is None:
+            if self.reduce == "mean":
+                self._acc = np.zeros(frame.shape, dtype=self.dtype)
+            else:
+                self._acc = np.empty((self.n_frames,) + frame.shape, dtype=frame.dtype)
+        elif (self._acc.shape if self.reduce == "mean" else self._acc.shape[1:]) != frame.shape:
+            raise ValueError(f"帧尺寸变化: {frame.shape}")
+        if self.reduce == "mean":
+            self._acc += frame
+        else:
+            if self.count >= self.n_frames:
+                raise IndexError(f"超过预分配帧数 {self.n_frames}")
+            self._acc[self.count] = frame
+        self.count += 1
+
+    def result(self):
+        """返回合成结果（mean 为 float，median 为 float64）；无帧或 reduce=None 时返回 None"""
+        if self._acc is None or self.count == 0:
+            return None
+        if self.reduce == "mean":
+            return self._acc / self.count
+        return np.median(self._acc[:self.count], axis=0)
+
+
+class StackWriter:
+    """把连拍帧逐帧写入 .npy（memmap），close() 后即为完整的堆栈数据集"""
+
+    def __init__(self, path, n_frames: int):
+        self.path = str(path)
+        self.n_frames = n_frames
+        self.count = 0
+        self._mm = None
+
+    def add(self, frame: np.ndarray) -> None:
+        if self._mm is None:
+            self._mm = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=frame.dtype, shape=(self.n_frames,) + frame.shape)
+        if self.count >= self.n_frames:
+            raise IndexError(f"超过预分配帧数 {self.n_frames}")
+        self._mm[self.count] = frame
+        self.count += 1
+
+    def close(self) -> None:
+        if self._mm is None:
+            return
+        self._mm.flush()
+        del self._mm
+        self._mm = None
+        if self.count < self.n_frames:
+            # 有帧失败时截掉未写入的部分
+            full = np.load(self.path, mmap_mode="r")
+            part = np.array(full[:self.count])
+            del full
+            np.save(self.path, part)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+后台写盘：采集线程只把帧放进有界队列，编码与写文件在工作线程中完成。
+
+    with AsyncFrameWriter(max_queue=8, workers=2) as writer:
+        writer.submit(frame, "out/001-m.png", callback=on_saved)
+    # 退出 with 时会等待队列清空（flush）再关闭
+
+  - frame 可以是 ndarray（按扩展名编码为 .jpg/.jpeg/.bmp/.png/.tif/.tiff，或原样保存为 .npy），
+    也可以是已编码好的 bytes（直接写入）
+  - 队列满时 submit 阻塞（背压），避免内存无限增长
+  - callback(path, ok, err) 在工作线程中调用，可用于在写盘成功后登记 run.yaml 条目
+  - bit_depth: 高位深帧（如 Mono12 存于 uint16）写成 8 位格式时按有效位数右移，
+    写 .png/.tif/.npy 则保留完整位深
+"""
+import os
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+from utils.trace import span
+
+_STOP = object()
+
+# 只支持 8 位数据的格式
+_EXT_8BIT = {".jpg", ".jpeg", ".bmp"}
+_EXT_IMG = _EXT_8BIT | {".png", ".tif", ".tiff", ".webp"}
+
+
+def encode_frame(frame, path: str, jpeg_quality: int = 90, bit_depth: int = None) -> bytes:
+    """按 path 扩展名把 ndarray 编码为文件内容；3 通道数组按 RGB 处理"""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext == ".npy":
+        return None   # .npy 由 np.save 直接写
+    if ext not in _EXT_IMG:
+        raise ValueError(f"不支持的保存格式: {ext}")
+    if ext in _EXT_8BIT and frame.dtype != np.uint8:
+        if not bit_depth or not np.issubdtype(frame.dtype, np.integer):
+            raise ValueError(f"{ext} 只支持 8 位图像，{frame.dtype} 请保存为 .png/.tif/.npy")
+        frame = (frame >> max(0, bit_depth - 8)).astype(np.uint8)
+    if frame.ndim == 3 and frame.shape[2] == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)] if ext in (".jpg", ".jpeg") else []
+    ok, data = cv2.imencode(ext, frame, params)
+    if not ok:
+        raise RuntimeError(f"编码失败: {path}")
+    return data.tobytes()
+
+
+def write_frame(frame, path: str, jpeg_quality: int = 90, bit_depth: int = None) -> None:
+    """同步编码并写入（先写临时文件再替换，避免留下半个文件）"""
+    path = str(path)
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.part"
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if isinstance(frame, (bytes, bytearray, memoryview)) or ext == ".npy":
+            data = frame
+        else:
+            with span("writer.encode", ext=ext):
+                data = encode_frame(frame, path, jpeg_quality, bit_depth)
+        with span("writer.write", ext=ext):
+            with open(tmp, "wb") as f:
+                if isinstance(data, np.ndarray):
+                    np.save(f, data)
+                else:
+                    f.write(data)
+            os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class AsyncFrameWriter:
+    """有界队列 + 工作线程池的异步写盘器"""
+
+    def __init__(self, max_queue: int = 8, workers: int = 2, jpeg_quality: int = 90, verbose: bool = True):
+        self.jpeg_quality = jpeg_quality
+        self.verbose = verbose
+        self.written = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._q = queue.Queue(maxsize=max(1, max_queue))
+        self._closed = False
+        self._threads = []
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._worker, name=f"frame-writer-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    @property
+    def pending(self) -> int:
+        return self._q.unfinished_tasks
+
+    def submit(self, frame, path, callback=None, timeout: float = None, bit_depth: int = None) -> bool:
+        """
+        提交一帧；队列满时阻塞，timeout 秒后仍无空位则返回 False。
+        注意 frame 会在后台使用，调用方之后不应再修改它（HikCamera 的零拷贝数组需先 copy）。
+        """
+        if self._closed:
+            raise RuntimeError("AsyncFrameWriter 已关闭")
+        try:
+            self._q.put((frame, str(path), callback, bit_depth), timeout=timeout)
+            return True
+        except queue.Full:
+            print(f"[WARN] 写盘队列已满，丢弃: {path}")
+            return False
+
+    def _worker(self):
+        while True:
+            item = self._q.get()
+            try:
+                if item is _STOP:
+                    return
+                frame, path, callback, bit_depth = item
+                err = None
+                try:
+                    write_frame(frame, path, self.jpeg_quality, bit_depth)
+                except Exception as e:
+                    err = e
+                with self._lock:
+                    if err is None:
+                        self.written += 1
+                    else:
+                        self.failed += 1
+                if self.verbose:
+                    if err is None:
+                        print(f"[OK] 已保存: {path}")
+                    else:
+                        print(f"[ERR] 写文件失败: {path}: {err}")
+                if callback is not None:
+                    try:
+                        callback(path, err is None, err)
+                    except Exception as e:
+                        print(f"[WARN] 写盘回调异常: {e}")
+            finally:
+                self._q.task_done()
+
+    def flush(self):
+        """等待已提交的帧全部写完"""
+        self._q.join()
+
+    def close(self):
+        """flush 后停止工作线程；可重复调用"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        for _ in self._threads:
+            self._q.put(_STOP)
+        for t in self._threads:
+            t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
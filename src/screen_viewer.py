@@ -4,10 +4,87 @@ from PIL.Image import Resampling
 from screeninfo import get_monitors
 import time
 import os
+import sys
+from collections import OrderedDict
+
+# 以脚本方式运行时也能导入项目内的 utils
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.trace import traced
+
+
+@traced("screen.render")
+def render_frame(img_path: str, geom: tuple, bg: str = "black", scale_factor: float = 1.0, position: tuple = None):
+    """
+    把图片缩放后合成到整屏画布上，返回 (PIL 画布, 原始尺寸, 缩放后尺寸)。
+    position 为 None 时居中，否则为图像中心在屏幕上的 (x, y)。
+    不涉及 Tk，可在任意线程中调用。
+    """
+    x, y, w, h = geom
+
+    # 打开图片并转换为 RGB 模式
+    with Image.open(img_path) as im:
+        pil = im.convert("RGB")
+    in_w, in_h = pil.size
+
+    # 计算缩放后的新尺寸
+    new_w = int(in_w * scale_factor)
+    new_h = int(in_h * scale_factor)
+    out = pil.resize((new_w, new_h), Resampling.LANCZOS)
+
+    # 创建一个背景色填充的空白画布
+    canvas_image = Image.new("RGB", (w, h), bg)
+
+    if position is None:
+        # 计算居中显示的位置
+        offset_x = (w - new_w) // 2
+        offset_y = (h - new_h) // 2
+    else:
+        # 使用传入的 position 来控制图像的位置
+        pos_x, pos_y = position
+        offset_x = pos_x - new_w // 2
+        offset_y = pos_y - new_h // 2
+
+    # 将缩放后的图像粘贴到空白画布上
+    canvas_image.paste(out, (offset_x, offset_y))
+    return canvas_image, (in_w, in_h), (new_w, new_h)
+
+
+class FrameCache:
+    """合成好的整屏帧的 LRU 缓存，键见 Screen.frame_key()"""
+
+    def __init__(self, capacity: int = 16):
+        self.capacity = max(1, capacity)
+        self._frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def get(self, key):
+        entry = self._frames.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._frames.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry) -> None:
+        self._frames[key] = entry
+        self._frames.move_to_end(key)
+        while len(self._frames) > self.capacity:
+            self._frames.popitem(last=False)
+
+    def clear(self):
+        self._frames.clear()
+
 
 class Screen:
-    def __init__(self, monitor_index: int = 0, bg: str = "black"):
-        """在 init 中选定显示器，并创建全屏 Tk 窗口与 Canvas。"""
+    def __init__(self, monitor_index: int = 0, bg: str = "black", cache_size: int = 16):
+        """在 init 中选定显示器，并创建全屏 Tk 窗口与 Canvas；cache_size 为缓存的整屏帧数。"""
         self.root = tk.Tk()
         self.root.configure(bg=bg)
         self.root.overrideredirect(True)     # 无边框
@@ -35,36 +112,58 @@ class Screen:
         self.canvas.pack(fill="both", expand=True)
 
         self._tkimg = None  # 保存引用，防止 GC
+        self._item = None   # Canvas 上的图像项，切换时只替换其内容
         self.bg = bg  # 保存背景色
+        self.frames = FrameCache(cache_size)  # 合成好的整屏帧
+
+    def frame_key(self, img_path: str, scale_factor: float = 1.0, position: tuple = None) -> tuple:
+        """缓存键：(路径, mtime, 缩放, 位置, 显示器几何, 背景色)；文件被修改后自动失效"""
+        path = os.path.abspath(img_path)
+        return (path, os.stat(path).st_mtime_ns, float(scale_factor),
+                None if position is None else tuple(position), self.geom, self.bg)
+
+    def _frame(self, img_path: str, scale_factor: float, position: tuple):
+        """取合成好的整屏帧（PhotoImage），未命中时渲染并放入缓存"""
+        key = self.frame_key(img_path, scale_factor, position)
+        entry = self.frames.get(key)
+        if entry is None:
+            canvas_image, in_size, new_size = render_frame(img_path, self.geom, self.bg, scale_factor, position)
+            entry = (ImageTk.PhotoImage(canvas_image), in_size, new_size)
+            self.frames.put(key, entry)
+        return entry
+
+    def prewarm(self, items) -> int:
+        """
+        在开始采集前预先渲染一组帧，items 为 img_path 或 (img_path, scale_factor[, position])。
+        需在 Tk 线程中调用（PhotoImage 属于创建它的解释器），返回成功数量。
+        """
+        n_ok = 0
+        for item in items:
+            if isinstance(item, (str, os.PathLike)):
+                item = (item,)
+            path, scale_factor, position = (tuple(item) + (1.0, None))[:3]
+            try:
+                self._frame(str(path), scale_factor, position)
+                n_ok += 1
+            except Exception as e:
+                print(f"[WARN] 预渲染失败: {path}, 错误: {e}")
+        return n_ok
+
+    def _blit(self, tkimg) -> None:
+        # 只替换 Canvas 上那一个图像项，不重建
+        x, y, w, h = self.geom
+        if self._item is None:
+            self._item = self.canvas.create_image(w // 2, h // 2, image=tkimg, anchor="center")
+        else:
+            self.canvas.itemconfigure(self._item, image=tkimg, state="normal")
+        self._tkimg = tkimg
 
+    @traced("screen.show")
     def show_image(self, img_path: str, scale_factor: float = 1.0) -> bool:
         """根据缩放因子缩放图像，按中心点显示，并填充背景色"""
         try:
-            x, y, w, h = self.geom
-
-            # 打开图片并转换为 RGB 模式
-            pil = Image.open(img_path).convert("RGB")
-            in_w, in_h = pil.size
-
-            # 计算缩放后的新尺寸
-            new_w = int(in_w * scale_factor)
-            new_h = int(in_h * scale_factor)
-            out = pil.resize((new_w, new_h), Resampling.LANCZOS)
-
-            # 创建一个背景色填充的空白画布
-            canvas_image = Image.new("RGB", (w, h), self.bg)
-
-            # 计算居中显示的位置
-            offset_x = (w - new_w) // 2
-            offset_y = (h - new_h) // 2
-
-            # 将缩放后的图像粘贴到空白画布上
-            canvas_image.paste(out, (offset_x, offset_y))
-
-            # 转换为 Tkinter 图像并显示
-            self.canvas.delete("all")
-            self._tkimg = ImageTk.PhotoImage(canvas_image)
-            self.canvas.create_image(w // 2, h // 2, image=self._tkimg, anchor="center")
+            tkimg, (in_w, in_h), (new_w, new_h) = self._frame(img_path, scale_factor, None)
+            self._blit(tkimg)
 
             print(f"[INFO] 成功显示: {img_path}")
             print(f"原始尺寸: {in_w}x{in_h}, 缩放后的尺寸: {new_w}x{new_h}")
@@ -73,35 +172,12 @@ class Screen:
             print(f"[ERROR] 显示失败: {img_path}, 错误: {e}")
             return False
 
+    @traced("screen.show")
     def show_image_at(self, img_path: str, position: tuple, scale_factor: float = 1.0) -> bool:
         """根据缩放因子缩放图像，指定位置显示，并填充背景色"""
         try:
-            x, y, w, h = self.geom
-
-            # 打开图片并转换为 RGB 模式
-            pil = Image.open(img_path).convert("RGB")
-            in_w, in_h = pil.size
-
-            # 计算缩放后的新尺寸
-            new_w = int(in_w * scale_factor)
-            new_h = int(in_h * scale_factor)
-            out = pil.resize((new_w, new_h), Resampling.LANCZOS)
-
-            # 创建一个背景色填充的空白画布
-            canvas_image = Image.new("RGB", (w, h), self.bg)
-
-            # 使用传入的 position 来控制图像的位置
-            pos_x, pos_y = position
-            offset_x = pos_x - new_w // 2
-            offset_y = pos_y - new_h // 2
-
-            # 将缩放后的图像粘贴到空白画布上
-            canvas_image.paste(out, (offset_x, offset_y))
-
-            # 转换为 Tkinter 图像并显示
-            self.canvas.delete("all")
-            self._tkimg = ImageTk.PhotoImage(canvas_image)
-            self.canvas.create_image(w // 2, h // 2, image=self._tkimg, anchor="center")
+            tkimg, (in_w, in_h), (new_w, new_h) = self._frame(img_path, scale_factor, position)
+            self._blit(tkimg)
 
             print(f"[INFO] 成功显示: {img_path}")
             print(f"原始尺寸: {in_w}x{in_h}, 缩放后的尺寸: {new_w}x{new_h}, 显示位置: {position}")
@@ -110,6 +186,11 @@ class Screen:
             print(f"[ERROR] 显示失败: {img_path}, 错误: {e}")
             return False
 
+    def hide(self) -> None:
+        """隐藏当前图像，只显示背景色"""
+        if self._item is not None:
+            self.canvas.itemconfigure(self._item, state="hidden")
+
     def start(self):
         """进入事件循环（只进一次）"""
         self.root.mainloop()
@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+"""
+MvCamera 的替身实现：接口与 MvImport.MvCameraControl_class.MvCamera 中 HikCamera 用到的部分一致，
+不加载 MvCameraControl.dll，只记录每个 SDK 接口的调用次数与耗时，可模拟取流启动/取帧延迟。
+
+用法：
+    cam = HikCamera(dev_index=0, sdk=FakeMvCamera)
+    cam.open()
+    with cam.stream():
+        for i in range(100):
+            cam.snap(f"{i:03d}.bmp")
+    print(cam.cam.calls["MV_CC_StartGrabbing"])   # -> 1
+    print(cam.cam.calls["MV_CC_SetFloatValue"])   # -> 1（曝光未变化，FeatureCache 跳过重复写入）
+
+连续采集（回调 / GetImageBuffer）时按 frame_period_s 的节拍出帧，消费者跟不上时可观察环形缓冲的丢帧统计。
+FeatureSave/FeatureLoad 用简单的 “节点<TAB>类型<TAB>值” 文本文件模拟 MVS 的参数文件。
+
+SimScene + SceneMvCamera 组成光学模拟：假 SLM / 无窗口显示器把当前图案与显示内容写入 SimScene，
+相机每次出帧时渲染 “显示图像 ⊛ PSF(当前 SLM 图案) + 噪声”，亮度随 ExposureTime 线性变化。
+
+    scene = SimScene(640, 480, seed=0)
+    sdk = SceneMvCamera.bind(scene)          # 绑定场景的 MvCamera 替身类
+    cam = HikCamera(sdk=sdk); cam.open()
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from ctypes import POINTER, c_ubyte, cast, pointer, memmove, string_at
+
+import numpy as np
+
+from MvImport.CameraParams_header import (
+    MV_CC_DEVICE_INFO, MV_FRAME_OUT_INFO_EX, MV_Image_Bmp, MV_Image_Jpeg, MV_TRIGGER_MODE_ON,
+    MV_TRIGGER_SOURCE_SOFTWARE, PixelType_Gvsp_Mono8, PixelType_Gvsp_Mono12, PixelType_Gvsp_RGB8_Packed
+)
+from MvImport.MvErrorDefine_const import (
+    MV_OK, MV_E_BUFOVER, MV_E_CALLORDER, MV_E_NODATA, MV_E_PARAMETER, MV_E_SUPPORT
+)
+
+# GVSP Bayer 排列 -> OpenCV 转换码名（OpenCV 按第二行前两个像素命名，RGGB 对应 BayerBG）
+_BAYER_CV = {"RG": "COLOR_BayerBG2BGR", "GR": "COLOR_BayerGB2BGR", "GB": "COLOR_BayerGR2BGR", "BG": "COLOR_BayerRG2BGR"}
+
+
+def _bayer_code(pixel_type: int):
+    """Bayer 像素格式对应的 cv2 去马赛克转换码，非 Bayer 返回 None"""
+    import cv2
+    from MvImport import PixelType_header
+
+    for name, value in vars(PixelType_header).items():
+        m = re.fullmatch(r"PixelType_Gvsp_Bayer(RG|GR|GB|BG)\d+", name)
+        if m and value == pixel_type:
+            return getattr(cv2, _BAYER_CV[m.group(1)])
+    return None
+
+
+def _recorded(fn):
+    """记录调用次数与耗时（秒）"""
+    name = fn.__name__
+
+    def wrapper(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            self.calls[name] += 1
+            self.timings[name].append(time.perf_counter() - t0)
+    wrapper.__name__ = name
+    return wrapper
+
+
+class FakeMvCamera:
+    """
+    假相机：
+      - width/height/pixel_type: 输出帧的尺寸与像素格式（默认 Mono8）
+      - start_latency_s: 每次 StartGrabbing 的模拟开销
+      - frame_latency_s: 每次取帧的模拟开销（不含曝光）
+      - frame_period_s: 连续采集（注册回调或缓存池取帧）时的出帧间隔
+    TriggerMode=On 且 TriggerSource=软触发 时，GetOneFrameTimeout 每帧需要先发送一次 TriggerSoftware，
+    没有未取的触发时立即返回 MV_E_NODATA（不等待 nMsec）；ClearImageBuffer 丢弃未取的触发。
+    """
+    width = 640
+    height = 480
+    pixel_type = PixelType_Gvsp_Mono8
+    start_latency_s = 0.0
+    frame_latency_s = 0.0
+    frame_period_s = 0.005
+
+    default_nodes = {"Gain": 0.0, "Gamma": 1.0}   # 打开时已有值的节点（其余节点写入后才可读）
+
+    _dev_info = MV_CC_DEVICE_INFO()   # 枚举时返回的设备信息，需保持引用
+
+    def __init__(self):
+        self.calls = Counter()
+        self.timings = defaultdict(list)
+        self.grabbing = False
+        self.nodes = dict(self.default_nodes)
+        self.frame_num = 0
+        self.image_nodes = 3
+        self._callback = None
+        self._cb_thread = None
+        self._pool_free = None
+        self._lent = {}
+        self._next_t = 0.0
+        self.pending_triggers = 0
+
+    @staticmethod
+    def MV_CC_EnumDevices(nTLayerType, stDevList):
+        stDevList.nDeviceNum = 1
+        stDevList.pDeviceInfo[0] = pointer(FakeMvCamera._dev_info)
+        return MV_OK
+
+    # ---- 设备 ----
+    @_recorded
+    def MV_CC_CreateHandle(self, stDevInfo):
+        return MV_OK
+
+    @_recorded
+    def MV_CC_DestroyHandle(self):
+        return MV_OK
+
+    @_recorded
+    def MV_CC_OpenDevice(self, nAccessMode=1, nSwitchoverKey=0):
+        return MV_OK
+
+    @_recorded
+    def MV_CC_CloseDevice(self):
+        return MV_OK
+
+    # ---- 参数 ----
+    def bytes_per_pixel(self) -> int:
+        return max(1, ((self.pixel_type >> 16) & 0xFF) // 8)
+
+    @_recorded
+    def MV_CC_GetIntValue(self, strKey, stIntValue):
+        if strKey == "PayloadSize":
+            stIntValue.nCurValue = self.width * self.height * self.bytes_per_pixel()
+            return MV_OK
+        if strKey not in self.nodes:
+            return MV_E_PARAMETER
+        stIntValue.nCurValue = int(self.nodes[strKey])
+        return MV_OK
+
+    @_recorded
+    def MV_CC_SetIntValue(self, strKey, nValue):
+        self.nodes[strKey] = int(nValue)
+        return MV_OK
+
+    @_recorded
+    def MV_CC_SetEnumValue(self, strKey, nValue):
+        self.nodes[strKey] = int(nValue)
+        return MV_OK
+
+    @_recorded
+    def MV_CC_SetEnumValueByString(self, strKey, sValue):
+        self.nodes[strKey] = str(sValue)
+        return MV_OK
+
+    @_recorded
+    def MV_CC_GetEnumValue(self, strKey, stEnumValue):
+        if not isinstance(self.nodes.get(strKey), int):
+            return MV_E_PARAMETER
+        stEnumValue.nCurValue = self.nodes[strKey]
+        return MV_OK
+
+    @_recorded
+    def MV_CC_SetFloatValue(self, strKey, fValue):
+        self.nodes[strKey] = float(fValue)
+        return MV_OK
+
+    @_recorded
+    def MV_CC_GetFloatValue(self, strKey, stFloatValue):
+        if strKey not in self.nodes:
+            return MV_E_PARAMETER
+        stFloatValue.fCurValue = float(self.nodes[strKey])
+        return MV_OK
+
+    @_recorded
+    def MV_CC_SetBoolValue(self, strKey, bValue):
+        self.nodes[strKey] = bool(bValue)
+        return MV_OK
+
+    @_recorded
+    def MV_CC_GetBoolValue(self, strKey, BoolValue):
+        if strKey not in self.nodes:
+            return MV_E_PARAMETER
+        BoolValue.value = bool(self.nodes[strKey])
+        return MV_OK
+
+    @_recorded
+    def MV_CC_SetStringValue(self, strKey, sValue):
+        self.nodes[strKey] = str(sValue)
+        return MV_OK
+
+    @_recorded
+    def MV_CC_GetStringValue(self, strKey, StringValue):
+        if strKey not in self.nodes:
+            return MV_E_PARAMETER
+        StringValue.chCurValue = str(self.nodes[strKey]).encode("ascii")
+        return MV_OK
+
+    @_recorded
+    def MV_CC_FeatureSave(self, strFileName):
+        with open(strFileName, "w", encoding="utf-8") as f:
+            for k, v in self.nodes.items():
+                f.write(f"{k}\t{type(v).__name__}\t{v}\n")
+        return MV_OK
+
+    @_recorded
+    def MV_CC_FeatureLoad(self, strFileName):
+        types = {"int": int, "float": float, "str": str, "bool": lambda v: v == "True"}
+        try:
+            with open(strFileName, "r", encoding="utf-8") as f:
+                for line in f:
+                    k, t, v = line.rstrip("\n").split("\t", 2)
+                    self.nodes[k] = types[t](v)
+        except (OSError, ValueError, KeyError):
+            return MV_E_PARAMETER
+        return MV_OK
+
+    @_recorded
+    def MV_CC_SetCommandValue(self, strKey):
+        if strKey == "TriggerSoftware":
+            if not self.grabbing:
+                return MV_E_CALLORDER
+            if self.software_triggered():
+                self.pending_triggers += 1
+        return MV_OK
+
+    def software_triggered(self) -> bool:
+        return self.nodes.get("TriggerMode") == MV_TRIGGER_MODE_ON and \
+            self.nodes.get("TriggerSource") == MV_TRIGGER_SOURCE_SOFTWARE
+
+    # ---- 取流 ----
+    @_recorded
+    def MV_CC_SetImageNodeNum(self, nNum):
+        if self.grabbing or nNum < 1:
+            return MV_E_CALLORDER if self.grabbing else MV_E_PARAMETER
+        self.image_nodes = int(nNum)
+        return MV_OK
+
+    @_recorded
+    def MV_CC_RegisterImageCallBackEx(self, CallBackFun, pUser):
+        if self.grabbing:
+            return MV_E_CALLORDER
+        self._callback = CallBackFun if CallBackFun else None
+        return MV_OK
+
+    @_recorded
+    def MV_CC_StartGrabbing(self):
+        if self.grabbing:
+            return MV_E_CALLORDER
+        if self.start_latency_s:
+            time.sleep(self.start_latency_s)
+        self.grabbing = True
+        self.pending_triggers = 0
+        nbytes = self.width * self.height * self.bytes_per_pixel()
+        self._pool_free = [(c_ubyte * nbytes)() for _ in range(self.image_nodes)]
+        self._next_t = time.perf_counter()
+        if self._callback is not None:
+            self._cb_thread = threading.Thread(target=self._callback_loop, daemon=True)
+            self._cb_thread.start()
+        return MV_OK
+
+    @_recorded
+    def MV_CC_StopGrabbing(self):
+        self.grabbing = False
+        if self._cb_thread is not None:
+            self._cb_thread.join()
+            self._cb_thread = None
+        return MV_OK
+
+    def _fill_info(self, stFrameInfo, nbytes: int) -> None:
+        self.frame_num += 1
+        stFrameInfo.nWidth = self.width
+        stFrameInfo.nHeight = self.height
+        stFrameInfo.enPixelType = self.pixel_type
+        stFrameInfo.nFrameNum = self.frame_num
+        stFrameInfo.nFrameLen = nbytes
+        t_ns = time.perf_counter_ns()
+        stFrameInfo.nDevTimeStampHigh = (t_ns >> 32) & 0xFFFFFFFF
+        stFrameInfo.nDevTimeStampLow = t_ns & 0xFFFFFFFF
+
+    def _wait_period(self) -> None:
+        """按 frame_period_s 的固定节拍出帧（不因消费者变慢而推迟）"""
+        self._next_t += self.frame_period_s
+        delay = self._next_t - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _callback_loop(self):
+        buf = self._pool_free[0]
+        info = MV_FRAME_OUT_INFO_EX()
+        p_data = cast(buf, POINTER(c_ubyte))
+        while self.grabbing:
+            self._wait_period()
+            if not self.grabbing:
+                break
+            self._fill_info(info, len(buf))
+            self.render(buf, len(buf))
+            self._callback(p_data, pointer(info), None)
+
+    @_recorded
+    def MV_CC_GetImageBuffer(self, stFrame, nMsec):
+        if not self.grabbing or self._callback is not None:
+            return MV_E_CALLORDER
+        if not self._pool_free:
+            # 所有缓存节点都未归还：真实 SDK 会丢弃新帧，这里模拟为超时无数据
+            time.sleep(nMsec / 1000.0)
+            return MV_E_NODATA
+        self._wait_period()
+        buf = self._pool_free.pop()
+        self._fill_info(stFrame.stFrameInfo, len(buf))
+        self.render(buf, len(buf))
+        stFrame.pBufAddr = cast(buf, POINTER(c_ubyte))
+        stFrame.nRes[0] = id(buf) & 0xFFFFFFFF
+        self._lent[stFrame.nRes[0]] = buf
+        return MV_OK
+
+    @_recorded
+    def MV_CC_FreeImageBuffer(self, stFrame):
+        buf = self._lent.pop(stFrame.nRes[0], None)
+        if buf is None:
+            return MV_E_PARAMETER
+        if self._pool_free is not None:
+            self._pool_free.append(buf)
+        return MV_OK
+
+    def render(self, dst_addr, nbytes: int) -> None:
+        """向取帧缓冲写入一帧数据；默认填充与帧号相关的常数，子类可覆盖"""
+        value = self.frame_num & 0xFF
+        pattern = bytes([value]) * nbytes
+        memmove(dst_addr, pattern, nbytes)
+
+    @_recorded
+    def MV_CC_GetOneFrameTimeout(self, pData, nDataSize, stFrameInfo, nMsec=1000):
+        if not self.grabbing:
+            return MV_E_CALLORDER
+        nbytes = self.width * self.height * self.bytes_per_pixel()
+        if nDataSize < nbytes:
+            return MV_E_PARAMETER
+        if self._callback is not None:
+            return MV_E_CALLORDER    # 注册回调后不能主动取帧（与 SDK 一致）
+        if self.software_triggered():
+            if self.pending_triggers <= 0:
+                return MV_E_NODATA
+            self.pending_triggers -= 1
+        if self.frame_latency_s:
+            time.sleep(self.frame_latency_s)
+        self._fill_info(stFrameInfo, nbytes)
+        self.render(pData, nbytes)
+        return MV_OK
+
+    @_recorded
+    def MV_CC_ClearImageBuffer(self):
+        if not self.grabbing:
+            return MV_E_CALLORDER
+        self.pending_triggers = 0
+        return MV_OK
+
+    @_recorded
+    def MV_CC_SaveImageEx2(self, stSaveParam):
+        """按 enImageType 真实编码为 JPEG / BMP（与 SDK 一致：高位深取高 8 位，Bayer 去马赛克为彩色）"""
+        import cv2
+        from src.camera import frame_view, pixel_bits
+
+        ext = {MV_Image_Jpeg: ".jpg", MV_Image_Bmp: ".bmp"}.get(stSaveParam.enImageType)
+        if ext is None:
+            return MV_E_SUPPORT
+        if stSaveParam.nDataLen <= 0:
+            return MV_E_NODATA
+        raw = np.frombuffer(string_at(stSaveParam.pData, stSaveParam.nDataLen), dtype=np.uint8)
+        pixel_type = stSaveParam.enPixelType
+        frame = frame_view(raw, stSaveParam.nWidth, stSaveParam.nHeight, pixel_type, len(raw))
+        if frame is None:
+            return MV_E_SUPPORT
+        if frame.dtype != np.uint8:
+            frame = (frame >> max(0, pixel_bits(pixel_type) - 8)).astype(np.uint8)
+        bayer = _bayer_code(pixel_type)
+        if bayer is not None:
+            frame = cv2.cvtColor(frame, bayer)
+        elif pixel_type == PixelType_Gvsp_RGB8_Packed:
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(stSaveParam.nJpgQuality or 90)] if ext == ".jpg" else []
+        ok, data = cv2.imencode(ext, frame, params)
+        if not ok:
+            return MV_E_PARAMETER
+        if data.nbytes > stSaveParam.nBufferSize:
+            return MV_E_BUFOVER
+        memmove(stSaveParam.pImageBuffer, data.ctypes.data, data.nbytes)
+        stSaveParam.nImageLen = data.nbytes
+        return MV_OK
+
+
+class SimScene:
+    """
+    模拟光路的当前状态，供 SceneMvCamera 渲染：
+      - set_pattern(path): SLM 当前图案；PSF 取图案按传感器尺寸缩放后的归一化强度（掩膜投影近似）
+      - set_display(path, scale_factor): 显示器内容，按 scale_factor 缩放后居中放在黑色背景上；
+        path 为 None 时视为点光源，测量即为 PSF（capture_psf）
+      - exposure_ref_us: 该曝光下点光源 PSF 的峰值 / 全白满屏显示恰好到满量程
+      - read_noise: 读出噪声标准差（满量程的比例）；shot_noise: 是否叠加泊松散粒噪声
+        （full_well 个电子对应满量程）
+    """
+
+    def __init__(self, width: int = 640, height: int = 480, exposure_ref_us: float = 500000.0,
+                 read_noise: float = 0.002, shot_noise: bool = True, full_well: int = 10000,
+                 seed: int = None):
+        self.width = width
+        self.height = height
+        self.exposure_ref_us = exposure_ref_us
+        self.read_noise = read_noise
+        self.shot_noise = shot_noise
+        self.full_well = full_well
+        self.rng = np.random.default_rng(seed)
+        self.pattern = None
+        self.display = None           # (path, scale_factor)
+        self._psf = {}
+        self._clean = {}              # (pattern, display) -> 归一化无噪声图像
+
+    def set_pattern(self, path) -> None:
+        self.pattern = None if path is None else str(path)
+
+    def set_display(self, path, scale_factor: float = 1.0) -> None:
+        self.display = None if path is None else (str(path), float(scale_factor or 1.0))
+
+    def _load_gray(self, path, size):
+        from PIL import Image
+        with Image.open(path) as im:
+            return np.asarray(im.convert("L").resize(size, Image.BILINEAR), dtype=np.float32) / 255.0
+
+    def psf(self, path) -> np.ndarray:
+        """SLM 图案对应的 PSF（传感器尺寸，总和为 1）；无图案时为中心一个点"""
+        if path not in self._psf:
+            if path is None:
+                psf = np.zeros((self.height, self.width), np.float32)
+                psf[self.height // 2, self.width // 2] = 1.0
+            else:
+                psf = self._load_gray(path, (self.width, self.height))
+                psf /= max(float(psf.sum()), 1e-12)
+            self._psf[path] = psf
+        return self._psf[path]
+
+    def object_image(self):
+        """显示器内容在物面上的强度（传感器尺寸）；未显示时返回 None"""
+        if self.display is None:
+            return None
+        path, scale = self.display
+        w, h = max(1, int(self.width * scale)), max(1, int(self.height * scale))
+        obj = np.zeros((self.height, self.width), np.float32)
+        img = self._load_gray(path, (min(w, self.width), min(h, self.height)))
+        y0, x0 = (self.height - img.shape[0]) // 2, (self.width - img.shape[1]) // 2
+        obj[y0:y0 + img.shape[0], x0:x0 + img.shape[1]] = img
+        return obj
+
+    def clean(self) -> np.ndarray:
+        """
+        当前图案与显示内容下的无噪声测量，按 (图案, 显示) 缓存：
+        点光源时为最大值归一化到 1 的 PSF；有显示内容时 PSF 总和为 1，全白满屏显示对应 1
+        """
+        key = (self.pattern, self.display)
+        if key not in self._clean:
+            psf = self.psf(self.pattern)
+            obj = self.object_image()
+            if obj is None:
+                img = psf / max(float(psf.max()), 1e-12)
+            else:
+                # 循环卷积：PSF 先移到原点
+                otf = np.fft.rfft2(np.fft.ifftshift(psf))
+                img = np.fft.irfft2(np.fft.rfft2(obj) * otf, s=obj.shape).astype(np.float32)
+                np.maximum(img, 0.0, out=img)
+            self._clean[key] = img
+        return self._clean[key]
+
+    def render(self, exposure_us: float) -> np.ndarray:
+        """按曝光时间渲染一帧（float32，单位为满量程比例，已截断到 [0, 1]）"""
+        img = self.clean() * (float(exposure_us) / self.exposure_ref_us)
+        if self.shot_noise:
+            img = self.rng.poisson(np.clip(img, 0.0, 1.0) * self.full_well).astype(np.float32) / self.full_well
+        if self.read_noise:
+            img = img + self.rng.normal(0.0, self.read_noise, img.shape).astype(np.float32)
+        return np.clip(img, 0.0, 1.0)
+
+
+class SceneMvCamera(FakeMvCamera):
+    """按 SimScene 渲染图像的 MvCamera 替身；用 bind(scene) 得到绑定场景的子类后交给 HikCamera(sdk=...)"""
+    scene = None
+
+    @classmethod
+    def bind(cls, scene: SimScene, pixel_format: str = "Mono8", **attrs):
+        pixel_type = {"Mono8": PixelType_Gvsp_Mono8, "Mono12": PixelType_Gvsp_Mono12}[pixel_format]
+        return type("SimMvCamera", (cls,), {"scene": scene, "width": scene.width, "height": scene.height,
+                                            "pixel_type": pixel_type, **attrs})
+
+    def render(self, dst_addr, nbytes: int) -> None:
+        bits = 8 if self.pixel_type == PixelType_Gvsp_Mono8 else 12
+        dtype = np.uint8 if bits == 8 else np.uint16
+        max_value = (1 << bits) - 1
+        exposure = self.nodes.get("ExposureTime", self.scene.exposure_ref_us)
+        frame = np.rint(self.scene.render(exposure) * max_value).astype(dtype)
+        memmove(dst_addr, frame.ctypes.data, min(nbytes, frame.nbytes))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+无窗口显示器：接口与 src/display_ctrl.DisplayController 相同（start/stop/show/hide/next/prev/load_playlist），
+不依赖 Tk 与 screeninfo，可在没有显示器的 Linux / CI 机器上运行。
+
+    disp = HeadlessDisplay(scale_factor=0.27, scene=scene).start()
+    ev = disp.show("data/example/分辨率测试卡.jpg")    # 呈现记录，格式同 DisplayController
+    disp.stop()
+
+  - scene: src/sim_camera.SimScene，显示内容同步写入场景，供模拟相机渲染
+  - present_latency_s: 模拟从命令到画面呈现的耗时
+  - 图片不存在时 show() 返回 None（与 DisplayController 一致）
+"""
+import os
+import time
+
+from utils.trace import traced
+
+
+class HeadlessDisplay:
+    def __init__(self, monitor_index: int = 0, bg: str = "black", scale_factor: float = 1.0,
+                 position: tuple = None, cache_size: int = 16, poll_ms: int = 2, cmd_timeout: float = 10.0,
+                 scene=None, present_latency_s: float = 0.0):
+        self.monitor_index = monitor_index
+        self.bg = bg
+        self.scale_factor = scale_factor
+        self.position = position
+        self.scene = scene
+        self.present_latency_s = present_latency_s
+        self.playlist = []
+        self.index = -1
+        self.presented = []
+        self.current = None
+        self._running = False
+
+    # ========== 生命周期 ==========
+
+    def start(self, timeout: float = 10.0) -> "HeadlessDisplay":
+        self._running = True
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._running = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ========== 命令 ==========
+
+    def _check(self):
+        if not self._running:
+            raise RuntimeError("HeadlessDisplay 未启动或已停止")
+
+    def _present(self, path, t_cmd):
+        if self.present_latency_s:
+            time.sleep(self.present_latency_s)
+        t = time.perf_counter()
+        ev = {"index": self.index, "path": path, "t": t, "wall": time.time(),
+              "latency_ms": round((t - t_cmd) * 1000.0, 3)}
+        self.presented.append(ev)
+        return ev
+
+    @traced("display.show")
+    def show(self, img_path, scale_factor: float = None, position: tuple = None,
+             wait: bool = True, timeout: float = None):
+        """“显示”一张图片（写入场景），返回呈现记录 dict，失败返回 None"""
+        self._check()
+        t_cmd = time.perf_counter()
+        img_path = str(img_path)
+        if not os.path.isfile(img_path):
+            print(f"[ERR] 图片不存在: {img_path}")
+            return None
+        scale_factor = self.scale_factor if scale_factor is None else scale_factor
+        self.current = img_path
+        if self.scene is not None:
+            self.scene.set_display(img_path, scale_factor)
+        return self._present(img_path, t_cmd)
+
+    @traced("display.hide")
+    def hide(self, wait: bool = True, timeout: float = None):
+        self._check()
+        t_cmd = time.perf_counter()
+        self.current = None
+        if self.scene is not None:
+            self.scene.set_display(None)
+        return self._present(None, t_cmd)
+
+    def _step(self, step):
+        self._check()
+        if not self.playlist:
+            raise RuntimeError("播放列表为空")
+        self.index = (self.index + step) % len(self.playlist)
+        return self.show(self.playlist[self.index])
+
+    def next(self, wait: bool = True, timeout: float = None):
+        return self._step(1)
+
+    def prev(self, wait: bool = True, timeout: float = None):
+        return self._step(-1)
+
+    def load_playlist(self, paths, prewarm: bool = True, timeout: float = None) -> int:
+        self._check()
+        self.playlist = [str(p) for p in paths]
+        self.index = -1
+        return sum(os.path.isfile(p) for p in self.playlist) if prewarm else 0
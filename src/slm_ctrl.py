@@ -1,66 +1,176 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
+import time
 
-# 让 Python 能看到 examples\HEDS\ 包
+# 以脚本方式运行时也能导入项目内的 utils
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.trace import traced
+
+# HOLOEYE SDK 安装位置；HEDS 只在 HedsBackend.init() 时导入，Linux 上可改用 FakeSLMBackend
 sdk_root = r"C:\Program Files\HOLOEYE Photonics\SLM Display SDK (Python) v4.1.0"
-sys.path.append(os.path.join(sdk_root, "examples"))
-import HEDS
-from HEDS.holoeye_slmdisplaysdk_types import *  # 注意：不是 hedslib.heds_types
+
+
+class HedsBackend:
+    """HOLOEYE HEDS SDK 后端：init / load / show / release，失败时抛出 RuntimeError"""
+
+    def __init__(self):
+        self.heds = None
+        self.types = None
+        self.slm = None
+
+    def _import(self):
+        # 让 Python 能看到 examples\HEDS\ 包
+        examples = os.path.join(sdk_root, "examples")
+        if examples not in sys.path:
+            sys.path.append(examples)
+        import HEDS
+        from HEDS import holoeye_slmdisplaysdk_types as types  # 注意：不是 hedslib.heds_types
+        self.heds, self.types = HEDS, types
+
+    def _check(self, err, what):
+        if err != self.types.HEDSERR_NoError:
+            raise RuntimeError(f"{what}: {self.heds.SDK.ErrorString(err)}")
+
+    def init(self, sdk_version=(4, 1), verbose=True):
+        self._import()
+        if verbose:
+            self.heds.SDK.PrintVersion()
+
+        major, minor = sdk_version
+        self._check(self.heds.SDK.Init(major, minor), "HEDS Init")
+        if verbose:
+            print(f"[SDK] HEDS Init v{major}.{minor} OK.")
+
+        self.slm = self.heds.SLM.Init()
+        self._check(self.slm.errorCode(), "SLM Init")
+
+    def load(self, img_path: str):
+        """读取图片并上传到设备，返回数据句柄"""
+        err, dh = self.slm.loadImageDataFromFile(img_path)
+        self._check(err, "Failed to load image")
+        self._check(dh.errorCode(), "Failed to load image")
+        return dh
+
+    def show(self, handle) -> None:
+        self._check(handle.show(self.types.HEDSSHF_PresentAutomatic), "Failed to show image")
+
+    def release(self, handle) -> None:
+        release = getattr(handle, "release", None)
+        if release is not None:
+            release()
+
+
+class FakeSLMBackend:
+    """
+    进程内假 SLM：不依赖 HEDS，可在 Linux 上运行。
+      - load_latency_s / show_latency_s: 模拟读取上传与显示切换的耗时
+      - loads / shows: 记录调用历史，shown 为当前显示的图片路径
+      - scene: src/sim_camera.SimScene，显示时同步更新当前图案，供模拟相机渲染
+    """
+
+    def __init__(self, load_latency_s: float = 0.0, show_latency_s: float = 0.0, scene=None):
+        self.load_latency_s = load_latency_s
+        self.show_latency_s = show_latency_s
+        self.scene = scene
+        self.loads = []
+        self.shows = []
+        self.released = []
+        self.shown = None
+
+    def init(self, sdk_version=(4, 1), verbose=True):
+        if verbose:
+            print("[SDK] Fake SLM backend.")
+
+    def load(self, img_path: str):
+        if self.load_latency_s:
+            time.sleep(self.load_latency_s)
+        self.loads.append(img_path)
+        return img_path
+
+    def show(self, handle) -> None:
+        if self.show_latency_s:
+            time.sleep(self.show_latency_s)
+        self.shows.append(handle)
+        self.shown = handle
+        if self.scene is not None:
+            self.scene.set_pattern(handle)
+
+    def release(self, handle) -> None:
+        self.released.append(handle)
 
 
 class SLM:
-    """核心类：只保留两个功能
+    """核心类：
        1) 初始化 SDK + 打开 SLM
        2) 将一张图片显示到 SLM 上
+       3) load()/show_handle() 拆开上传与显示，供 src/slm_sweep.py 预加载复用
+       backend 默认为 HedsBackend，也可传入 FakeSLMBackend 等接口相同的实现。
     """
 
-    def __init__(self, sdk_version=(4, 1), verbose=True):
+    def __init__(self, sdk_version=(4, 1), verbose=True, backend=None):
         self.sdk_version = sdk_version
         self.verbose = verbose
+        self.backend = backend if backend is not None else HedsBackend()
         self.slm = None
 
+    @traced("slm.init")
     def init(self):
         """初始化 SDK + 打开 SLM"""
-        if self.verbose:
-            HEDS.SDK.PrintVersion()
-
-        major, minor = self.sdk_version
-        err = HEDS.SDK.Init(major, minor)
-        if err != HEDSERR_NoError:
-            raise RuntimeError(HEDS.SDK.ErrorString(err))
-        if self.verbose:
-            print(f"[SDK] HEDS Init v{major}.{minor} OK.")
-
-        self.slm = HEDS.SLM.Init()
-        if self.slm.errorCode() != HEDSERR_NoError:
-            raise RuntimeError(HEDS.SDK.ErrorString(self.slm.errorCode()))
+        self.backend.init(self.sdk_version, self.verbose)
+        self.slm = self.backend
 
         if self.verbose:
             print("[SLM] Device opened successfully.")
 
-    def img_show(self, img_path: str) -> bool:
-        """将传入路径的图片显示到 SLM，返回是否成功"""
+    @traced("slm.load")
+    def load(self, img_path: str):
+        """读取图片并上传到设备，返回数据句柄；失败返回 None"""
         if not os.path.isfile(img_path):
             if self.verbose:
                 print(f"[SLM] Image not found: {img_path}")
-            return False
+            return None
 
         if self.slm is None:
             if self.verbose:
                 print("[SLM] Not initialized. Call init() first.")
-            return False
+            return None
 
-        err, dh = self.slm.loadImageDataFromFile(img_path)
-        if err != HEDSERR_NoError or dh.errorCode() != HEDSERR_NoError:
+        try:
+            return self.backend.load(img_path)
+        except RuntimeError as e:
             if self.verbose:
-                print(f"[SLM] Failed to load image: {HEDS.SDK.ErrorString(err)}")
+                print(f"[SLM] {e}")
+            return None
+
+    @traced("slm.show")
+    def show_handle(self, handle) -> bool:
+        """显示已上传的数据句柄"""
+        try:
+            self.backend.show(handle)
+            return True
+        except RuntimeError as e:
+            if self.verbose:
+                print(f"[SLM] {e}")
             return False
 
-        err = dh.show(HEDSSHF_PresentAutomatic)
-        if err != HEDSERR_NoError:
+    def release(self, handle) -> None:
+        try:
+            self.backend.release(handle)
+        except RuntimeError as e:
             if self.verbose:
-                print(f"[SLM] Failed to show image: {HEDS.SDK.ErrorString(err)}")
+                print(f"[SLM] {e}")
+
+    @traced("slm.img_show")
+    def img_show(self, img_path: str) -> bool:
+        """将传入路径的图片显示到 SLM，返回是否成功"""
+        dh = self.load(img_path)
+        if dh is None:
+            return False
+
+        if not self.show_handle(dh):
             return False
 
         if self.verbose:
@@ -74,6 +184,5 @@ if __name__ == "__main__":
     slm = SLM(verbose=True)
     slm.init()
    
-    import time
     slm.img_show(r"D:\qjy\camera_slm_pipeline\data\fza_bin_gen_masked_r40\FZA_bin_R15.png")   # 替换为实际图片路径
     time.sleep(1000)  # 暂停60秒
\ No newline at end of file
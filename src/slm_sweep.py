@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+SLM 图案扫描：预先把一组图案上传到设备，数据句柄放在 LRU 缓存里，
+扫描时只做 show + 等待稳定，不再每次读文件、上传。
+
+    slm = SLM(backend=FakeSLMBackend()); slm.init()
+    sweep = SLMSweep(slm, collect_images(folder)["images"], settle_ms=30)
+    sweep.preload()
+    for i, path in sweep:
+        cam.snap(...)
+"""
+import time
+from collections import OrderedDict
+
+
+class PatternCache:
+    """图案路径 -> SLM 数据句柄 的 LRU 缓存；淘汰时释放设备端数据"""
+
+    def __init__(self, slm, capacity: int = 64):
+        self.slm = slm
+        self.capacity = max(1, capacity)
+        self._handles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __contains__(self, path):
+        return path in self._handles
+
+    def get(self, path: str):
+        """取句柄；未命中时上传并缓存，失败返回 None"""
+        dh = self._handles.get(path)
+        if dh is not None:
+            self._handles.move_to_end(path)
+            self.hits += 1
+            return dh
+        self.misses += 1
+        dh = self.slm.load(path)
+        if dh is None:
+            return None
+        self._handles[path] = dh
+        while len(self._handles) > self.capacity:
+            _, old = self._handles.popitem(last=False)
+            self.slm.release(old)
+        return dh
+
+    def clear(self):
+        while self._handles:
+            _, dh = self._handles.popitem(last=False)
+            self.slm.release(dh)
+
+
+class SLMSweep:
+    """
+    按顺序扫描一组图案：
+      - patterns : 图片路径列表（如 collect_images()["images"]）
+      - settle_ms: 每次切换后等待 SLM 稳定的时间
+      - cache_size: 缓存句柄数，默认能放下全部图案
+    """
+
+    def __init__(self, slm, patterns, settle_ms: float = 30, cache_size: int = None):
+        self.slm = slm
+        self.patterns = [str(p) for p in patterns]
+        self.settle_ms = settle_ms
+        self.cache = PatternCache(slm, cache_size or max(1, len(self.patterns)))
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def preload(self) -> int:
+        """把全部图案（不超过缓存容量）提前上传，返回成功数量"""
+        n_ok = 0
+        for path in self.patterns[:self.cache.capacity]:
+            if self.cache.get(path) is not None:
+                n_ok += 1
+        if self.slm.verbose:
+            print(f"[SLM] 预加载 {n_ok}/{len(self.patterns)} 张图案")
+        return n_ok
+
+    def show(self, index: int) -> bool:
+        """显示第 index 张图案并等待稳定"""
+        path = self.patterns[index]
+        dh = self.cache.get(path)
+        if dh is None or not self.slm.show_handle(dh):
+            return False
+        if self.settle_ms:
+            time.sleep(self.settle_ms / 1000.0)
+        return True
+
+    def __iter__(self):
+        """逐张显示，yield (index, path)；显示失败的图案跳过"""
+        for i, path in enumerate(self.patterns):
+            if self.show(i):
+                yield i, path
+            elif self.slm.verbose:
+                print(f"[SLM] 跳过: {path}")
+
+    def close(self):
+        self.cache.clear()
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""pytest 公共设置：项目根目录加入 sys.path，测试统一在模拟设备上运行（不需要相机 / SLM / 显示器）"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
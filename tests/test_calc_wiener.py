@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""WienerDeconvolver.reconstruct：内存上限下的执行方式选择"""
+import numpy as np
+import pytest
+import torch
+
+from src.calc_wiener import WienerDeconvolver
+
+
+@pytest.fixture
+def deconv():
+    psf = np.zeros((32, 32, 3))
+    psf[14:18, 14:18] = 1.0
+    return WienerDeconvolver(psf, delta=1e-2, device="cpu")
+
+
+def test_auto_falls_back_to_channel_then_raises(deconv):
+    blur = torch.rand(3, 32, 32, dtype=torch.float64)
+    full = deconv.reconstruct(blur)
+    per_channel = deconv.estimate_bytes((32, 32), 1, out_planes=3)
+    assert per_channel < deconv.estimate_bytes((32, 32), 3)
+    torch.testing.assert_close(deconv.reconstruct(blur, max_bytes=per_channel), full)
+    with pytest.raises(MemoryError):
+        deconv.reconstruct(blur, max_bytes=per_channel - 1)
+
+
+def test_estimate_counts_output_buffer(deconv):
+    base = deconv.estimate_bytes((32, 32))
+    assert deconv.estimate_bytes((32, 32), out_planes=3) == base + 3 * 32 * 32 * 8
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""HikCamera 在 FakeMvCamera / SceneMvCamera 上的冒烟测试"""
+from ctypes import c_ubyte
+
+import cv2
+import numpy as np
+import pytest
+
+from src.camera import HikCamera, pixel_bits, pixel_layout
+from src.frame_writer import AsyncFrameWriter
+from src.sim_camera import FakeMvCamera, SceneMvCamera, SimScene
+from MvImport.CameraParams_header import MV_FRAME_OUT_INFO_EX
+from MvImport.PixelType_header import (
+    PixelType_Gvsp_BayerRG8, PixelType_Gvsp_Mono8, PixelType_Gvsp_Mono12, PixelType_Gvsp_Mono12_Packed,
+    PixelType_Gvsp_RGB8_Packed, PixelType_Gvsp_YUV422_Packed
+)
+
+
+@pytest.fixture
+def cam():
+    c = HikCamera(sdk=FakeMvCamera)
+    assert c.open()
+    yield c
+    c.close()
+
+
+def test_session_starts_grabbing_once_and_skips_unchanged_exposure(cam):
+    with cam.stream():
+        for _ in range(5):
+            assert cam.grab_array(exposure_us=2000) is not None
+    assert cam.cam.calls["MV_CC_StartGrabbing"] == 1
+    assert cam.cam.calls["MV_CC_SetFloatValue"] == 1
+
+
+def test_session_triggers_each_frame_and_restores_free_run(cam):
+    with cam.stream():
+        assert cam.trigger == "software"
+        for _ in range(3):
+            assert cam.grab_array() is not None
+        _, n = cam.burst(4)
+        assert n == 4
+    calls = cam.cam.calls
+    assert calls["MV_CC_SetCommandValue"] == 3 + 4          # 每帧一次 TriggerSoftware
+    assert calls["MV_CC_ClearImageBuffer"] == 3 + 1         # 每次取帧前清空旧帧（连拍只在第一帧前）
+    assert cam.trigger is None
+    assert cam.cam.nodes["TriggerMode"] == 0
+
+
+def test_standalone_snaps_keep_software_trigger(cam):
+    assert cam.grab_array(exposure_us=1000) is not None
+    assert cam.trigger == "software"
+    writes = cam.cam.calls["MV_CC_SetEnumValue"]
+    for _ in range(3):
+        assert cam.grab_array() is not None
+    assert cam.cam.calls["MV_CC_SetEnumValue"] == writes     # 之后的单拍不再改写触发模式
+    assert cam.start_continuous(slots=2)
+    try:
+        assert cam.trigger is None and cam.cam.nodes["TriggerMode"] == 0
+    finally:
+        cam.stop_continuous()
+
+
+def test_software_trigger_without_command_times_out():
+    sdk = FakeMvCamera()
+    sdk.nodes.update({"TriggerMode": 1, "TriggerSource": 7})
+    sdk.grabbing = True
+    buf = (c_ubyte * (sdk.width * sdk.height))()
+    info = MV_FRAME_OUT_INFO_EX()
+    assert sdk.MV_CC_GetOneFrameTimeout(buf, len(buf), info, 10) != 0
+    assert sdk.MV_CC_SetCommandValue("TriggerSoftware") == 0
+    assert sdk.MV_CC_GetOneFrameTimeout(buf, len(buf), info, 10) == 0
+
+
+def test_pixel_table():
+    assert pixel_layout(PixelType_Gvsp_Mono8) == (np.uint8, 1)
+    assert pixel_layout(PixelType_Gvsp_Mono12) == (np.uint16, 1)
+    assert pixel_layout(PixelType_Gvsp_RGB8_Packed) == (np.uint8, 3)
+    assert pixel_layout(PixelType_Gvsp_Mono12_Packed) is None
+    assert pixel_layout(PixelType_Gvsp_YUV422_Packed) is None
+    assert pixel_bits(PixelType_Gvsp_Mono12) == 12
+    assert pixel_bits(PixelType_Gvsp_BayerRG8) == 8
+
+
+def test_grab_array_shape_and_copy(cam):
+    frame = cam.grab_array(exposure_us=1000, copy=True)
+    assert frame.shape == (FakeMvCamera.height, FakeMvCamera.width)
+    assert frame.dtype == np.uint8
+    view = cam.grab_array()
+    assert view.base is not None                 # 零拷贝视图
+    assert not np.shares_memory(frame, view)
+
+
+def test_snap_async_jpeg_uses_sdk_encoder(cam, tmp_path):
+    with AsyncFrameWriter(workers=1, verbose=False) as writer:
+        assert cam.snap_async(writer, tmp_path / "a.jpg", exposure_us=1000)
+        assert cam.snap_async(writer, tmp_path / "a.png", exposure_us=1000)
+    assert cam.cam.calls["MV_CC_SaveImageEx2"] == 1          # .png 走后台编码
+    assert (tmp_path / "a.jpg").stat().st_size > 0
+    assert (tmp_path / "a.png").stat().st_size > 0
+
+
+def test_burst_mean_and_stack(cam, tmp_path):
+    stack_path = tmp_path / "stack.npy"
+    mean, n = cam.burst(3, exposure_us=1000, stack_path=str(stack_path))
+    assert n == 3
+    stack = np.load(stack_path)
+    assert stack.shape == (3, FakeMvCamera.height, FakeMvCamera.width)
+    np.testing.assert_allclose(mean, stack.mean(axis=0), rtol=1e-6)
+
+
+def test_scene_camera_follows_exposure():
+    scene = SimScene(64, 48, read_noise=0.0, shot_noise=False, seed=0)
+    cam = HikCamera(sdk=SceneMvCamera.bind(scene, "Mono12"))
+    assert cam.open()
+    try:
+        dim = cam.grab_array(exposure_us=100000.0, copy=True)
+        bright = cam.grab_array(exposure_us=200000.0, copy=True)
+    finally:
+        cam.close()
+    assert dim.dtype == np.uint16 and dim.max() <= 4095
+    assert bright.sum() > dim.sum()
+
+
+@pytest.mark.parametrize("pixel_type, channels", [(PixelType_Gvsp_Mono8, None), (PixelType_Gvsp_Mono12, None),
+                                                  (PixelType_Gvsp_BayerRG8, 3), (PixelType_Gvsp_RGB8_Packed, 3)])
+@pytest.mark.parametrize("ext", ["jpg", "bmp"])
+def test_sim_snap_is_decodable(tmp_path, pixel_type, channels, ext):
+    cam = HikCamera(sdk=type("SimMvCamera", (FakeMvCamera,), {"pixel_type": pixel_type}))
+    assert cam.open()
+    try:
+        path = tmp_path / f"a.{ext}"
+        assert cam.snap(str(path), exposure_us=1000)
+    finally:
+        cam.close()
+    img = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+    assert img is not None and img.dtype == np.uint8
+    assert img.shape[:2] == (FakeMvCamera.height, FakeMvCamera.width)
+    assert (img.shape[2] if img.ndim == 3 else None) == channels
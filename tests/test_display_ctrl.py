@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""DisplayController：命令超时、线程退出时的未决命令，以及（有 $DISPLAY 时）真实窗口的呈现时序"""
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import src.display_ctrl as display_ctrl
+from src.display_ctrl import DisplayController
+
+
+class _StubScreen:
+    """不建窗口的 Screen：after() 不排期（命令永远不执行），start() 阻塞到 release 或抛出 error"""
+    error = None
+
+    def __init__(self, **kwargs):
+        self.root = self
+        self.release = threading.Event()
+
+    def after(self, ms, fn):
+        pass
+
+    def start(self):
+        self.release.wait(0.2)
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self.release.set()
+
+
+def test_command_times_out_by_default(monkeypatch):
+    monkeypatch.setattr(display_ctrl, "Screen", type("S", (_StubScreen,), {}))
+    disp = DisplayController(cmd_timeout=0.05).start()
+    with pytest.raises(TimeoutError):
+        disp.hide()
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+@pytest.mark.parametrize("error", [None, RuntimeError("boom")])
+def test_pending_commands_fail_when_thread_exits(monkeypatch, error):
+    monkeypatch.setattr(display_ctrl, "Screen", type("S", (_StubScreen,), {"error": error}))
+    disp = DisplayController().start()
+    fut = disp.hide(wait=False)
+    with pytest.raises(RuntimeError, match="显示线程已退出"):
+        fut.result(5)
+    disp._thread.join(5)
+    with pytest.raises(RuntimeError):
+        disp.hide()
+
+
+@pytest.mark.skipif(not os.environ.get("DISPLAY"), reason="需要 $DISPLAY（可用 xvfb-run 运行）")
+def test_presentation_timing(tmp_path):
+    import cv2
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.png"
+        cv2.imwrite(str(path), np.full((120, 160), 80 * i, dtype=np.uint8))
+        paths.append(path)
+    with DisplayController(scale_factor=0.5) as disp:
+        assert disp.load_playlist(paths) == len(paths)
+        events = []
+        for _ in range(2 * len(paths)):
+            t0 = time.perf_counter()
+            ev = disp.next()
+            assert ev is not None and t0 <= ev["t"] <= time.perf_counter()
+            events.append(ev)
+        assert [ev["index"] for ev in events] == [0, 1, 2, 0, 1, 2]
+        assert all(a["t"] < b["t"] for a, b in zip(events, events[1:]))
+        assert all(ev["latency_ms"] >= 0 for ev in events)
+        stop = disp._submit("stop", wait=False)
+        try:
+            late = disp.hide(wait=False)
+        except RuntimeError:
+            late = None                                   # 已关闭，入队即被拒绝
+        stop.result(5)
+        if late is not None:
+            with pytest.raises(RuntimeError):
+                late.result(5)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""FrameRing 的丢帧 / 覆盖 / 跳帧统计"""
+import numpy as np
+import pytest
+
+from src.frame_ring import FrameRing
+
+
+def push(ring, value, num):
+    src = np.full(4, value, dtype=np.uint8)
+    return ring.push(src.ctypes.data, src.nbytes, {"frame_num": num})
+
+
+def test_overwrite_keeps_newest():
+    ring = FrameRing(slots=3, slot_bytes=4, overwrite=True)
+    for n in range(1, 6):
+        assert push(ring, n, n)
+    st = ring.stats()
+    assert st["received"] == 5 and st["dropped"] == 2 and st["pending"] == 3
+    values = []
+    while ring.pending():
+        raw, meta = ring.pop(timeout=0)
+        values.append(int(raw[0]))
+    assert values == [3, 4, 5]
+    assert ring.stats()["delivered"] == 3
+
+
+def test_no_overwrite_drops_new_frames():
+    ring = FrameRing(slots=2, slot_bytes=4, overwrite=False)
+    assert push(ring, 1, 1) and push(ring, 2, 2)
+    assert not push(ring, 3, 3)
+    raw, meta = ring.pop(timeout=0)
+    assert int(raw[0]) == 1 and meta["nbytes"] == 4
+    assert ring.stats()["dropped"] == 1
+
+
+def test_latest_skips_and_lost_frames():
+    ring = FrameRing(slots=4, slot_bytes=4)
+    for value, num in ((1, 1), (2, 2), (3, 5)):    # 帧号 3、4 在相机端丢失
+        push(ring, value, num)
+    raw, _ = ring.pop(timeout=0, latest=True)
+    st = ring.stats()
+    assert int(raw[0]) == 3
+    assert st["skipped"] == 2 and st["lost"] == 2
+
+
+def test_close_wakes_consumer():
+    ring = FrameRing(slots=2, slot_bytes=4)
+    push(ring, 7, 1)
+    ring.close()
+    assert ring.pop(timeout=1.0) is not None
+    assert ring.pop(timeout=1.0) is None
+
+
+def test_requires_two_slots():
+    with pytest.raises(ValueError):
+        FrameRing(slots=1, slot_bytes=4)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""RunLog：追加、idx 分配、文件编号预留与 YAML 导出 / 迁移"""
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import yaml
+
+from utils.run_log import RunLog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _append_worker(proj_dir, worker, n):
+    """子进程：交替预留文件编号与追加记录（记录足够长，未加锁时容易交错）"""
+    log = RunLog(proj_dir)
+    for i in range(n):
+        log.reserve(1)
+        log.append({f"task_{worker}_{i}": {"worker": worker, "pad": "x" * 4096}})
+
+
+def test_append_assigns_increasing_idx(tmp_path):
+    log = RunLog(tmp_path, project={"id": "exp001"})
+    recs = [log.append({f"task_{i}": {"n": i}}) for i in range(3)]
+    assert [r["idx"] for r in recs] == [1, 2, 3]
+    assert log.last_index() == 3
+    lines = (tmp_path / "run.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0]) == {"project": {"id": "exp001"}}
+    assert len(lines) == 4
+
+
+def test_partial_last_line_is_repaired(tmp_path):
+    log = RunLog(tmp_path)
+    log.append({"task_a": {}})
+    with open(log.path, "ab") as f:
+        f.write(b'{"idx": 9, "task_')            # 中断写入留下的半行
+    rec = log.append({"task_b": {}})
+    assert rec["idx"] == 2
+    assert [r["idx"] for r in RunLog(tmp_path)] == [1, 2]
+
+
+def test_export_and_migrate_yaml(tmp_path):
+    old = tmp_path / "old"
+    old.mkdir()
+    with open(old / "run.yaml", "w", encoding="utf-8") as f:
+        yaml.safe_dump({"project": {"id": "p"}, "save_log": [{"task_x": {"a": 1}}, {"task_y": {}}]}, f)
+    log = RunLog(old)
+    assert log.last_index() == 2
+    out = log.export_yaml(tmp_path / "export.yaml")
+    data = yaml.safe_load(out.read_text(encoding="utf-8"))
+    assert data["project"] == {"id": "p"}
+    assert [r["idx"] for r in data["save_log"]] == [1, 2]
+def test_reopen_continues_and_reserve(tmp_path):
+    RunLog(tmp_path).append({"task_a": {}})
+    log = RunLog(tmp_path)
+    assert log.next_index() == 2
+    assert list(log.reserve(3)) == [2, 3, 4]
+    assert log.next_index() == 5
+    assert log.append({"task_b": {}})["idx"] == 2
+
+
+def test_concurrent_processes_share_one_log(tmp_path):
+    RunLog(tmp_path, project={"id": "mp"})
+    workers, n = 4, 10
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_append_worker, args=(str(tmp_path), w, n)) for w in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+    lines = (tmp_path / "run.jsonl").read_text(encoding="utf-8").splitlines()
+    recs = [json.loads(line) for line in lines[1:]]      # 每行都是完整 JSON：没有交错
+    assert [r["idx"] for r in recs] == list(range(1, workers * n + 1))
+    for w in range(workers):
+        assert sum(f"task_{w}_0" in r for r in recs) == 1
+    assert RunLog(tmp_path).reserve(1)[0] == workers * n + 1
+
+
+def test_cli_export_migrate_next(tmp_path):
+    with open(tmp_path / "run.yaml", "w", encoding="utf-8") as f:
+        yaml.safe_dump({"project": {"id": "p"}, "save_log": [{"task_x": {}}]}, f)
+
+    def cli(*args):
+        res = subprocess.run([sys.executable, os.path.join(ROOT, "utils", "run_log.py"), *args, str(tmp_path)],
+                             cwd=str(tmp_path), capture_output=True, text=True, timeout=60)
+        assert res.returncode == 0, res.stderr
+        return res.stdout.strip()
+
+    assert "[OK]" in cli("migrate")
+    assert (tmp_path / "run.jsonl").exists()
+    assert cli("next") == "2"
+    cli("export", "--out", str(tmp_path / "out.yaml"))
+    data = yaml.safe_load((tmp_path / "out.yaml").read_text(encoding="utf-8"))
+    assert [r["idx"] for r in data["save_log"]] == [1]
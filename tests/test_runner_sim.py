@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""ExperimentRunner 在 devices.backend: sim 下跑完整的多步序列"""
+import json
+
+import numpy as np
+import pytest
+import yaml
+from PIL import Image
+
+from src.calc_wiener import load_image
+from src.experiment_runner import ExperimentRunner
+from utils.config_utils import prepare_run_environment
+from utils.trace import tracer
+
+
+@pytest.fixture
+def sim_config(tmp_path):
+    pattern = tmp_path / "FZA.png"
+    yy, xx = np.mgrid[-24:24, -32:32]
+    Image.fromarray(((np.cos((xx ** 2 + yy ** 2) / 40.0) > 0) * 255).astype(np.uint8)).save(pattern)
+    chart = tmp_path / "chart.png"
+    Image.fromarray((np.indices((48, 64)).sum(axis=0) % 8 * 32).astype(np.uint8)).save(chart)
+
+    cfg = {
+        "project": {"id": "exp001", "root_dir": str(tmp_path / "out"), "description": "sim", "run_log": "jsonl"},
+        "task": {"mode": "capture_measurement", "description": "", "repeat": 1},
+        "capture_settings": {
+            "exposure_us": 200000.0, "slm_image_path": str(pattern), "slm_settle_ms": 0,
+            "display_image_path": str(chart), "scale_factor": 1.0, "monitor_idx": 0,
+            "camera_features": {}, "burst_reduce": "mean", "trigger": "",
+        },
+        "physical_setup": {"object_name": "chart"},
+        "devices": {"backend": "sim", "sim": {"width": 64, "height": 48, "seed": 0}},
+        "sequence": [
+            {"mode": "capture_psf", "camera_features": {"Gain": 6.0}},
+            {"mode": "capture_measurement", "repeat": 3},
+            {"mode": "capture_measurement", "exposure_us": 400000.0},
+        ],
+    }
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(cfg, allow_unicode=True), encoding="utf-8")
+    yield path
+    tracer.disable()
+    tracer.clear()
+
+
+def test_sequence_on_sim_devices(sim_config):
+    config, run_data, run_path, proj_dir, _ = prepare_run_environment(str(sim_config))
+    with ExperimentRunner(config, run_data, run_path, proj_dir, export_yaml=True) as runner:
+        gains = []
+        orig_run_step = runner.run_step
+
+        def run_step(i, step, writer):
+            entry = orig_run_step(i, step, writer)
+            gains.append(runner.cam.cam.nodes.get("Gain"))
+            return entry
+        runner.run_step = run_step
+        entries = runner.run()
+
+    assert len(entries) == 3
+    # 第 1 步的 Gain 只作用于该步，之后恢复为覆盖前的值
+    assert gains == [6.0, 0.0, 0.0]
+
+    lines = (proj_dir / "run.jsonl").read_text(encoding="utf-8").splitlines()
+    recs = [json.loads(ln) for ln in lines[1:]]
+    assert [r["idx"] for r in recs] == [1, 2, 3]
+    vals = [next(v for k, v in r.items() if k.startswith("task_")) for r in recs]
+    assert vals[0]["psf_path"].endswith(".jpg")
+    assert vals[1]["measurement_path"].endswith(".npy") and vals[2]["measurement_path"].endswith(".jpg")
+
+    burst = vals[1]["burst"]
+    assert burst["frames"] == 3 and burst["bit_depth"] == 8
+    mean = load_image(next(p for p in proj_dir.glob("*.npy") if not p.name.endswith("-stack.npy")))
+    assert mean.shape == (48, 64, 1) and 0.0 <= mean.min() and mean.max() <= 1.0
+    with pytest.raises(ValueError):
+        load_image(burst["stack_path"])
+
+    assert (proj_dir / "run.yaml").exists()
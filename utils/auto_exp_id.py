@@ -1,6 +1,8 @@
 import os, json, hashlib, datetime, tempfile, yaml
 from typing import Tuple
 
+from utils.sequence import SequenceAllocator
+
 def _atomic_write_text(path: str, text: str, encoding="utf-8") -> None:
     """原子写：避免半写入导致损坏"""
     d = os.path.dirname(path) or "."
@@ -29,9 +31,6 @@ def _load_counter(counter_path: str) -> dict:
     with open(counter_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def _save_counter(counter_path: str, obj: dict) -> None:
-    _atomic_write_text(counter_path, json.dumps(obj))
-
 def _key_for_reset(today_str: str, reset: str) -> str:
     if reset == "none":
         return "global"
@@ -40,10 +39,15 @@ def _key_for_reset(today_str: str, reset: str) -> str:
     # default: daily
     return today_str          # YYYYMMDD
 
+def _allocator_path(counter_path: str) -> str:
+    """计数器改存 SQLite（与 .counter.json 同目录同名，扩展名 .sqlite）"""
+    return os.path.splitext(counter_path)[0] + ".sqlite"
+
 def next_experiment_id(cfg_path: str) -> Tuple[str, dict]:
     """
     从 YAML 中读取 experiment_id 配置，并生成唯一编号。
-    适合单机单进程演示；若有并发/多机，请升级为加锁或 SQLite/Redis 方案。
+    序号在 SQLite 事务中原子递增，多个进程同时调用也不会重复；
+    旧的 .counter.json 仍会被读取（不再写入），作为序号下限以接续原有编号。
     返回 (exp_id, cfg_dict)
     """
     cfg = _load_yaml(cfg_path)
@@ -60,16 +64,20 @@ def next_experiment_id(cfg_path: str) -> Tuple[str, dict]:
     today = datetime.datetime.now().strftime(date_fmt)
     key = _key_for_reset(today, reset)
 
-    counter = _load_counter(counter_path)
-    if counter.get("key") != key:
-        counter = {"key": key, "seq": 0}
-    counter["seq"] += 1
-    _save_counter(counter_path, counter)
+    seq_path = _allocator_path(counter_path)
+    floor = 0
+    if os.path.exists(counter_path):
+        counter = _load_counter(counter_path)
+        if counter.get("key") == key:
+            floor = int(counter.get("seq", 0))
+    os.makedirs(os.path.dirname(os.path.abspath(seq_path)), exist_ok=True)
+    # 按重置周期的 key 分别计数（daily 时每天一个序列）
+    seq = SequenceAllocator(seq_path).next(key, floor=floor)
 
     cfg_bytes = _read_bytes(cfg_path)
     sh = _short_hash(cfg_bytes, hash_len)
 
-    exp_id = fmt.format(date=today, seq=counter["seq"], hash=sh)
+    exp_id = fmt.format(date=today, seq=seq, hash=sh)
     return exp_id, cfg
 
 def prepare_experiment_dir(CONFIG_PATH, config):
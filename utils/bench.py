@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试工具：计时、延迟分位数、峰值内存，以及结果 JSON 的保存与对比。具体测试项见 utils/bench_pipeline.py。
+
+    res = run_case("tamura", fn, repeat=20, warmup=2, items=1, unit="frame", params={"shape": [2048, 2448]})
+    path = save_results("bench_results", [res])
+    python utils/bench.py bench_results/old.json bench_results/new.json     # 对比两次结果
+
+  - 延迟：每次调用 fn() 的耗时（perf_counter），报告 mean/min/p50/p90/p99/max（毫秒）
+  - 吞吐：items * repeat / 总耗时，items 为每次调用处理的帧 / 图案数
+  - 内存：计时结束后再单独调用一次 fn()，
+      py_peak_mb : tracemalloc 峰值（Python 对象与 NumPy 数组；torch 的 CPU 张量不计入）
+      rss_peak_mb: 调用期间进程常驻内存峰值相对调用前的增量（后台线程每 2 ms 采样）
+"""
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ========== 常驻内存 ==========
+
+def _rss_psutil():
+    import psutil
+    proc = psutil.Process()
+    return lambda: proc.memory_info().rss
+
+
+def _rss_proc():
+    page = os.sysconf("SC_PAGE_SIZE")
+
+    def read():
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * page
+    read()
+    return read
+
+
+def _rss_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + \
+                   [(name, ctypes.c_size_t) for name in (
+                       "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                       "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    handle = ctypes.windll.kernel32.GetCurrentProcess()
+
+    def read():
+        ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize
+    read()
+    return read
+
+
+_rss_reader = None
+
+
+def rss_bytes():
+    """当前进程常驻内存（字节）；平台不支持时返回 None"""
+    global _rss_reader
+    if _rss_reader is None:
+        _rss_reader = False
+        for factory in (_rss_psutil, _rss_proc, _rss_windows):
+            try:
+                _rss_reader = factory()
+                break
+            except Exception:
+                continue
+    return _rss_reader() if _rss_reader else None
+
+
+class RssSampler:
+    """with RssSampler() as s: ...  结束后 s.peak 为期间采样到的最大常驻内存（字节）"""
+
+    def __init__(self, interval_s: float = 0.002):
+        self.interval_s = interval_s
+        self.start = self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __enter__(self):
+        self.start = self.peak = rss_bytes()
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, rss_bytes())
+
+# ========== 计时 ==========
+
+def percentile(sorted_values, q: float) -> float:
+    """线性插值分位数，sorted_values 已升序，q 为 0~100"""
+    if not sorted_values:
+        return float("nan")
+    k = (len(sorted_values) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def latency_summary(seconds) -> dict:
+    ms = sorted(s * 1000.0 for s in seconds)
+    return {"mean": round(sum(ms) / len(ms), 4), "min": round(ms[0], 4),
+            "p50": round(percentile(ms, 50), 4), "p90": round(percentile(ms, 90), 4),
+            "p99": round(percentile(ms, 99), 4), "max": round(ms[-1], 4)}
+
+
+def run_case(name: str, fn, repeat: int = 10, warmup: int = 1, items: int = 1, unit: str = "item",
+             params: dict = None, memory: bool = True, quiet: bool = True) -> dict:
+    """
+    调用 fn() warmup + repeat 次并统计，返回一条结果 dict。
+    quiet=True 时屏蔽 fn 内部的打印（如 [OK] / [LOG]），不影响本函数自己的输出。
+    """
+    mute = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    times = []
+    with mute:
+        for _ in range(warmup):
+            fn()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+
+        py_peak = rss_peak = None
+        if memory:
+            tracemalloc.start()
+            try:
+                with RssSampler() as sampler:
+                    fn()
+                py_peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            if sampler.start is not None:
+                rss_peak = sampler.peak - sampler.start
+
+    total = sum(times)
+    return {
+        "case": name,
+        "params": params or {},
+        "unit": unit,
+        "items_per_call": items,
+        "repeat": repeat,
+        "warmup": warmup,
+        "latency_ms": latency_summary(times),
+        "throughput": round(items * repeat / total, 4) if total > 0 else None,
+        "py_peak_mb": None if py_peak is None else round(py_peak / 2**20, 3),
+        "rss_peak_mb": None if rss_peak is None else round(rss_peak / 2**20, 3),
+    }
+
+
+def format_result(r: dict) -> str:
+    lat = r["latency_ms"]
+    mem = "" if r["py_peak_mb"] is None else f"  py {r['py_peak_mb']:8.1f} MB"
+    if r["rss_peak_mb"] is not None:
+        mem += f"  rss +{r['rss_peak_mb']:.1f} MB"
+    return (f"{case_key(r):<56} p50 {lat['p50']:9.2f} ms  p90 {lat['p90']:9.2f}  p99 {lat['p99']:9.2f}"
+            f"  {r['throughput'] or 0:9.1f} {r['unit']}/s{mem}")
+
+# ========== 结果文件 ==========
+
+def _git(*args):
+    try:
+        out = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def environment() -> dict:
+    """运行环境：版本号只读取已导入的库，不为了记录版本而导入 torch / cv2"""
+    versions = {}
+    for mod in ("numpy", "torch", "cv2", "PIL"):
+        m = sys.modules.get(mod)
+        if m is not None:
+            versions[mod] = getattr(m, "__version__", None)
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git("rev-parse", "--short", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "versions": versions,
+    }
+
+
+def save_results(out, results, meta: dict = None) -> str:
+    """写出 {"meta": ..., "results": [...]}；out 为目录时文件名为 bench-<时间>.json，返回路径"""
+    meta = {**environment(), **(meta or {})}
+    path = out
+    if os.path.isdir(out) or not str(out).lower().endswith(".json"):
+        os.makedirs(out, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(out, f"bench-{stamp}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": list(results)}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_results(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def case_key(r: dict) -> str:
+    """用于跨次对比的键：测试项 + 参数，如 wiener_reconstruct[precision=float32,shape=2048x2448]"""
+    params = ",".join(f"{k}={'x'.join(map(str, v)) if isinstance(v, (list, tuple)) else v}"
+                      for k, v in sorted(r.get("params", {}).items()))
+    return f"{r['case']}[{params}]" if params else r["case"]
+
+
+def compare(old_results, new_results, threshold: float = 0.10) -> list:
+    """
+    按 case_key 对齐两组结果，返回 [{"case", "old_p50", "new_p50", "ratio", "status"}]：
+    ratio = new_p50 / old_p50，超过 1 + threshold 为 slower，低于 1 - threshold 为 faster。
+    """
+    old = {case_key(r): r for r in old_results}
+    rows = []
+    for r in new_results:
+        key = case_key(r)
+        new_p50 = r["latency_ms"]["p50"]
+        if key not in old:
+            rows.append({"case": key, "old_p50": None, "new_p50": new_p50, "ratio": None, "status": "new"})
+            continue
+        old_p50 = old[key]["latency_ms"]["p50"]
+        ratio = new_p50 / old_p50 if old_p50 else float("inf")
+        status = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else "same"
+        rows.append({"case": key, "old_p50": old_p50, "new_p50": new_p50, "ratio": round(ratio, 4),
+                     "status": status})
+    return rows
+
+
+def print_comparison(rows) -> None:
+    tags = {"slower": "[WARN]", "faster": "[OK]", "same": "[OK]", "new": "[INFO]"}
+    for row in rows:
+        if row["old_p50"] is None:
+            print(f"{tags['new']} {row['case']:<56} 新增  p50 {row['new_p50']:9.2f} ms")
+        else:
+            print(f"{tags[row['status']]} {row['case']:<56} p50 {row['old_p50']:9.2f} -> "
+                  f"{row['new_p50']:9.2f} ms  x{row['ratio']:.2f}  {row['status']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="对比两次基准测试结果（按 p50 延迟）")
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.10, help="判定变快 / 变慢的相对变化，默认 0.10")
+    args = ap.parse_args()
+
+    rows = compare(load_results(args.old)["results"], load_results(args.new)["results"], args.threshold)
+    print_comparison(rows)
+    sys.exit(1 if any(r["status"] == "slower" for r in rows) else 0)
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+流水线基准测试：在合成数据上测量重建、对焦评价、显示渲染、图案光阑和模拟相机各阶段的
+吞吐、延迟分位数与峰值内存，结果写成 JSON，便于对比不同版本。
+
+    python utils/bench_pipeline.py                                  # 全部阶段，传感器 2048x2448
+    python utils/bench_pipeline.py --quick                          # 小尺寸快速检查
+    python utils/bench_pipeline.py --stages wiener tamura --sensor 2048x2448 1080x1440
+    python utils/bench_pipeline.py --compare bench_results/bench-20251020-101500.json
+    python utils/bench.py old.json new.json                         # 只对比两次结果
+
+阶段（--stages）：
+  - wiener : 旧接口 WieNer()、WienerDeconvolver.reconstruct()（float64 / float32）、4 张一批 deconvolve()
+  - tamura : calculate_tamura_coefficient()（整幅 float64）与实时对焦用的 focus_metric(downsample=4)
+  - screen : render_frame()（Screen.show_image 缓存未命中时的合成）；有图形界面时再测 Screen.show_image 本身
+  - pattern: PatternBank.generate()、整批 apply_aperture()、单张 _mask_file()、process_folder(force=True)
+  - camera : SceneMvCamera + HikCamera 的 grab_array()、snap_async()（含后台写 PNG）、连续采集 frames()
+
+合成数据放在临时目录（--keep 保留）：
+  - patterns/: fza_grid 生成的 FZA 图案（SLM 尺寸 8 位 PNG）
+  - chart.png: 随机方块组成的目标图，作为显示内容
+  - 每个传感器尺寸一对 PSF / 测量图：SimScene 以随机选取的图案为掩膜渲染（--seed 固定）
+模拟相机关闭了噪声，camera 阶段的数字包含场景渲染，只用于比较取帧路径本身的开销变化。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.bench import format_result, print_comparison, compare, load_results, run_case, save_results
+
+SENSOR_SHAPE = (2048, 2448)    # (H, W)
+SCREEN_SHAPE = (1080, 1920)
+QUICK = {"sensor": [(240, 320)], "slm": (270, 480), "screen": (270, 480), "patterns": 8, "repeat": 5}
+
+# ========== 合成数据 ==========
+
+def parse_shape(text):
+    """"2048x2448" -> (2048, 2448)，即 H x W"""
+    h, w = text.lower().split("x")
+    return int(h), int(w)
+
+
+class Fixtures:
+    """一次基准测试用到的全部合成数据"""
+
+    def __init__(self, root, sensor_shapes, slm_shape, screen_shape, n_patterns=16, seed=0):
+        from utils.fza_patterns import PatternBank, fza_grid
+
+        self.root = root
+        self.sensor_shapes = [tuple(s) for s in sensor_shapes]
+        self.slm_shape = tuple(slm_shape)
+        self.screen_shape = tuple(screen_shape)
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+
+        radii = np.linspace(10, 60, n_patterns)
+        self.specs = fza_grid(radii, apertures=[min(self.slm_shape) * 0.4])
+        self.bank = PatternBank.generate(self.specs, self.slm_shape)
+        self.pattern_dir = os.path.join(root, "patterns")
+        self.patterns = self.bank.save(self.pattern_dir)
+
+        # 目标图：随机黑白方块，尺寸取最大的传感器尺寸
+        h, w = max(self.sensor_shapes, key=lambda s: s[0] * s[1])
+        block = max(4, min(h, w) // 32)
+        cells = self.rng.random((h // block + 1, w // block + 1)) > 0.5
+        chart = np.kron(cells, np.ones((block, block), bool))[:h, :w]
+        self.chart = os.path.join(root, "chart.png")
+        from src.frame_writer import write_frame
+        write_frame(chart.astype(np.uint8) * 255, self.chart)
+
+        self._pairs = {}
+
+    def scene(self, shape, noise=True):
+        from src.sim_camera import SimScene
+
+        h, w = shape
+        return SimScene(width=w, height=h, read_noise=0.002 if noise else 0.0, shot_noise=noise,
+                        seed=self.seed)
+
+    def pair(self, shape):
+        """(psf, measurement)：uint8 (H, W) 数组，PSF 为随机图案对应的点光源像"""
+        shape = tuple(shape)
+        if shape not in self._pairs:
+            scene = self.scene(shape)
+            scene.set_pattern(self.patterns[int(self.rng.integers(len(self.patterns)))])
+            psf = np.rint(scene.clean() * 255).astype(np.uint8)
+            scene.set_display(self.chart, 1.0)
+            blur = np.rint(scene.render(scene.exposure_ref_us * 0.5) * 255).astype(np.uint8)
+            self._pairs[shape] = (psf, blur)
+        return self._pairs[shape]
+
+# ========== 测试阶段 ==========
+# 每个阶段是一个生成器，逐个 yield run_case 的参数；需要清理的资源在 finally 中释放
+
+def stage_wiener(fx, repeat):
+    from src.calc_wiener import WieNer, WienerDeconvolver, load_image
+    from utils.lazy import lazy_import
+
+    torch = lazy_import("torch")
+    for shape in fx.sensor_shapes:
+        psf, blur = fx.pair(shape)
+        size = list(shape)
+        blur_t = torch.from_numpy(load_image(blur)).permute(2, 0, 1).unsqueeze(0)
+        psf_t = torch.from_numpy(load_image(psf)).permute(2, 0, 1).unsqueeze(0)
+        yield dict(name="wiener_legacy", fn=lambda: WieNer(blur_t, psf_t, 80000), repeat=repeat,
+                   unit="frame", params={"shape": size})
+        for precision in ("float64", "float32"):
+            deconv = WienerDeconvolver(psf, precision=precision)
+            batch = deconv.load_batch([blur])
+            yield dict(name="wiener_reconstruct", fn=lambda: deconv.reconstruct(batch), repeat=repeat,
+                       unit="frame", params={"shape": size, "precision": precision})
+        deconv = WienerDeconvolver(psf, precision="float32")
+        batch4 = deconv.load_batch([blur] * 4)
+        yield dict(name="wiener_batch", fn=lambda: deconv.deconvolve(batch4), repeat=repeat, items=4,
+                   unit="frame", params={"shape": size, "precision": "float32", "batch": 4})
+
+
+def stage_tamura(fx, repeat):
+    from src.calc_tamura import calculate_tamura_coefficient, focus_metric
+
+    for shape in fx.sensor_shapes:
+        _, frame = fx.pair(shape)
+        yield dict(name="tamura_legacy", fn=lambda: calculate_tamura_coefficient(frame), repeat=repeat,
+                   unit="frame", params={"shape": list(shape)})
+        yield dict(name="focus_live", fn=lambda: focus_metric(frame, "tamura", downsample=4),
+                   repeat=repeat * 4, unit="frame", params={"shape": list(shape), "downsample": 4})
+
+
+def stage_screen(fx, repeat):
+    from PIL import Image
+
+    h, w = fx.screen_shape
+    geom = (0, 0, w, h)
+    # render_frame 在 screen_viewer 中，但该模块导入时需要 Tk 与 screeninfo；没有时无法测试
+    try:
+        from src.screen_viewer import Screen, render_frame
+    except ImportError as e:
+        print(f"[WARN] 跳过 screen 阶段: {e}")
+        return
+    with Image.open(fx.chart) as im:
+        scale = min(w / im.width, h / im.height) * 0.9
+    yield dict(name="screen_render", fn=lambda: render_frame(fx.chart, geom, "black", scale), repeat=repeat,
+               unit="frame", params={"screen": [h, w]})
+
+    try:
+        scr = Screen(monitor_index=0, bg="black")
+    except Exception as e:    # 没有图形界面（如 Linux 无 DISPLAY）
+        print(f"[WARN] 跳过 Screen.show_image: {e}")
+        return
+    try:
+        paths = fx.patterns[:2]
+        scr.prewarm([(p, 1.0) for p in paths])
+        state = {"i": 0}
+
+        def show_cached():
+            state["i"] ^= 1
+            scr.show_image(paths[state["i"]], 1.0)
+            scr.root.update()
+
+        def show_uncached():
+            scr.frames.clear()
+            show_cached()
+
+        yield dict(name="screen_show", fn=show_cached, repeat=repeat * 4, unit="frame",
+                   params={"screen": list(scr.geom[2:][::-1]), "cache": "hit"})
+        yield dict(name="screen_show", fn=show_uncached, repeat=repeat, unit="frame",
+                   params={"screen": list(scr.geom[2:][::-1]), "cache": "miss"})
+    finally:
+        scr.close()
+
+
+def stage_pattern(fx, repeat):
+    from utils.fza_patterns import PatternBank, apply_aperture
+    import utils.pre_process_fza_patten as pre
+
+    n = len(fx.specs)
+    size = list(fx.slm_shape)
+    radius = min(fx.slm_shape) * 0.3
+    yield dict(name="fza_generate", fn=lambda: PatternBank.generate(fx.specs, fx.slm_shape), repeat=repeat,
+               items=n, unit="pattern", params={"shape": size, "n": n})
+    stack = fx.bank.data.copy()
+    yield dict(name="aperture_stack", fn=lambda: apply_aperture(stack, radius, stacked=True), repeat=repeat,
+               items=n, unit="pattern", params={"shape": size, "n": n})
+    job = (fx.patterns[0], os.path.join(fx.root, "masked_one.png"), radius, None, 0)
+    yield dict(name="mask_file", fn=lambda: pre._mask_file(job), repeat=repeat, unit="pattern",
+               params={"shape": size})
+    yield dict(name="mask_folder", fn=lambda: pre.process_folder(fx.pattern_dir, radius, force=True),
+               repeat=max(1, repeat // 2), items=n, unit="pattern", params={"shape": size, "n": n})
+
+
+def stage_camera(fx, repeat):
+    from src.camera import HikCamera
+    from src.frame_writer import AsyncFrameWriter
+    from src.sim_camera import SceneMvCamera
+
+    out_dir = os.path.join(fx.root, "snaps")
+    for shape in fx.sensor_shapes:
+        size = list(shape)
+        scene = fx.scene(shape, noise=False)
+        scene.set_pattern(fx.patterns[0])
+        scene.set_display(fx.chart, 1.0)
+        cam = HikCamera(sdk=SceneMvCamera.bind(scene, frame_period_s=0.0))
+        try:
+            if not cam.open():
+                print(f"[WARN] 模拟相机打开失败，跳过 {shape}")
+                continue
+            cam.start_stream()
+            yield dict(name="camera_grab", fn=lambda: cam.grab_array(), repeat=repeat, unit="frame",
+                       params={"shape": size})
+            for ext in ("png", "jpg"):
+                with AsyncFrameWriter(max_queue=4, workers=2, verbose=False) as writer:
+                    state = {"i": 0}
+
+                    def snap(ext=ext):
+                        state["i"] += 1
+                        cam.snap_async(writer, os.path.join(out_dir, f"{state['i'] % 8}.{ext}"))
+
+                    yield dict(name="camera_snap_async", fn=snap, repeat=repeat, unit="frame",
+                               params={"shape": size, "ext": ext})
+            cam.stop_stream()
+
+            n = 16
+            cam.start_continuous(slots=8, source="callback", overwrite=True)
+
+            def consume():
+                for _ in cam.frames(timeout_ms=2000, max_frames=n):
+                    pass
+
+            yield dict(name="camera_continuous", fn=consume, repeat=repeat, items=n, unit="frame",
+                       params={"shape": size, "slots": 8})
+            cam.stop_continuous()
+        finally:
+            cam.close()
+
+
+STAGES = {
+    "wiener": stage_wiener,
+    "tamura": stage_tamura,
+    "screen": stage_screen,
+    "pattern": stage_pattern,
+    "camera": stage_camera,
+}
+
+# ========== 命令行 ==========
+
+def run(stages, fx, repeat=10, warmup=1, memory=True) -> list:
+    results = []
+    for stage in stages:
+        print(f"[LOG] 阶段 {stage}")
+        for case in STAGES[stage](fx, repeat):
+            case.setdefault("warmup", warmup)
+            r = run_case(memory=memory, **case)
+            r["stage"] = stage
+            results.append(r)
+            print(f"[OK] {format_result(r)}")
+    return results
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="流水线各阶段的吞吐 / 延迟 / 内存基准测试")
+    ap.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    ap.add_argument("--sensor", nargs="+", type=parse_shape, default=None,
+                    help=f"传感器尺寸 HxW，可给多个，默认 {SENSOR_SHAPE[0]}x{SENSOR_SHAPE[1]}")
+    ap.add_argument("--slm", type=parse_shape, default=None, help="图案尺寸 HxW，默认 1080x1920")
+    ap.add_argument("--screen", type=parse_shape, default=None, help="显示器尺寸 HxW，默认 1080x1920")
+    ap.add_argument("--patterns", type=int, default=None, help="合成图案数量，默认 16")
+    ap.add_argument("--repeat", type=int, default=None, help="每项计时次数，默认 10")
+    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument("--quick", action="store_true", help="小尺寸、少次数，用于快速检查")
+    ap.add_argument("--no-memory", action="store_true", help="不做内存测量")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=os.path.join(ROOT, "bench_results"), help="结果目录或 .json 路径")
+    ap.add_argument("--compare", default=None, help="与之前的结果 JSON 对比")
+    ap.add_argument("--threshold", type=float, default=0.10)
+    ap.add_argument("--keep", action="store_true", help="保留合成数据目录")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    preset = QUICK if args.quick else {"sensor": [SENSOR_SHAPE], "slm": (1080, 1920), "screen": SCREEN_SHAPE,
+                                       "patterns": 16, "repeat": 10}
+    sensor = args.sensor or preset["sensor"]
+    slm = args.slm or preset["slm"]
+    screen = args.screen or preset["screen"]
+    n_patterns = args.patterns or preset["patterns"]
+    repeat = args.repeat or preset["repeat"]
+
+    root = tempfile.mkdtemp(prefix="bench_")
+    try:
+        print(f"[LOG] 生成合成数据: {root}")
+        fx = Fixtures(root, sensor, slm, screen, n_patterns, args.seed)
+        results = run(args.stages, fx, repeat, args.warmup, memory=not args.no_memory)
+    finally:
+        if args.keep:
+            print(f"[INFO] 合成数据保留在 {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    meta = {"args": {"stages": args.stages, "sensor": [list(s) for s in sensor], "slm": list(slm),
+                     "screen": list(screen), "patterns": n_patterns, "repeat": repeat,
+                     "warmup": args.warmup, "seed": args.seed}}
+    path = save_results(args.out, results, meta)
+    print(f"[OK] 结果已保存: {path}")
+
+    if args.compare:
+        rows = compare(load_results(args.compare)["results"], results, args.threshold)
+        print_comparison(rows)
+        return 1 if any(r["status"] == "slower" for r in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
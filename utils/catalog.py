@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+实验目录索引：扫描 root_dir 下各项目的运行日志（run.jsonl，或尚未迁移的 run.yaml），
+把 save_log 条目写入 <root_dir>/catalog.sqlite，capture_settings / physical_setup 的 JSON 字符串
+拆成结构化字段，之后按条件查询而不必逐个打开 run.yaml。
+
+    python utils/catalog.py update ./output
+    python utils/catalog.py query ./output --mode capture_psf --slm FZA_bin_R25 --exposure-gt 100000
+    python utils/catalog.py pairs ./output --project 2025-10-15-exp003
+
+    cat = Catalog("./output"); cat.update()
+    rows = cat.query(mode="capture_psf", slm_image_path="FZA_bin_R25", exposure_gt=1e5)
+    pairs = cat.pairs()      # [(measurement, psf), ...]
+
+  - 增量更新：run.jsonl 记录已读到的字节位置，只解析新追加的行；run.yaml 按 mtime/大小判断是否重读
+  - 常用字段（曝光、SLM 图案、显示图片、缩放、物体名等）单独成列并建索引，
+    其余参数可用 --where "json_extract(capture_settings, '$.trigger') = 'software'" 查询
+"""
+import datetime
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+DB_NAME = "catalog.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path      TEXT PRIMARY KEY,
+    project   TEXT,
+    mtime_ns  INTEGER,
+    size      INTEGER,
+    offset    INTEGER          -- run.jsonl 已读到的字节位置
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    project            TEXT,
+    source             TEXT,
+    idx                INTEGER,
+    task_key           TEXT,
+    task_id            TEXT,
+    task_time          TEXT,
+    mode               TEXT,
+    description        TEXT,
+    path               TEXT,      -- psf_path 或 measurement_path
+    exposure_us        REAL,
+    slm_image_path     TEXT,
+    display_image_path TEXT,
+    scale_factor       REAL,
+    object_name        TEXT,
+    repeat             INTEGER,
+    capture_settings   TEXT,      -- 解析后的 JSON 对象
+    physical_setup     TEXT,
+    raw                TEXT,      -- 原始条目
+    PRIMARY KEY (project, idx)
+);
+CREATE INDEX IF NOT EXISTS ix_tasks_mode ON tasks (mode);
+CREATE INDEX IF NOT EXISTS ix_tasks_slm ON tasks (slm_image_path);
+CREATE INDEX IF NOT EXISTS ix_tasks_exposure ON tasks (exposure_us);
+CREATE INDEX IF NOT EXISTS ix_tasks_time ON tasks (task_time);
+"""
+
+COLUMNS = ["project", "idx", "task_id", "task_time", "mode", "path", "exposure_us",
+           "slm_image_path", "display_image_path", "scale_factor", "object_name", "repeat", "description"]
+
+
+def _as_dict(value) -> dict:
+    """capture_settings 等字段在日志里是 JSON 字符串（to_json_str），旧数据也可能是 dict"""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str) and value.strip():
+        try:
+            parsed = json.loads(value)
+            return parsed if isinstance(parsed, dict) else {}
+        except ValueError:
+            return {}
+    return {}
+
+
+def _float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten_entry(project: str, source: str, rec: dict):
+    """把一条 save_log 元素 {"idx": n, "task_xxxx": {...}} 转为 tasks 表的一行；格式不符返回 None"""
+    keys = [k for k in rec if k != "idx"]
+    if "idx" not in rec or len(keys) != 1 or not isinstance(rec[keys[0]], dict):
+        return None
+    key = keys[0]
+    val = rec[key]
+    cs = _as_dict(val.get("capture_settings"))
+    ps = _as_dict(val.get("physical_setup"))
+    burst = val.get("burst") or {}
+    return {
+        "project": project, "source": source, "idx": int(rec["idx"]), "task_key": key,
+        "task_id": val.get("task_id"), "task_time": val.get("task_time"), "mode": val.get("mode"),
+        "description": val.get("description"),
+        "path": val.get("psf_path") or val.get("measurement_path"),
+        "exposure_us": _float(cs.get("exposure_us")),
+        "slm_image_path": cs.get("slm_image_path"),
+        "display_image_path": cs.get("display_image_path"),
+        "scale_factor": _float(cs.get("scale_factor")),
+        "object_name": ps.get("object_name"),
+        "repeat": burst.get("repeat", 1),
+        "capture_settings": json.dumps(cs, ensure_ascii=False),
+        "physical_setup": json.dumps(ps, ensure_ascii=False),
+        "raw": json.dumps(rec, ensure_ascii=False, default=str),
+    }
+
+
+class Catalog:
+    def __init__(self, root_dir, db_path=None):
+        self.root_dir = Path(root_dir)
+        self.db_path = Path(db_path or self.root_dir / DB_NAME)
+        self.db = sqlite3.connect(str(self.db_path))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ========== 更新 ==========
+
+    def _log_files(self):
+        """每个项目目录取 run.jsonl，没有时取 run.yaml"""
+        if not self.root_dir.exists():
+            return
+        for proj in sorted(p for p in self.root_dir.iterdir() if p.is_dir()):
+            jsonl, yml = proj / "run.jsonl", proj / "run.yaml"
+            if jsonl.exists():
+                yield proj.name, jsonl
+            elif yml.exists():
+                yield proj.name, yml
+
+    def _insert(self, rows) -> int:
+        rows = [r for r in rows if r is not None]
+        if rows:
+            cols = list(rows[0])
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO tasks ({','.join(cols)}) VALUES ({','.join('?' * len(cols))})",
+                [tuple(r[c] for c in cols) for r in rows])
+        return len(rows)
+
+    def _ingest_jsonl(self, project, path, start: int):
+        """从 start 字节处读取新追加的完整行，返回 (行列表, 新的位置)"""
+        rows = []
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b"\n") + 1          # 末尾未写完的半行留到下次
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            rows.append(flatten_entry(project, str(path), rec))
+        return rows, start + end
+
+    def update(self, verbose: bool = True) -> dict:
+        """增量更新索引，返回 {"files", "skipped", "tasks"} 统计"""
+        stats = {"files": 0, "skipped": 0, "tasks": 0}
+        seen = set()
+        with self.db:
+            for project, path in self._log_files():
+                seen.add(str(path))
+                st = path.stat()
+                old = self.db.execute("SELECT * FROM sources WHERE path = ?", (str(path),)).fetchone()
+                if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+                    stats["skipped"] += 1
+                    continue
+                stats["files"] += 1
+                if path.suffix == ".jsonl" and old and st.st_size >= old["offset"]:
+                    rows, offset = self._ingest_jsonl(project, path, old["offset"])
+                else:
+                    # 新文件、被截断的 jsonl 或 run.yaml：整份重读
+                    self.db.execute("DELETE FROM tasks WHERE project = ?", (project,))
+                    if path.suffix == ".jsonl":
+                        rows, offset = self._ingest_jsonl(project, path, 0)
+                    else:
+                        import yaml    # 只有未迁移的旧项目需要，平时不付出 yaml 的导入开销
+                        with open(path, "r", encoding="utf-8") as f:
+                            data = yaml.safe_load(f) or {}
+                        rows = [flatten_entry(project, str(path), rec) for rec in data.get("save_log", []) or []]
+                        offset = st.st_size
+                stats["tasks"] += self._insert(rows)
+                self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                                (str(path), project, st.st_mtime_ns, st.st_size, offset))
+            # 项目被删除或由 run.yaml 迁移为 run.jsonl 时清理旧来源
+            for row in self.db.execute("SELECT path, project FROM sources").fetchall():
+                if row["path"] not in seen:
+                    self.db.execute("DELETE FROM sources WHERE path = ?", (row["path"],))
+                    self.db.execute("DELETE FROM tasks WHERE source = ?", (row["path"],))
+        if verbose:
+            print(f"[LOG] 索引更新: 读取 {stats['files']} 个日志，跳过未变化 {stats['skipped']} 个，"
+                  f"写入 {stats['tasks']} 条 -> {self.db_path}")
+        return stats
+
+    # ========== 查询 ==========
+
+    def query(self, mode=None, project=None, slm_image_path=None, display_image_path=None,
+              exposure_gt=None, exposure_lt=None, where=None, params=(), limit=None) -> list:
+        """
+        按条件查询，返回 dict 列表（按项目、idx 排序）。
+        slm_image_path / display_image_path 为子串匹配；where 为附加的 SQL 条件。
+        """
+        conds, args = [], []
+        if mode:
+            conds.append("mode = ?"); args.append(mode)
+        if project:
+            conds.append("project = ?"); args.append(project)
+        if slm_image_path:
+            conds.append("slm_image_path LIKE ?"); args.append(f"%{slm_image_path}%")
+        if display_image_path:
+            conds.append("display_image_path LIKE ?"); args.append(f"%{display_image_path}%")
+        if exposure_gt is not None:
+            conds.append("exposure_us > ?"); args.append(exposure_gt)
+        if exposure_lt is not None:
+            conds.append("exposure_us < ?"); args.append(exposure_lt)
+        if where:
+            conds.append(f"({where})"); args.extend(params)
+        sql = "SELECT * FROM tasks"
+        if conds:
+            sql += " WHERE " + " AND ".join(conds)
+        sql += " ORDER BY project, idx"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(r) for r in self.db.execute(sql, args)]
+
+    def pairs(self, project=None, same_project: bool = True) -> list:
+        """
+        为每张 measurement 配对 PSF：SLM 图案相同，优先同一项目，取拍摄时间最近的一张。
+        返回 [(measurement 行, psf 行或 None), ...]
+        """
+        ms = self.query(mode="capture_measurement", project=project, where="path IS NOT NULL")
+        psfs = {}
+        for r in self.db.execute("SELECT * FROM tasks WHERE mode = 'capture_psf' AND path IS NOT NULL "
+                                 "AND slm_image_path IN (SELECT slm_image_path FROM tasks "
+                                 "WHERE mode = 'capture_measurement')"):
+            psfs.setdefault(r["slm_image_path"], []).append(dict(r))
+
+        def dt(a, b):
+            try:
+                return abs((datetime.datetime.fromisoformat(a["task_time"]) -
+                            datetime.datetime.fromisoformat(b["task_time"])).total_seconds())
+            except (TypeError, ValueError):
+                return float("inf")
+
+        out = []
+        for m in ms:
+            cands = [p for p in psfs.get(m["slm_image_path"], [])
+                     if not same_project or p["project"] == m["project"]]
+            best = min(cands, key=lambda p: (p["project"] != m["project"], dt(p, m)), default=None)
+            out.append((m, best))
+        return out
+
+
+def _print_rows(rows, fmt: str):
+    if fmt == "json":
+        print(json.dumps(rows, ensure_ascii=False, indent=1))
+        return
+    if fmt == "csv":
+        import csv
+        import sys
+        w = csv.DictWriter(sys.stdout, fieldnames=COLUMNS, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+        return
+    for r in rows:
+        print(f"{r['project']}  #{r['idx']:<4} {r['mode']:<20} exp={r['exposure_us']}  "
+              f"slm={os.path.basename(r['slm_image_path'] or '')}  {r['path']}")
+    print(f"[LOG] 共 {len(rows)} 条")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="实验目录索引（SQLite）")
+    ap.add_argument("action", choices=["update", "query", "pairs"])
+    ap.add_argument("root_dir")
+    ap.add_argument("--db", default=None, help="索引文件，默认 <root_dir>/catalog.sqlite")
+    ap.add_argument("--mode", default=None)
+    ap.add_argument("--project", default=None)
+    ap.add_argument("--slm", default=None, help="SLM 图案路径（子串匹配）")
+    ap.add_argument("--display", default=None, help="显示图片路径（子串匹配）")
+    ap.add_argument("--exposure-gt", type=float, default=None)
+    ap.add_argument("--exposure-lt", type=float, default=None)
+    ap.add_argument("--where", default=None, help="附加 SQL 条件")
+    ap.add_argument("--limit", type=int, default=None)
+    ap.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    ap.add_argument("--no-update", action="store_true", help="查询前不更新索引")
+    args = ap.parse_args()
+
+    with Catalog(args.root_dir, args.db) as cat:
+        if args.action == "update" or not args.no_update:
+            cat.update(verbose=args.action == "update" or args.format == "table")
+        if args.action == "query":
+            _print_rows(cat.query(args.mode, args.project, args.slm, args.display,
+                                  args.exposure_gt, args.exposure_lt, args.where, limit=args.limit),
+                        args.format)
+        elif args.action == "pairs":
+            pairs = cat.pairs(args.project)
+            if args.format == "json":
+                print(json.dumps([{"measurement": m["path"], "psf": p["path"] if p else None}
+                                  for m, p in pairs], ensure_ascii=False, indent=1))
+            else:
+                for m, p in pairs:
+                    print(f"{m['path']}  <-  {p['path'] if p else '(无匹配 PSF)'}")
+                print(f"[LOG] 共 {len(pairs)} 对")
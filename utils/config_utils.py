@@ -1,6 +1,8 @@
 # ====== config_utils.py ======
 from pathlib import Path
-import yaml, json, hashlib, datetime, os
+import yaml, json, hashlib, datetime, os, time
+from utils.run_log import RunLog
+from utils.trace import tracer, traced
 
 BASE62_ALPH = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
 
@@ -28,10 +30,16 @@ def task_codes_from_time(kind:str, k=4):
     task_id = f"{kind}-{code}"
     return code, task_id
 
-def generate_file_prefix(kind: str, run_data: dict, num_width: int = 5) -> str:
-    """根据已有日志生成编号前缀，例如 psf00001、m00012"""
-    existing_count = len(run_data.get("save_log", []))
-    file_index = existing_count + 1
+@traced("log.reserve_index")
+def generate_file_prefix(kind: str, run_data, num_width: int = 5) -> str:
+    """
+    根据已有日志生成编号前缀，例如 psf00001、m00012。
+    run_data 为 RunLog 时编号由项目目录下的计数器原子分配，多进程共用一个项目也不会重复。
+    """
+    if isinstance(run_data, RunLog):
+        file_index = run_data.reserve(1).start
+    else:
+        file_index = len(run_data.get("save_log", [])) + 1
     return f"{file_index:0{num_width}d}-{kind}"
 
 # -----------------------------
@@ -49,12 +57,19 @@ def read_run_yaml(p:Path)->dict:
     with open(p,"r",encoding="utf-8") as f:
         return yaml.safe_load(f) or {}
 
-def write_run_yaml(p:Path,d:dict):
+@traced("log.write_yaml")
+def write_run_yaml(p:Path,d):
+    """写出完整 run.yaml；d 为 RunLog 时按需从 run.jsonl 导出"""
+    if isinstance(d, RunLog):
+        d.export_yaml(p); return
     p.parent.mkdir(parents=True,exist_ok=True)
     with open(p,"w",encoding="utf-8") as f:
         yaml.safe_dump(d,f,allow_unicode=True,sort_keys=False)
 
-def append_log(run_data:dict,entry:dict):
+@traced("log.append")
+def append_log(run_data,entry:dict):
+    if isinstance(run_data, RunLog):
+        run_data.append(entry); return   # 追加一行到 run.jsonl
     run_data.setdefault("save_log",[])
     run_data["save_log"].append({"idx":len(run_data["save_log"])+1,**entry})
 
@@ -62,8 +77,11 @@ def append_log(run_data:dict,entry:dict):
 # 项目与运行配置加载
 # -----------------------------
 def prepare_run_environment(path):
-    """加载 config.yaml 并准备项目文件夹、run.yaml"""
+    """加载 config.yaml 并准备项目文件夹、run.yaml；按 cfg["trace"] 开关分阶段计时（utils/trace.py）"""
+    t0 = time.perf_counter_ns()
     cfg = load_config(path)
+    tracer.configure(cfg.get("trace"))
+    tracer.add("config.load", t0)   # 读配置时追踪尚未开启，补记
     mode = cfg["task"]["mode"]
     if mode=="capture_psf": kind="psf"
     elif mode=="capture_measurement": kind="m"
@@ -76,12 +94,13 @@ def prepare_run_environment(path):
     proj_dir.mkdir(parents=True, exist_ok=True)
     run_path = proj_dir / "run.yaml"
 
-    run_data = read_run_yaml(run_path)
-    if "project" not in run_data:
-        run_data["project"] = {
-            "id": proj_id,
-            "root_dir": str(cfg["project"]["root_dir"]),
-            "description": cfg["project"].get("description","")
-        }
+    # 日志写入 run.jsonl（只追加）；旧项目首次打开时从 run.yaml 迁移。
+    # project.run_log: "yaml" 时每次任务后仍导出完整 run.yaml（旧行为）
+    run_data = RunLog(proj_dir, project={
+        "id": proj_id,
+        "root_dir": str(cfg["project"]["root_dir"]),
+        "description": cfg["project"].get("description","")
+    }, sync_yaml=cfg["project"].get("run_log","jsonl")=="yaml")
+    tracer.add("config.prepare", t0)
 
     return cfg, run_data, run_path, proj_dir, kind
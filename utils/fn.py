@@ -37,3 +37,20 @@ def collect_images(folder: str) -> Dict[str, List[str]]:
     print(log)
 
     return {"images": images}
+
+def imread(path, flags=None):
+    """
+    与 cv2.imread 相同，但支持 Windows 下含中文等非 ASCII 字符的路径
+    （先按字节读入再 cv2.imdecode）；读取或解码失败返回 None。
+    flags 缺省为 cv2.IMREAD_COLOR。
+    """
+    import cv2
+    import numpy as np
+
+    try:
+        data = np.fromfile(path, dtype=np.uint8)
+    except OSError:
+        return None
+    if data.size == 0:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR if flags is None else flags)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+FZA（菲涅尔波带片）图案批量生成：按解析式直接合成，不再逐张用 PIL 读写。
+
+    t(r) = 0.5 * (1 + cos(pi * r^2 / R^2 + phase))
+
+  - R 为波带常数（第一个波带的半径，像素），文件名沿用 FZA_bin_R25.png 的写法
+  - 对 R × 圆心 × 光阑半径 × 相位 的参数网格整批用 NumPy 广播计算，按内存上限分块
+  - 输出为 SLM 原生的 8 位单通道（uint8, H×W），不再转成 RGB
+  - 可以直接写到文件夹（后台线程编码 PNG），也可以放进内存中的 PatternBank
+
+    specs = fza_grid(radii=range(10, 60, 5), apertures=[None, 300, 400])
+    save_patterns("data/fza_bin_gen", specs, shape=(1080, 1920))
+
+    bank = PatternBank.generate(specs, shape=(1080, 1920))
+    bank["FZA_bin_R25"]        # -> uint8 (1080, 1920)
+"""
+import csv
+import itertools
+import os
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Optional, Tuple
+
+import numpy as np
+
+# 以脚本方式运行时也能导入项目内的模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SLM_SHAPE = (1080, 1920)     # (H, W)，HOLOEYE PLUTO 分辨率
+
+
+@dataclass(frozen=True)
+class FZASpec:
+    """
+    一张 FZA 图案的参数：
+      - radius  : 波带常数 R（像素）
+      - center  : 圆心 (x, y)，None 为图像中心
+      - aperture: 圆形光阑半径（像素），光阑外填 fill；None 为不加光阑
+      - phase   : 附加相位（弧度），如 0 / pi/2 / pi / 3pi/2 用于相移
+      - binary  : True 为二值图案（0/255），False 为 8 位灰度
+    """
+    radius: float
+    center: Optional[Tuple[int, int]] = None
+    aperture: Optional[float] = None
+    phase: float = 0.0
+    binary: bool = True
+    fill: int = 0
+
+    @property
+    def name(self) -> str:
+        def num(v):
+            return f"{v:g}".replace(".", "p")
+        parts = [f"FZA_{'bin' if self.binary else 'gray'}_R{num(self.radius)}"]
+        if self.aperture is not None:
+            parts.append(f"A{num(self.aperture)}")
+        if self.center is not None:
+            parts.append(f"C{self.center[0]}x{self.center[1]}")
+        if self.phase:
+            parts.append(f"P{num(round(np.degrees(self.phase), 3))}")
+        return "_".join(parts)
+
+
+def fza_grid(radii, centers=(None,), apertures=(None,), phases=(0.0,), binary=True, fill=0):
+    """参数网格的笛卡尔积，返回 FZASpec 列表"""
+    return [FZASpec(float(r), None if c is None else (int(c[0]), int(c[1])),
+                    None if a is None else float(a), float(p), binary, fill)
+            for r, c, a, p in itertools.product(radii, centers, apertures, phases)]
+
+
+def _chunk_size(shape, max_bytes) -> int:
+    # 每张图案在计算时约需 3 份 float32 的 H×W 临时数组
+    return max(1, int(max_bytes // (shape[0] * shape[1] * 4 * 3)))
+
+
+def render_batch(specs, shape=SLM_SHAPE, out=None) -> np.ndarray:
+    """
+    把一组 FZASpec 一次性渲染为 (N, H, W) uint8。
+    out 可传入预分配的数组（如 memmap）以避免额外内存。
+    """
+    h, w = shape
+    n = len(specs)
+    if out is None:
+        out = np.empty((n, h, w), dtype=np.uint8)
+    if n == 0:
+        return out
+
+    def col(values):
+        return np.asarray(values, dtype=np.float32)[:, None, None]
+
+    cx = col([w // 2 if s.center is None else s.center[0] for s in specs])
+    cy = col([h // 2 if s.center is None else s.center[1] for s in specs])
+    k = col([np.pi / (s.radius * s.radius) for s in specs])
+    ph = col([s.phase for s in specs])
+    xx = np.arange(w, dtype=np.float32)[None, None, :]
+    yy = np.arange(h, dtype=np.float32)[None, :, None]
+
+    r2 = (xx - cx) ** 2 + (yy - cy) ** 2          # (N, H, W)
+    arg = r2 * k
+    arg += ph
+    np.cos(arg, out=arg)                           # arg 复用为 cos 值
+    binary = np.array([s.binary for s in specs])
+    if binary.all():
+        np.multiply(arg >= 0, 255, out=out, casting="unsafe")
+    else:
+        gray = np.rint(arg * 127.5 + 127.5)
+        gray[binary] = np.where(arg[binary] >= 0, 255, 0)
+        out[...] = gray
+
+    for i, s in enumerate(specs):
+        if s.aperture is not None:
+            out[i][r2[i] > s.aperture * s.aperture] = s.fill
+    return out
+
+
+def iter_patterns(specs, shape=SLM_SHAPE, max_bytes: int = 256 << 20):
+    """按内存上限分块渲染，逐张 yield (spec, uint8 数组)；数组为块内视图，需保留时请 copy"""
+    specs = list(specs)
+    step = _chunk_size(shape, max_bytes)
+    for i in range(0, len(specs), step):
+        chunk = specs[i:i + step]
+        batch = render_batch(chunk, shape)
+        yield from zip(chunk, batch)
+
+
+def _write_all(out_dir, items, ext, workers):
+    """items 为 (spec, img) 迭代器；在 AsyncFrameWriter 的工作线程中编码写盘，返回 (路径列表, 失败数)"""
+    from src.frame_writer import AsyncFrameWriter
+
+    os.makedirs(out_dir, exist_ok=True)
+    specs, paths = [], []
+    with AsyncFrameWriter(max_queue=2 * workers, workers=workers, verbose=False) as writer:
+        for spec, img in items:
+            path = os.path.join(out_dir, spec.name + ext)
+            writer.submit(img, path)
+            specs.append(spec)
+            paths.append(path)
+    if writer.failed:
+        print(f"[WARN] {writer.failed} 张图案写入失败")
+
+    # 记录每张图案的参数，便于之后按文件名回查
+    with open(os.path.join(out_dir, "patterns.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        keys = [fld.name for fld in fields(FZASpec)]
+        w.writerow(["file"] + keys)
+        for spec, path in zip(specs, paths):
+            w.writerow([os.path.basename(path)] + [getattr(spec, k) for k in keys])
+    return paths, writer.failed
+
+
+def save_patterns(out_dir, specs, shape=SLM_SHAPE, ext: str = ".png",
+                  max_bytes: int = 256 << 20, workers: int = 4, verbose: bool = True):
+    """
+    分块渲染并写到 out_dir/<spec.name><ext>，同时写出 patterns.csv 记录参数。
+    渲染与 PNG 编码重叠进行。返回写出的路径列表。
+    """
+    paths, failed = _write_all(out_dir, iter_patterns(specs, shape, max_bytes), ext, workers)
+    if verbose:
+        print(f"[OK] 已生成 {len(paths) - failed} 张图案 ({shape[1]}x{shape[0]}, uint8) -> {out_dir}")
+    return paths
+
+
+class PatternBank:
+    """内存中的图案库：名称 -> uint8 (H, W)，整组数据放在一块连续数组里"""
+
+    def __init__(self, specs, data: np.ndarray):
+        self.specs = list(specs)
+        self.data = data
+        self._index = OrderedDict((s.name, i) for i, s in enumerate(self.specs))
+
+    @classmethod
+    def generate(cls, specs, shape=SLM_SHAPE, max_bytes: int = 256 << 20) -> "PatternBank":
+        specs = list(specs)
+        data = np.empty((len(specs),) + tuple(shape), dtype=np.uint8)
+        step = _chunk_size(shape, max_bytes)
+        for i in range(0, len(specs), step):
+            render_batch(specs[i:i + step], shape, out=data[i:i + step])
+        return cls(specs, data)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getitem__(self, key) -> np.ndarray:
+        return self.data[self._index[key] if isinstance(key, str) else key]
+
+    def names(self):
+        return list(self._index)
+
+    def save(self, out_dir, ext: str = ".png", workers: int = 4):
+        """把图案库写到文件夹（如供 SLM.load 按路径读取），返回路径列表"""
+        return _write_all(out_dir, zip(self.specs, self.data), ext, workers)[0]
+
+
+def circular_mask(shape, radius: float, center=None) -> np.ndarray:
+    """(H, W) 布尔掩膜，圆内为 True；center 为 (x, y)，None 为图像中心"""
+    h, w = shape
+    cx, cy = (w // 2, h // 2) if center is None else center
+    yy, xx = np.ogrid[:h, :w]
+    return (xx - cx) * (xx - cx) + (yy - cy) * (yy - cy) <= radius * radius
+
+
+def apply_aperture(images: np.ndarray, radius: float, center=None, fill: int = 0,
+                   stacked: bool = False) -> np.ndarray:
+    """
+    原地加圆形光阑，圆外填 fill：
+      - stacked=False: images 为单张 (H, W) 或 (H, W, C)
+      - stacked=True : images 为同尺寸堆栈 (N, H, W[, C])，整批一次完成
+    """
+    h, w = images.shape[1:3] if stacked else images.shape[:2]
+    outside = ~circular_mask((h, w), radius, center)
+    if stacked:
+        images[:, outside] = fill
+    else:
+        images[outside] = fill
+    return images
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="批量生成 FZA 图案（8 位单通道）")
+    ap.add_argument("out_dir")
+    ap.add_argument("--radii", type=float, nargs="+", required=True, help="波带常数 R 列表（像素）")
+    ap.add_argument("--apertures", type=float, nargs="*", default=None, help="光阑半径列表，缺省不加光阑")
+    ap.add_argument("--centers", type=int, nargs="*", default=None, metavar="X Y",
+                    help="圆心坐标，成对给出: x1 y1 x2 y2 ...；缺省为图像中心")
+    ap.add_argument("--phases", type=float, nargs="*", default=[0.0], help="附加相位（度）")
+    ap.add_argument("--gray", action="store_true", help="生成灰度图案（默认二值）")
+    ap.add_argument("--size", type=int, nargs=2, default=(SLM_SHAPE[1], SLM_SHAPE[0]), metavar=("W", "H"))
+    args = ap.parse_args()
+
+    centers = [None]
+    if args.centers:
+        if len(args.centers) % 2:
+            ap.error("--centers 需要成对给出 x y")
+        centers = list(zip(args.centers[0::2], args.centers[1::2]))
+    specs = fza_grid(args.radii, centers, args.apertures or [None],
+                     [np.radians(p) for p in args.phases], binary=not args.gray)
+    save_patterns(args.out_dir, specs, shape=(args.size[1], args.size[0]))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+导入耗时预算：在全新的解释器中逐个导入模块（python -X importtime），检查
+  - 累计导入耗时（毫秒，取 repeat 次中的最小值，含 numpy 等必需依赖）不超过预算
+  - 没有加载禁止的模块：离线工具（重建、对焦评价、图案生成、索引）不应触及相机 SDK、torch、cv2、Tk
+
+    python utils/import_budget.py                 # 全部检查，有超出时退出码为 1
+    python utils/import_budget.py src.calc_wiener --repeat 5 --json import_times.json
+
+需要 torch / cv2 的代码在第一次使用时才导入（utils/lazy.py），因此只导入模块不会加载它们。
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEVICE_MODULES = ("MvImport", "src.camera", "src.slm_ctrl", "src.screen_viewer", "HEDS", "tkinter", "screeninfo")
+OFFLINE_FORBIDDEN = DEVICE_MODULES + ("torch", "cv2")
+
+# 模块: (预算 ms, 禁止加载的模块前缀)
+BUDGETS = {
+    "src.calc_wiener": (400, OFFLINE_FORBIDDEN),
+    "src.calc_tamura": (300, OFFLINE_FORBIDDEN),
+    "utils.fza_patterns": (300, OFFLINE_FORBIDDEN),
+    "utils.catalog": (100, OFFLINE_FORBIDDEN + ("yaml", "numpy")),
+    "utils.run_log": (150, OFFLINE_FORBIDDEN + ("numpy",)),
+    "utils.config_utils": (150, OFFLINE_FORBIDDEN + ("numpy",)),
+    # 设备层：导入时不加载 SDK 封装与结构体定义，打开设备时才加载
+    "src.camera": (400, ("MvImport", "torch", "cv2", "tkinter")),
+    "src.devices": (50, DEVICE_MODULES + ("torch", "cv2", "numpy")),
+}
+
+_PROBE = "import {mod}, sys, json; print(json.dumps(sorted(sys.modules)))"
+
+
+def measure(module: str) -> dict:
+    """在子进程中导入一次，返回 {"ms": 累计导入耗时, "modules": 已加载模块列表}"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE.format(mod=module)],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+    total_us = None
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            total_us = int(parts[1])
+    return {"ms": (total_us or 0) / 1000.0, "modules": json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def check(module: str, budget_ms: float, forbidden=(), repeat: int = 3) -> dict:
+    runs = [measure(module) for _ in range(repeat)]
+    ms = min(r["ms"] for r in runs)
+    bad = sorted({m for m in runs[0]["modules"] for f in forbidden if m == f or m.startswith(f + ".")})
+    return {"module": module, "ms": round(ms, 2), "budget_ms": budget_ms, "forbidden_loaded": bad,
+            "ok": ms <= budget_ms and not bad}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="检查模块导入耗时与依赖")
+    ap.add_argument("modules", nargs="*", help="默认检查 BUDGETS 中的全部模块")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", default=None, help="结果另存为 JSON")
+    args = ap.parse_args()
+
+    results = []
+    for mod in args.modules or list(BUDGETS):
+        budget, forbidden = BUDGETS.get(mod, (float("inf"), ()))
+        r = check(mod, budget, forbidden, args.repeat)
+        results.append(r)
+        tag = "[OK]" if r["ok"] else "[ERR]"
+        extra = f"  加载了 {', '.join(r['forbidden_loaded'])}" if r["forbidden_loaded"] else ""
+        print(f"{tag} {mod:<24} {r['ms']:8.1f} ms / 预算 {budget} ms{extra}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+延迟导入：模块在第一次访问其属性时才真正 import，未用到的重依赖（torch / cv2 / 相机 SDK）不再拖慢启动。
+
+    torch = lazy_import("torch")
+    def f(x):
+        return torch.fft.rfft2(x)      # 第一次调用时才导入 torch
+
+  - 已导入过的模块直接返回真实模块，不再包一层
+"""
+import importlib
+import sys
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__["_module"] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def lazy_import(name: str):
+    """返回模块或其延迟代理"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
@@ -7,61 +7,157 @@ CENTER = None
 # 圆外填充值：黑色为 0
 FILL_VALUE = 0
 # ===================================
+# 图案按 SLM 原生的 8 位单通道读写（不再转 RGB），多进程并行加光阑。
+# 输出目录下的 .manifest.json 记录每个输入文件的内容哈希和本次参数，
+# 再次运行时输入与 RADIUS/CENTER/FILL_VALUE 都没变的文件直接跳过。
+# 需要直接生成 FZA 图案（而不是给已有图片加光阑）时请用 utils/fza_patterns.py。
 
+import argparse
+import hashlib
+import json
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from PIL import Image
-import numpy as np
+
+import cv2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.fn import imread
+from utils.fza_patterns import apply_aperture
+from src.frame_writer import write_frame
 
 # 支持的图片扩展名
 EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+MANIFEST_NAME = ".manifest.json"
+
+
+def file_sha1(path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"[WARN] manifest 损坏，全部重新处理: {path}")
+        return {}
+
+
+def save_manifest(path, manifest: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _input_hash(p: Path, old: dict) -> str:
+    """mtime 与大小都没变时沿用 manifest 里的哈希，避免每次重读整个图案库"""
+    st = p.stat()
+    if old and old.get("mtime_ns") == st.st_mtime_ns and old.get("size") == st.st_size:
+        return old["sha1"]
+    return file_sha1(p)
+
+
+def _mask_file(job):
+    """进程池任务：读 8 位单通道 -> 加光阑 -> 写出；返回 (文件名, 错误信息或 None, (W, H))"""
+    src, dst, radius, center, fill = job
+    img = imread(src, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return os.path.basename(src), "无法读取", None
+    h, w = img.shape
+    cx, cy = (w // 2, h // 2) if center is None else center
+    if not (0 <= cx < w and 0 <= cy < h):
+        return os.path.basename(src), "CENTER 超出图像范围", (w, h)
+    apply_aperture(img, radius, (cx, cy), fill)
+    try:
+        write_frame(img, dst, jpeg_quality=95)
+    except Exception as e:
+        return os.path.basename(src), str(e), (w, h)
+    return os.path.basename(src), None, (w, h)
 
-folder = Path(FOLDER)
-assert folder.exists() and folder.is_dir(), f"路径不存在或不是文件夹：{folder}"
 
-# 输出目录：原文件夹名 + '_masked_r{半径}'
-out_dir = folder.parent / f"{folder.name}_masked_r{RADIUS}"
-out_dir.mkdir(parents=True, exist_ok=True)
+def process_folder(folder, radius=RADIUS, center=CENTER, fill=FILL_VALUE,
+                   workers: int = None, force: bool = False) -> dict:
+    """
+    给 folder 内全部图片加圆形光阑，写到 <folder>_masked_r{radius}：
+      - 输入内容哈希与参数都和 manifest 一致、且输出文件存在时跳过
+      - force=True 时全部重新处理
+    返回 {"done": [...], "skipped": [...], "failed": {name: err}, "out_dir": ...}
+    """
+    folder = Path(folder)
+    assert folder.exists() and folder.is_dir(), f"路径不存在或不是文件夹：{folder}"
+    out_dir = folder.parent / f"{folder.name}_masked_r{radius}"
+    out_dir.mkdir(parents=True, exist_ok=True)
 
-# 收集图片
-files = [p for p in sorted(folder.iterdir()) if p.suffix.lower() in EXTS]
-assert files, f"文件夹中未找到图片：{folder}"
+    files = [p for p in sorted(folder.iterdir()) if p.suffix.lower() in EXTS]
+    assert files, f"文件夹中未找到图片：{folder}"
 
-# 读取第一张图获取尺寸
-with Image.open(files[0]) as im0:
-    im0 = im0.convert("RGB")
-    W, H = im0.size
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = {} if force else load_manifest(manifest_path)
+    params = {"radius": radius, "center": list(center) if center is not None else None, "fill": fill}
 
-# 圆心
-if CENTER is None:
-    cx, cy = W // 2, H // 2
-else:
-    cx, cy = CENTER
-    assert 0 <= cx < W and 0 <= cy < H, "CENTER 超出图像范围"
+    todo, skipped, entries = [], [], {}
+    for p in files:
+        old = manifest.get(p.name)
+        st = p.stat()
+        entry = {"sha1": _input_hash(p, old), "mtime_ns": st.st_mtime_ns, "size": st.st_size, "params": params}
+        entries[p.name] = entry
+        if (old and old.get("sha1") == entry["sha1"] and old.get("params") == params
+                and (out_dir / p.name).exists()):
+            skipped.append(p.name)
+            manifest[p.name] = entry
+        else:
+            todo.append(p)
+    print(f"[LOG] 共 {len(files)} 张，已是最新 {len(skipped)} 张，需处理 {len(todo)} 张")
 
-# 生成圆形掩膜
-yy, xx = np.ogrid[:H, :W]
-mask = (xx - cx) * (xx - cx) + (yy - cy) * (yy - cy) <= (RADIUS * RADIUS)
-mask_inv = ~mask
+    done, failed = [], {}
+    if todo:
+        jobs = [(str(p), str(out_dir / p.name), radius, center, fill) for p in todo]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for name, err, _ in pool.map(_mask_file, jobs, chunksize=4):
+                if err is None:
+                    done.append(name)
+                    manifest[name] = entries[name]
+                else:
+                    failed[name] = err
+                    manifest.pop(name, None)
+                    print(f"[ERR] {name}: {err}")
 
-for p in files:
-    with Image.open(p) as im:
-        im = im.convert("RGB")
-        arr = np.array(im)
+    # 输入已删除的条目从 manifest 中去掉（输出文件保留，不自动删除）
+    for name in set(manifest) - set(entries):
+        del manifest[name]
+    save_manifest(manifest_path, manifest)
+    return {"done": done, "skipped": skipped, "failed": failed, "out_dir": str(out_dir)}
 
-        out = arr.copy()
-        out[mask_inv] = FILL_VALUE
 
-        out_img = Image.fromarray(out)
-        out_path = out_dir / p.name
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="给 FZA 图案加圆形光阑（并行 + 增量）")
+    ap.add_argument("--folder", default=FOLDER)
+    ap.add_argument("--radius", type=int, default=RADIUS)
+    ap.add_argument("--center", type=int, nargs=2, metavar=("X", "Y"), default=CENTER)
+    ap.add_argument("--fill", type=int, default=FILL_VALUE)
+    ap.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数")
+    ap.add_argument("--force", action="store_true", help="忽略 manifest，全部重新处理")
+    return ap.parse_args(argv)
 
-        save_kwargs = {}
-        if out_path.suffix.lower() in {".jpg", ".jpeg"}:
-            save_kwargs["quality"] = 95
 
-        out_img.save(out_path, **save_kwargs)
+if __name__ == "__main__":
+    args = parse_args()
+    center = tuple(args.center) if args.center is not None else None
+    res = process_folder(args.folder, args.radius, center, args.fill, args.workers, args.force)
 
-print("处理完成！")
-print(f"输入目录：{folder}")
-print(f"输出目录：{out_dir}")
-print(f"图像尺寸：{W}x{H}，圆心：({cx},{cy})，半径：{RADIUS}，圆外填充值：{FILL_VALUE}")
+    print("处理完成！")
+    print(f"输入目录：{args.folder}")
+    print(f"输出目录：{res['out_dir']}")
+    print(f"新处理 {len(res['done'])} 张，跳过 {len(res['skipped'])} 张，失败 {len(res['failed'])} 张")
+    print(f"圆心：{center or '图像中心'}，半径：{args.radius}，圆外填充值：{args.fill}")
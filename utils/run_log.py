@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+只追加的运行日志 run.jsonl：每条记录一行 JSON，追加为 O(1)，不再每次重写整个 run.yaml。
+
+    第 1 行: {"project": {...}}
+    之后每行: {"idx": 12, "task_xxxx": {...}}   # 与 run.yaml 中 save_log 的元素相同
+
+  - next_index() 只读取文件末尾一行，与历史长度无关
+  - 编号由 <proj_dir>/.sequence.sqlite 原子分配（utils/sequence.py）：多个进程共用同一项目目录时
+    reserve() 得到的文件编号与 append() 得到的 idx 都不会重复
+  - 创建、迁移与每次追加都持有同一数据库的写锁（SequenceAllocator.locked()），分配 idx 与写入同一行
+    在一把锁内完成：多进程追加不会交错，文件中的 idx 保持递增
+  - export_yaml() 按需导出与原格式一致的 run.yaml（project + save_log）
+  - 项目目录里只有旧的 run.yaml 时，第一次打开会自动迁移为 run.jsonl（run.yaml 保留）
+
+    python utils/run_log.py export output/2025-10-15-exp003      # 导出 run.yaml
+    python utils/run_log.py migrate output/2025-10-15-exp003     # 仅迁移
+    python utils/run_log.py next output/2025-10-15-exp003        # 打印下一个 idx
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from utils.sequence import SequenceAllocator
+
+LOG_NAME = "run.jsonl"
+YAML_NAME = "run.yaml"
+SEQ_NAME = ".sequence.sqlite"
+
+
+def _tail_line(path, block: int = 4096) -> bytes:
+    """读取文件最后一个完整行（不含换行）；文件为空时返回 b""。末尾未写完的半行会被忽略"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b""
+        pos = end
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            lines = data.split(b"\n")
+            # lines[-1] 是最后一个换行之后的内容（正常为空，崩溃时可能是半行）
+            complete = [ln for ln in lines[:-1] if ln.strip()]
+            if len(complete) >= 2 or (complete and pos == 0):
+                return complete[-1]
+        complete = [ln for ln in data.split(b"\n")[:-1] if ln.strip()]
+        return complete[-1] if complete else b""
+
+
+class RunLog:
+    """
+    项目目录下的 run.jsonl。
+      - sync_yaml: True 时调用方每次追加后仍导出 run.yaml（兼容旧流程，代价随历史增长）
+    """
+
+    def __init__(self, proj_dir, project: dict = None, sync_yaml: bool = False):
+        self.proj_dir = Path(proj_dir)
+        self.path = self.proj_dir / LOG_NAME
+        self.sync_yaml = sync_yaml
+        self._seq = None
+        if not self.path.exists():
+            self.proj_dir.mkdir(parents=True, exist_ok=True)
+            with self.seq.locked():
+                # 拿到锁后再检查一次：其他进程可能已经创建
+                if not self.path.exists():
+                    yaml_path = self.proj_dir / YAML_NAME
+                    if yaml_path.exists():
+                        self.migrate(yaml_path)
+                    else:
+                        self._write_line({"project": project or {}})
+        self.project = self._read_project()
+
+    # ========== 读 ==========
+
+    def _read_project(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as f:
+            first = f.readline()
+        try:
+            return json.loads(first).get("project", {}) if first.strip() else {}
+        except ValueError:
+            return {}
+
+    def __iter__(self):
+        """逐条 yield save_log 元素（跳过 project 行与损坏的行）"""
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    print(f"[WARN] {self.path} 中有损坏的行，已跳过")
+                    continue
+                if "project" in rec and "idx" not in rec:
+                    continue
+                yield rec
+
+    def entries(self) -> list:
+        return list(self)
+
+    def last_index(self) -> int:
+        """日志中最后一条记录的 idx：只读文件最后一行"""
+        last = _tail_line(self.path)
+        try:
+            return int(json.loads(last).get("idx", 0)) if last else 0
+        except ValueError:
+            # 最后一行损坏时退回全量扫描
+            return max((int(r.get("idx", 0)) for r in self), default=0)
+
+    @property
+    def seq(self) -> SequenceAllocator:
+        if self._seq is None:
+            self._seq = SequenceAllocator(self.proj_dir / SEQ_NAME)
+        return self._seq
+
+    def next_index(self) -> int:
+        """下一个文件编号（仅查看，不占用；需要占用时用 reserve()）"""
+        return max(self.last_index(), self.seq.peek("file_index")) + 1
+
+    def reserve(self, n: int = 1) -> range:
+        """原子地占用 n 个连续文件编号（如连拍），从日志已有的最大 idx 之后接续"""
+        return self.seq.allocate("file_index", n, floor=self.last_index())
+
+    # ========== 写 ==========
+
+    def _write_line(self, rec: dict) -> None:
+        """追加一行；调用方需持有 self.seq.locked()"""
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with open(self.path, "a+b") as f:
+            # 上次写入若中断留下半行，先补换行，保证新记录独占一行
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = "\n" + line
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, entry: dict) -> dict:
+        """追加一条记录（idx 原子分配），返回带 idx 的记录"""
+        with self.seq.locked() as allocate:
+            rec = {"idx": allocate("idx", floor=self.last_index()).start, **entry}
+            self._write_line(rec)
+        return rec
+
+    # ========== 导出 / 迁移 ==========
+
+    def to_dict(self) -> dict:
+        """与 run.yaml 相同的结构：{"project": ..., "save_log": [...]}"""
+        return {"project": self.project, "save_log": self.entries()}
+
+    def export_yaml(self, out_path=None) -> Path:
+        """导出（压缩为一个文件的）run.yaml，先写临时文件再替换"""
+        out_path = Path(out_path or self.proj_dir / YAML_NAME)
+        tmp = out_path.with_name(out_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            yaml.safe_dump(self.to_dict(), f, allow_unicode=True, sort_keys=False)
+        os.replace(tmp, out_path)
+        return out_path
+
+    def migrate(self, yaml_path) -> int:
+        """把旧 run.yaml 转为 run.jsonl，返回迁移的条目数（会覆盖已有的 run.jsonl；由 __init__ 在锁内调用）"""
+        with open(yaml_path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        log = data.get("save_log", []) or []
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"project": data.get("project", {})}, ensure_ascii=False) + "\n")
+            for i, rec in enumerate(log, 1):
+                rec = rec if "idx" in rec else {"idx": i, **rec}
+                f.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
+        print(f"[LOG] 已将 {yaml_path} 迁移为 {self.path}（{len(log)} 条）")
+        return len(log)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="run.jsonl 运行日志工具")
+    ap.add_argument("action", choices=["export", "migrate", "next"])
+    ap.add_argument("proj_dir")
+    ap.add_argument("--out", default=None, help="export 输出路径，默认 <proj_dir>/run.yaml")
+    args = ap.parse_args()
+
+    log = RunLog(args.proj_dir)
+    if args.action == "export":
+        print(f"[OK] 已导出 {log.export_yaml(args.out)}")
+    elif args.action == "migrate":
+        print(f"[OK] {log.path}，共 {log.last_index()} 条")
+    else:
+        print(log.next_index())
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+多进程安全的编号分配：计数器存放在 SQLite 文件中，每次分配在一个 BEGIN IMMEDIATE 事务里完成，
+多个采集 / 处理进程共用同一个项目目录时也不会拿到重复编号。
+
+    seq = SequenceAllocator("output/exp003/.sequence.sqlite")
+    r = seq.allocate("file_index", 5)      # range(13, 18)：一次拿到连续 5 个编号
+    seq.peek("file_index")                 # 17
+
+  - floor: 分配前把计数器至少抬到 floor（用于从已有日志 / 旧计数文件接续编号）
+  - locked(): 持有同一把写锁执行一段操作（如追加 run.jsonl），与所有进程的分配互斥；锁内用 yield 的函数分配编号
+
+    with seq.locked() as allocate:
+        idx = allocate("idx").start
+        ...                                  # 写文件，其他进程的 allocate / locked 在此等待
+  - 只依赖标准库 sqlite3，Windows / Linux 行为一致；数据库被其他进程占用时最多等待 timeout 秒
+"""
+import sqlite3
+from contextlib import contextmanager
+
+
+class SequenceAllocator:
+    def __init__(self, path, timeout: float = 30.0):
+        self.path = str(path)
+        self.timeout = timeout
+        con = self._connect()
+        try:
+            con.execute("CREATE TABLE IF NOT EXISTS seq (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        finally:
+            con.close()
+
+    def _connect(self):
+        # isolation_level=None：事务由下面显式的 BEGIN/COMMIT 控制
+        return sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+
+    @contextmanager
+    def locked(self):
+        """
+        在一个 BEGIN IMMEDIATE 事务（数据库写锁）内执行 with 块，正常退出时提交，异常时回滚。
+        yield allocate(name, n=1, floor=0) -> range，在锁内分配编号。
+        同一进程内不要嵌套调用（第二个连接会等待第一个释放，直到 timeout）。
+        """
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")    # 立即拿写锁，其他进程在此等待
+            yield lambda name, n=1, floor=0: self._take(con, name, n, floor)
+            con.execute("COMMIT")
+        except BaseException:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    @staticmethod
+    def _take(con, name: str, n: int, floor: int) -> range:
+        if n < 1:
+            raise ValueError(f"n 必须 >= 1，收到 {n}")
+        row = con.execute("SELECT value FROM seq WHERE name = ?", (name,)).fetchone()
+        cur = max(row[0] if row else 0, int(floor))
+        con.execute("INSERT OR REPLACE INTO seq (name, value) VALUES (?, ?)", (name, cur + n))
+        return range(cur + 1, cur + n + 1)
+
+    def allocate(self, name: str, n: int = 1, floor: int = 0) -> range:
+        """原子地分配 n 个连续编号（从 1 开始计），返回 range"""
+        if n < 1:
+            raise ValueError(f"n 必须 >= 1，收到 {n}")
+        with self.locked() as allocate:
+            return allocate(name, n, floor)
+
+    def next(self, name: str, floor: int = 0) -> int:
+        return self.allocate(name, 1, floor).start
+
+    def peek(self, name: str) -> int:
+        """当前已分配到的最大编号（未分配过为 0）"""
+        con = self._connect()
+        try:
+            row = con.execute("SELECT value FROM seq WHERE name = ?", (name,)).fetchone()
+        finally:
+            con.close()
+        return row[0] if row else 0
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段计时（span）：记录设备初始化、SLM 上传、等待稳定、曝光取帧、编码、写盘、写日志等阶段的耗时，
+按任务汇总写入运行日志（条目中的 timings_ms），并可导出 Chrome trace 供可视化。
+
+    from utils.trace import span, traced, tracer
+
+    @traced("camera.open")
+    def open(self): ...
+
+    with span("slm.settle", ms=30):
+        time.sleep(0.03)
+
+    with tracer.task("task_Ab12") as tt:
+        ...
+        entry = make_entry(..., **tt.log_fields())     # {"timings_ms": {"total": ..., "camera.grab": ...}}
+    tracer.save(proj_dir / "traces", "task_Ab12")      # 按 export 写出 .trace.json
+
+config.yaml（整段省略时关闭）:
+
+    trace:
+      enabled: true
+      export: ""        # chrome: Chrome trace（chrome://tracing 或 ui.perfetto.dev 打开）| json: 事件列表 | "": 不导出
+
+  - 关闭时 span() 返回共享的空对象，traced 包装的函数只多一次属性判断，不记录任何事件
+  - 线程安全：事件带线程号，AsyncFrameWriter 工作线程中的编码与写盘同样计入进行中的任务
+  - 同名阶段在一个任务内累加（如连拍的多次 camera.grab），嵌套阶段各自计时
+  - 内存中最多保留 max_events 个事件，超出后丢弃最旧的；每个 TaskTrace 另存本任务的事件（供 export(task=...)），
+    同样以 max_events 为上限，随调用方持有的 TaskTrace 一起释放
+  - 追踪器只保留最近 max_tasks 个已结束任务的阶段汇总（event_list() 的 tasks），不持有它们的事件
+"""
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+EXPORT_FORMATS = ("chrome", "json")
+
+
+class _NullSpan:
+    """关闭时使用的空 span"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "t0")
+
+    def __init__(self, tracer, name: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        t1 = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.t0, t1, **self.args)
+        return False
+
+    def set(self, **args) -> None:
+        """补充参数（如结果、字节数），随事件一起导出"""
+        self.args.update(args)
+
+
+class TaskTrace:
+    """一个任务期间记录到的事件；phases 为 {阶段名: [累计 ns, 次数]}"""
+
+    def __init__(self, name: str, args: dict, max_events: int = None):
+        self.name = name
+        self.args = args
+        self.t0 = time.perf_counter_ns()
+        self.t1 = None
+        self.phases = {}
+        self.events = deque(maxlen=max_events)
+
+    def _add(self, ev) -> None:
+        self.events.append(ev)
+        acc = self.phases.get(ev[0])
+        if acc is None:
+            self.phases[ev[0]] = [ev[2], 1]
+        else:
+            acc[0] += ev[2]
+            acc[1] += 1
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.t1 if self.t1 is not None else time.perf_counter_ns()
+        return (end - self.t0) / 1e6
+
+    def timings(self) -> dict:
+        """{"total": 任务耗时, 阶段名: 累计毫秒, ...}；任务未结束时 total 计到当前"""
+        out = {"total": round(self.duration_ms, 3)}
+        for name, (ns, _) in self.phases.items():
+            out[name] = round(ns / 1e6, 3)
+        return out
+
+    def counts(self) -> dict:
+        return {name: n for name, (_, n) in self.phases.items() if n > 1}
+
+    def log_fields(self) -> dict:
+        """写入日志条目的字段；没有记录到任何阶段（追踪关闭）时为空"""
+        if not self.phases:
+            return {}
+        fields = {"timings_ms": self.timings()}
+        if self.counts():
+            fields["timing_counts"] = self.counts()
+        return fields
+
+
+class Tracer:
+    def __init__(self, max_events: int = 100000, max_tasks: int = 1000):
+        self.enabled = False
+        self.export_format = None
+        self.max_events = max_events
+        self.events = deque(maxlen=max_events)   # (name, t0_ns, dur_ns, tid, args)
+        self.tasks = deque(maxlen=max_tasks)     # 已结束任务的汇总 {"name": ..., "timings_ms": ...}
+        self._active = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._wall_origin = time.time()
+
+    # ========== 开关 ==========
+
+    def configure(self, cfg=None) -> "Tracer":
+        """按 config.yaml 的 trace 段设置；cfg 为 None / 空时关闭"""
+        cfg = cfg or {}
+        export = cfg.get("export") or None
+        if export is not None and export not in EXPORT_FORMATS:
+            raise ValueError(f"trace.export 只能是 {EXPORT_FORMATS} 或留空，收到 {export!r}")
+        self.enabled = bool(cfg.get("enabled", False))
+        self.export_format = export if self.enabled else None
+        return self
+
+    def enable(self, export: str = None) -> "Tracer":
+        return self.configure({"enabled": True, "export": export})
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self.events.clear()
+            self.tasks.clear()
+
+    # ========== 记录 ==========
+
+    def span(self, name: str, **args):
+        return Span(self, name, args) if self.enabled else NULL_SPAN
+
+    def add(self, name: str, t0_ns: int, t1_ns: int = None, **args) -> None:
+        """记录一个已结束的阶段（t0/t1 为 perf_counter_ns）；关闭时忽略"""
+        if not self.enabled:
+            return
+        if t1_ns is None:
+            t1_ns = time.perf_counter_ns()
+        th = threading.current_thread()
+        ev = (name, t0_ns, t1_ns - t0_ns, th.ident, args)
+        with self._lock:
+            if th.ident not in self._threads:
+                self._threads[th.ident] = th.name
+            self.events.append(ev)
+            for task in self._active:
+                task._add(ev)
+
+    # ========== 任务 ==========
+
+    def begin_task(self, name: str, **args) -> TaskTrace:
+        """开始汇总一个任务的阶段；关闭时同样返回 TaskTrace（之后开启的阶段也会计入）"""
+        task = TaskTrace(name, args, self.max_events)
+        with self._lock:
+            self._active.append(task)
+        return task
+
+    def end_task(self, task: TaskTrace) -> TaskTrace:
+        """结束任务（可重复调用）；开启时把任务本身记为一个 task 事件"""
+        if task.t1 is not None:
+            return task
+        task.t1 = time.perf_counter_ns()
+        with self._lock:
+            if task in self._active:
+                self._active.remove(task)
+        if self.enabled:
+            self.add(f"task:{task.name}", task.t0, task.t1, **task.args)
+            with self._lock:
+                self.tasks.append({"name": task.name, **task.log_fields()})
+        return task
+
+    @contextmanager
+    def task(self, name: str, **args):
+        task = self.begin_task(name, **args)
+        try:
+            yield task
+        finally:
+            self.end_task(task)
+
+    # ========== 导出 ==========
+
+    def _thread_names(self) -> dict:
+        with self._lock:
+            return dict(self._threads)
+
+    def chrome_trace(self, events=None) -> dict:
+        """Chrome trace event format：每个阶段一个 "X" 事件，时间单位为微秒"""
+        events = list(self.events) if events is None else events
+        pid = os.getpid()
+        out = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+               for tid, name in self._thread_names().items()]
+        for name, t0, dur, tid, args in events:
+            out.append({"name": name, "cat": name.split(".", 1)[0].split(":", 1)[0], "ph": "X",
+                        "ts": (t0 - self._origin) / 1000.0, "dur": dur / 1000.0,
+                        "pid": pid, "tid": tid, "args": _jsonable(args)})
+        return {"traceEvents": out, "displayTimeUnit": "ms",
+                "otherData": {"wall_origin": self._wall_origin}}
+
+    def event_list(self, events=None) -> dict:
+        """简单的 JSON：事件列表（开始时间相对追踪器创建时刻，毫秒）+ 各任务汇总"""
+        events = list(self.events) if events is None else events
+        threads = self._thread_names()
+        return {
+            "wall_origin": self._wall_origin,
+            "events": [{"name": name, "start_ms": round((t0 - self._origin) / 1e6, 3),
+                        "dur_ms": round(dur / 1e6, 3), "thread": threads.get(tid, str(tid)),
+                        "args": _jsonable(args)}
+                       for name, t0, dur, tid, args in events],
+            "tasks": list(self.tasks),
+        }
+
+    def export(self, path, fmt: str = "chrome", task: TaskTrace = None) -> str:
+        """写出全部事件（或只写 task 的事件）；先写临时文件再替换"""
+        import json
+
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"fmt 只能是 {EXPORT_FORMATS}，收到 {fmt!r}")
+        events = None if task is None else list(task.events)
+        data = self.chrome_trace(events) if fmt == "chrome" else self.event_list(events)
+        path = str(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+    def save(self, out_dir, name: str):
+        """按配置的 export 格式写到 out_dir/<name>.trace.json（json 为 .events.json）；未配置时返回 None"""
+        if not self.enabled or not self.export_format:
+            return None
+        suffix = ".trace.json" if self.export_format == "chrome" else ".events.json"
+        try:
+            path = self.export(os.path.join(str(out_dir), name + suffix), self.export_format)
+        except OSError as e:
+            print(f"[WARN] 导出 trace 失败: {e}")
+            return None
+        print(f"[LOG] trace 已导出: {path}")
+        return path
+
+
+def _jsonable(args: dict) -> dict:
+    return {k: v if isinstance(v, (str, int, float, bool, type(None))) else str(v) for k, v in args.items()}
+
+
+tracer = Tracer()
+
+
+def span(name: str, **args):
+    """with span("camera.grab"): ...   追踪关闭时几乎没有开销"""
+    return Span(tracer, name, args) if tracer.enabled else NULL_SPAN
+
+
+def traced(name: str = None):
+    """函数装饰器：每次调用记为一个阶段，name 缺省为函数的 __qualname__"""
+    def deco(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with Span(tracer, label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco